@@ -0,0 +1,65 @@
+"""Per-op latency and allocation of the scalar fma/div/reciprocal paths.
+
+usage: python benchmarks/float_repr.py [-n N]
+"""
+import argparse
+import time
+import tracemalloc
+import numpy as np
+
+from pyeasyfloat.float import FloatPoint
+from pyeasyfloat.fma import fma
+from pyeasyfloat.div import div
+from pyeasyfloat.reciprocal import reciprocal
+
+
+def bench(name: str, fn, args: list[tuple], repeat: int = 3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for a in args:
+            fn(*a)
+        best = min(best, time.perf_counter() - start)
+
+    # transient memory of a single call, averaged over all calls
+    total_peak = 0
+    tracemalloc.start()
+    for a in args:
+        tracemalloc.reset_peak()
+        base, _ = tracemalloc.get_traced_memory()
+        fn(*a)
+        total_peak += tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+
+    n = len(args)
+    print(f"{name:<16} {best / n * 1e6:9.2f} us/op {total_peak / n:9.1f} peak B/op")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", type=int, default=2000)
+    args = parser.parse_args()
+    np.random.seed(0)
+
+    for ew, mw in [(5, 10), (8, 23)]:
+        xs = [FloatPoint.random_normal(ew, mw) for _ in range(3 * args.n)]
+        triples = [tuple(xs[i:i + 3]) + (ew, mw) for i in range(0, len(xs), 3)]
+        pairs = [(x, y) for x, y, *_ in triples]
+        singles = [(x,) for x, *_ in triples]
+        print(f"E={ew} M={mw}")
+        bench("from_bits", FloatPoint.from_bits, [(x.to_bits(), ew, mw) for x, in singles])
+        bench("to_raw", FloatPoint.to_raw, singles)
+        bench("fma", fma, triples)
+        bench("div", div, pairs)
+        bench("reciprocal", reciprocal, singles[:args.n // 10])
+
+    # a live value keeps its memory, unlike the transient peak above
+    tracemalloc.start()
+    keep = [FloatPoint.random_normal(5, 10) for _ in range(args.n)]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"FloatPoint size: {size / len(keep):.1f} B/object")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Wall-clock time of importing a module in a fresh interpreter.
+
+usage: python benchmarks/import_time.py [-m pyeasyfloat.backend] [-n 20] [--baseline REV]
+
+Each run starts a new process, so nothing is cached between runs; the timer
+covers the import statement only, not the interpreter startup. numpy is
+reported alongside as the part every backend needs anyway.
+
+With --baseline, the same imports are also timed from a temporary git
+worktree of REV (e.g. the commit before the lazy backend registry), giving
+the before/after difference. An import that fails there, such as a missing
+pyverilator, is reported instead of timed.
+"""
+import argparse
+import contextlib
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+HEAVY_MODULES = ["numpy", "pyverilator", "tclwrapper"]
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = """
+import sys, time
+start = time.perf_counter()
+{stmt}
+elapsed = time.perf_counter() - start
+print(elapsed, ",".join(m for m in {heavy!r} if m in sys.modules))
+"""
+
+
+def measure(stmt: str, n: int, root: str = ROOT) -> tuple[float | None, str]:
+    """-> (median seconds, loaded heavy modules), or (None, error) if the import fails"""
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [root, os.environ.get("PYTHONPATH")])))
+    times = []
+    loaded = ""
+    # the first run writes the .pyc files and is not counted
+    for _ in range(n + 1):
+        proc = subprocess.run([sys.executable, "-c", PROBE.format(stmt=stmt, heavy=HEAVY_MODULES)],
+                              capture_output=True, text=True, cwd=root, env=env)
+        if proc.returncode != 0:
+            return (None, proc.stderr.strip().splitlines()[-1])
+        out = proc.stdout.split()
+        times.append(float(out[0]))
+        loaded = out[1] if len(out) > 1 else "-"
+    return (statistics.median(times[1:]), loaded)
+
+
+@contextlib.contextmanager
+def worktree(rev: str):
+    """Checkout of `rev` in a temporary directory, removed afterwards"""
+    path = tempfile.mkdtemp(prefix="import_time-")
+    subprocess.run(["git", "-C", ROOT, "worktree", "add", "--detach", "-q", path, rev], check=True)
+    try:
+        yield path
+    finally:
+        subprocess.run(["git", "-C", ROOT, "worktree", "remove", "--force", path], check=True)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-m", "--module", default="pyeasyfloat.backend")
+    parser.add_argument("-n", type=int, default=20)
+    parser.add_argument("--baseline", metavar="REV", default=None,
+                        help="git revision to time the same imports at, for comparison")
+    args = parser.parse_args()
+
+    stmts = ["import numpy", f"import {args.module}"]
+    results = {"current": [measure(stmt, args.n) for stmt in stmts]}
+    if args.baseline:
+        with worktree(args.baseline) as path:
+            results[args.baseline] = [measure(stmt, args.n, path) for stmt in stmts]
+
+    for i, stmt in enumerate(stmts):
+        for tree, rows in results.items():
+            median, loaded = rows[i]
+            label = f"{stmt} ({tree})" if args.baseline else stmt
+            if median is None:
+                print(f"{label:<48} failed: {loaded}")
+            else:
+                print(f"{label:<48} {median * 1e3:8.1f} ms  loaded: {loaded}")
+        if args.baseline:
+            (after, _), (before, _) = results["current"][i], results[args.baseline][i]
+            if after is not None and before is not None:
+                print(f"{'':<48} {(after - before) * 1e3:+8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
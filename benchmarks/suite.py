@@ -0,0 +1,246 @@
+"""Throughput of every op, per format, rounding mode and input kind.
+
+usage: python benchmarks/suite.py [-n N] [-k FILTER] [--save out.json]
+                                  [--baseline base.json] [--threshold 0.1]
+
+Each result is keyed "<impl>/<op>/<format>/<rounding mode>/<inputs>", where impl
+is "scalar" for the pure-Python functions, "batch" for pyeasyfloat.batch and
+the registry name for backend batch methods. Inputs are random normals plus
+hard cases: "gap" puts the addend far below the other operand (the whole of
+it ends up in the sticky bit), "carry" makes rounding carry out of the mantissa.
+Each row reports ops/sec, the memory blocks each op leaves allocated (its
+result included) and the traced peak bytes per op. Temporaries freed within
+an op are not counted as blocks, only their peak shows.
+
+With --baseline, results slower than the baseline by more than --threshold
+are listed and the exit status is 1.
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from typing import Callable
+import numpy as np
+
+from pyeasyfloat.float import FloatPoint, RoundingMode
+from pyeasyfloat.fma import fma, mul, add
+from pyeasyfloat.div import div
+from pyeasyfloat.reciprocal import reciprocal
+from pyeasyfloat.exp import pow2
+from pyeasyfloat.batch import fma_batch, mul_batch, add_batch, bits_dtype
+from pyeasyfloat.backend import get_backend, BaseFPBackend
+
+FORMATS = {"fp16": (5, 10), "bf16": (8, 7), "fp32": (8, 23), "fp64": (11, 52)}
+OPS = ["from_bits", "to_bits", "mul", "add", "fma", "div", "reciprocal", "pow2"]
+ROUNDED_OPS = {"mul", "add", "fma", "div", "pow2"}
+# input kinds each op is measured with
+INPUTS = {
+    "from_bits": ["random"], "to_bits": ["random"],
+    "mul": ["random", "carry"], "add": ["random", "gap", "carry"], "fma": ["random", "gap", "carry"],
+    "div": ["random"], "reciprocal": ["random"], "pow2": ["random"],
+}
+ARITY = {"mul": 2, "add": 2, "div": 2, "fma": 3}
+# ops that iterate per element get fewer inputs
+SLOW_OPS = {"reciprocal", "pow2"}
+
+
+def operands(op: str, kind: str, ew: int, mw: int, n: int, rng: np.random.Generator) -> list[tuple[FloatPoint, ...]]:
+    """n tuples of normal operands of `op`, of the given kind"""
+    arity = ARITY.get(op, 1)
+    negative = op == "pow2"
+    bias = (1 << (ew - 1)) - 1
+    max_exp = (1 << ew) - 2
+
+    def fp(sign, exp, mantissa):
+        return FloatPoint(ew, mw, bool(sign), int(exp), int(mantissa))
+
+    sign = rng.integers(0, 2, (n, arity))
+    if negative:
+        sign[:] = 1
+    mantissa = rng.integers(0, 1 << mw, (n, arity), dtype=np.uint64)
+    match kind:
+        case "random" if negative:
+            # |x| in [2^-4, 2^4), where pow2 is neither 0 nor inf
+            exp = rng.integers(bias - 4, bias + 4, (n, arity))
+        case "random":
+            exp = rng.integers(1, max_exp + 1, (n, arity))
+        case "gap":
+            # last operand (the addend) lies more than mw + 3 binades below the rest
+            gap = rng.integers(min(mw + 4, max_exp - 1), max_exp, n)
+            exp = np.repeat(rng.integers(gap + 1, max_exp + 1)[:, None], arity, axis=1)
+            if arity == 3:
+                # a * b stays around 2^(exp - bias)
+                exp[:, 1] = bias
+            exp[:, -1] -= gap
+        case "carry":
+            # 1.11..1 * 2^e (+) something that rounds up, giving 10.00..0
+            exp = np.repeat(rng.integers(bias, bias + 4, n)[:, None], arity, axis=1)
+            sign[:] = sign[:, :1]
+            mantissa[:, 0] = (1 << mw) - 1
+            if op == "mul":
+                # b = 1 + ulp
+                exp[:, 1] = bias
+                mantissa[:, 1] = 1
+            else:
+                # b = +1.0 for fma, then an addend of 3/4 ulp
+                exp[:, 1] = bias
+                mantissa[:, 1] = 0
+                if op == "fma":
+                    sign[:, 1] = 0
+                exp[:, -1] = exp[:, 0] - mw - 1
+                mantissa[:, -1] = 1 << (mw - 1)
+        case _:
+            raise ValueError(f"Unknown input kind {kind}")
+    return [tuple(fp(s, e, m) for s, e, m in zip(*row)) for row in zip(sign, exp, mantissa)]
+
+
+def measure(fn: Callable, calls: list[tuple], ops_per_call: int, repeat: int = 3) -> dict:
+    """-> {"ops_per_sec", "retained_blocks_per_op", "peak_bytes_per_op"}
+
+    retained blocks are the memory blocks still allocated after the calls,
+    their results included: not an allocation count, as temporaries freed
+    within a call only show in the traced peak.
+    """
+    for args in calls[:1]:
+        # warm up caches (tables, PWL coefficients) outside the timed loop
+        fn(*args)
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for args in calls:
+            fn(*args)
+        best = min(best, time.perf_counter() - start)
+
+    total_peak = 0
+    # keep the results alive so that their blocks are counted
+    results = [None] * len(calls)
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    for i, args in enumerate(calls):
+        tracemalloc.reset_peak()
+        base, _ = tracemalloc.get_traced_memory()
+        results[i] = fn(*args)
+        total_peak += tracemalloc.get_traced_memory()[1] - base
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    # the first snapshot is itself allocated in between
+    ignore = [tracemalloc.Filter(False, tracemalloc.__file__)]
+    retained = sum(stat.count_diff for stat in
+                 after.filter_traces(ignore).compare_to(before.filter_traces(ignore), "filename"))
+    n = len(calls) * ops_per_call
+    return {"ops_per_sec": n / best, "retained_blocks_per_op": retained / n, "peak_bytes_per_op": total_peak / n}
+
+
+def cases(fmt: str, op: str, rm: RoundingMode, kind: str, n: int, seed: int, backends: list[tuple[str, BaseFPBackend]]):
+    """Yield (impl, fn, calls, ops_per_call) for one benchmark row"""
+    ew, mw = FORMATS[fmt]
+    rng = np.random.default_rng(seed)
+    n = max(1, n // 10) if op in SLOW_OPS else n
+    xs = operands(op, kind, ew, mw, n, rng)
+    bits = [np.array([x[i].to_bits() for x in xs], dtype=bits_dtype(ew, mw)) for i in range(ARITY.get(op, 1))]
+
+    match op:
+        case "from_bits":
+            yield ("scalar", FloatPoint.from_bits, [(int(b), ew, mw) for b in bits[0]], 1)
+        case "to_bits":
+            yield ("scalar", FloatPoint.to_bits, xs, 1)
+        case "mul" | "add" | "fma":
+            scalar = {"mul": mul, "add": add, "fma": fma}[op]
+            yield ("scalar", scalar, [(*x, ew, mw, rm) for x in xs], 1)
+            batch = {"mul": mul_batch, "add": add_batch, "fma": fma_batch}[op]
+            try:
+                batch(*(b[:1] for b in bits), ew, mw, rm)
+            except ValueError:
+                pass  # wider than the batch engine's 64-bit window
+            else:
+                yield ("batch", batch, [(*bits, ew, mw, rm)], n)
+            if op == "fma" and rm == RoundingMode.RNE:
+                for name, backend in backends:
+                    yield (name, backend.fma_batch, [(*bits, ew, mw, ew, mw)], n)
+        case "div":
+            yield ("scalar", div, [(*x, rm) for x in xs], 1)
+            if rm == RoundingMode.RNE:
+                for name, backend in backends:
+                    yield (name, backend.div_batch, [(*bits, ew, mw)], n)
+        case "reciprocal":
+            yield ("scalar", reciprocal, xs, 1)
+            for name, backend in backends:
+                yield (name, backend.reciprocal_batch, [(bits[0], ew, mw)], n)
+        case "pow2":
+            yield ("scalar", pow2, [(x, ew, mw, ew, mw, ew, mw, rm) for x, in xs], 1)
+            if rm == RoundingMode.RNE:
+                for name, backend in backends:
+                    yield (name, backend.exp2_batch, [(bits[0], ew, mw, ew, mw, ew, mw, ew, mw)], n)
+
+
+def run(args) -> dict[str, dict]:
+    backends = [(name, get_backend(name)) for name in args.backends]
+    results = {}
+    for fmt in args.formats:
+        for op in args.ops:
+            for rm in (RoundingMode if op in ROUNDED_OPS else [RoundingMode.RNE]):
+                if rm.name not in args.rm:
+                    continue
+                for kind in INPUTS[op]:
+                    for impl, fn, calls, ops_per_call in cases(fmt, op, rm, kind, args.n, args.seed, backends):
+                        key = f"{impl}/{op}/{fmt}/{rm.name}/{kind}"
+                        if args.filter and args.filter not in key:
+                            continue
+                        results[key] = measure(fn, calls, ops_per_call)
+                        r = results[key]
+                        print(f"{key:<40} {r['ops_per_sec']:12.0f} ops/s {r['retained_blocks_per_op']:7.2f} retained blocks/op "
+                              f"{r['peak_bytes_per_op']:9.1f} peak B/op", flush=True)
+    return results
+
+
+def compare(results: dict[str, dict], baseline: dict[str, dict], threshold: float) -> list[str]:
+    """Keys whose throughput dropped by more than `threshold` (a fraction) against the baseline"""
+    regressions = []
+    for key, r in results.items():
+        if key not in baseline:
+            continue
+        ratio = r["ops_per_sec"] / baseline[key]["ops_per_sec"]
+        if ratio < 1 - threshold:
+            regressions.append(key)
+            print(f"REGRESSION {key:<40} {(ratio - 1) * 100:+6.1f}%")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", type=int, default=1000, help="inputs per row (a tenth for reciprocal/pow2)")
+    parser.add_argument("-k", "--filter", default=None, help="only run rows whose key contains this")
+    parser.add_argument("--formats", nargs="+", default=list(FORMATS), choices=list(FORMATS))
+    parser.add_argument("--ops", nargs="+", default=OPS, choices=OPS)
+    parser.add_argument("--rm", nargs="+", default=[m.name for m in RoundingMode],
+                        choices=[m.name for m in RoundingMode])
+    parser.add_argument("--backends", nargs="*", default=["py", "table"])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save", help="write results as JSON")
+    parser.add_argument("--baseline", help="JSON from an earlier --save to compare against")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="allowed throughput drop against the baseline, as a fraction")
+    args = parser.parse_args()
+
+    results = run(args)
+    if args.save:
+        meta = {
+            "python": sys.version.split()[0], "numpy": np.__version__,
+            "platform": platform.platform(), "n": args.n, "seed": args.seed,
+        }
+        with open(args.save, "w") as f:
+            json.dump({"meta": meta, "results": results}, f, indent=1)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        print(f"{len(regressions)} regressions over {args.threshold:.0%} "
+              f"in {len(set(results) & set(baseline))} compared rows")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,35 +1,140 @@
+"""ROM constants of the exp2 PWL and attention datapaths.
+
+    python fp_consts.py slopes --ew 5 --mw 10 --pwl-pieces 8
+        one constant type of one config, printed as hex (what PyFPConst runs)
+
+    python fp_consts.py grid --formats 5,10 8,7 8,23 --pwl-pieces 4 8 16 --dk 64 128
+        every constant type of every config, written to --out-dir as .mem files
+        ($readmemh ready, zero-padded hex, one value per line) that PyFPConst
+        reads instead of running this script
+
+Grid mode computes each constant exactly like the single-constant mode
+(pwl_coefficients, attention_scale). Files whose recorded key (config plus
+version of the reference model) is unchanged are skipped. manifest.json in
+the output directory also records that version and the sources it hashes,
+so PyFPConst can tell stale files from current ones.
+"""
 import sys
 import os
 import argparse
+import hashlib
+import json
 import numpy as np
 
-from pyeasyfloat.rounding import round_raw_float
-from pyeasyfloat.float import FloatPoint
-from pyeasyfloat.exp import pow2_pwl
+from pyeasyfloat.exp import pwl_coefficients
+from pyeasyfloat.softmax import attention_scale
+from pyeasyfloat.golden import reference_files, reference_version
+
+# bump when the layout of the generated files changes
+GRID_VERSION = 2
+MANIFEST = 'manifest.json'
+
+
+def grid_files(formats: list[tuple[int, int]], pieces: list[int], dks: list[int]) -> dict[str, tuple]:
+    """file name -> (constant type, ew, mw, pwl pieces or dk)"""
+    files = {}
+    for ew, mw in formats:
+        for p in pieces:
+            for kind in ('slopes', 'intercepts'):
+                files[f'{kind}_e{ew}m{mw}_p{p}.mem'] = (kind, ew, mw, p)
+        for dk in dks:
+            files[f'attentionScale_e{ew}m{mw}_dk{dk}.mem'] = ('attentionScale', ew, mw, dk)
+    return files
+
+
+def grid_values(configs: list[tuple]) -> list[np.ndarray]:
+    """Bits of the constants of each config, from the same functions as the single-constant mode"""
+    res = []
+    for kind, ew, mw, param in configs:
+        match kind:
+            case 'slopes' | 'intercepts':
+                coeffs = pwl_coefficients(param, ew, mw, ew, mw)
+                xs = coeffs.slopes if kind == 'slopes' else coeffs.intercepts
+                res.append(np.array([x.to_bits() for x in xs], dtype=np.uint64))
+            case 'attentionScale':
+                res.append(np.array([attention_scale(param, ew, mw)], dtype=np.uint64))
+    return res
+
+
+def write_grid(out_dir: str, formats: list[tuple[int, int]], pieces: list[int], dks: list[int],
+               force: bool = False) -> tuple[int, int]:
+    """Write the .mem files of the grid that are missing or stale -> (written, skipped)"""
+    os.makedirs(out_dir, exist_ok=True)
+    manifest_path = os.path.join(out_dir, MANIFEST)
+    version = reference_version()
+    keys = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        keys = manifest.get('files', {})
+        if manifest.get('reference_version') != version:
+            # the manifest vouches for every file it lists, older ones included
+            for name in keys:
+                if os.path.exists(os.path.join(out_dir, name)):
+                    os.remove(os.path.join(out_dir, name))
+            keys = {}
+
+    def key(config):
+        return hashlib.sha256(json.dumps([*config, version, GRID_VERSION]).encode()).hexdigest()[:16]
+
+    files = grid_files(formats, pieces, dks)
+    stale = {name: config for name, config in files.items()
+             if force or keys.get(name) != key(config) or not os.path.exists(os.path.join(out_dir, name))}
+    for (name, config), bits in zip(stale.items(), grid_values(list(stale.values()))):
+        _, ew, mw, _ = config
+        digits = (1 + ew + mw + 3) // 4
+        with open(os.path.join(out_dir, name), 'w') as f:
+            f.writelines(f'{int(x):0{digits}x}\n' for x in bits)
+        keys[name] = key(config)
+    # PyFPConst rehashes reference_files (relative to the project dir) and compares with reference_version
+    project_dir = os.path.dirname(os.path.abspath(__file__))
+    manifest = {
+        'reference_version': version,
+        'reference_files': [os.path.relpath(p, project_dir) for p in reference_files()],
+        'files': keys,
+    }
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    return len(stale), len(files) - len(stale)
+
+
+def parse_format(s: str) -> tuple[int, int]:
+    ew, mw = s.split(',')
+    return int(ew), int(mw)
 
-def roundFloatToBits(x: np.float64, ew: int, mw: int) -> int:
-    fx = FloatPoint.from_bits(x.view(np.uint64), 11, 52)
-    rounded = round_raw_float(fx.to_raw(), ew, mw)
-    bits = rounded.to_bits()
-    return bits
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser()
-    parser.add_argument('type', type=str, choices=['slopes', 'intercepts', 'attentionScale'])
-    parser.add_argument('--pwl-pieces', type=int, required=False, default=8)
-    parser.add_argument('--dk', type=int, required=False, default=64)
-    parser.add_argument('--ew', type=int, required=True)
-    parser.add_argument('--mw', type=int, required=True)
+    parser.add_argument('type', type=str, choices=['slopes', 'intercepts', 'attentionScale', 'grid'])
+    parser.add_argument('--pwl-pieces', type=int, nargs='+', required=False, default=[8])
+    parser.add_argument('--dk', type=int, nargs='+', required=False, default=[64])
+    parser.add_argument('--ew', type=int)
+    parser.add_argument('--mw', type=int)
+    parser.add_argument('--formats', type=parse_format, nargs='+', help='grid formats as EW,MW')
+    parser.add_argument('--out-dir', default=os.path.join('build', 'fp_consts'))
+    parser.add_argument('--force', action='store_true', help='rewrite up to date files too')
     args = parser.parse_args()
+
+    if args.type == 'grid':
+        formats = args.formats or ([(args.ew, args.mw)] if args.ew is not None and args.mw is not None else None)
+        if not formats:
+            parser.error('grid needs --formats (or --ew and --mw)')
+        written, skipped = write_grid(args.out_dir, formats, args.pwl_pieces, args.dk, args.force)
+        print(f'{written} files written, {skipped} up to date in {args.out_dir}', file=sys.stderr)
+        sys.exit(0)
+
+    if args.ew is None or args.mw is None:
+        parser.error(f'{args.type} needs --ew and --mw')
+    if len(args.pwl_pieces) > 1 or len(args.dk) > 1:
+        parser.error(f'{args.type} takes a single --pwl-pieces and --dk, use grid for several')
     ew: int = args.ew
     mw: int = args.mw
     match args.type:
         case 'attentionScale':
-            bits = roundFloatToBits(np.log2(np.e) / np.sqrt(args.dk, dtype=np.float64), ew, mw)
+            bits = attention_scale(args.dk[0], ew, mw)
             print(f'{bits:x}')
         case 'slopes' | 'intercepts':
-            slopes, intercepts = pow2_pwl(args.pwl_pieces)
-            xs = slopes if args.type == 'slopes' else intercepts
+            coeffs = pwl_coefficients(args.pwl_pieces[0], ew, mw, ew, mw)
+            xs = coeffs.slopes if args.type == 'slopes' else coeffs.intercepts
             for x in xs:
-                bits = roundFloatToBits(x, ew, mw)
-                print(f'{bits:x}')
\ No newline at end of file
+                print(f'{x.to_bits():x}')
@@ -0,0 +1,202 @@
+"""NumPy-interoperable arrays of easyfloat numbers.
+
+An EasyFloatArray is a NumPy array of packed (ew, mw) bit patterns. NumPy
+ufuncs called on it are evaluated with easyfloat semantics (subnormals flushed,
+canonical NaN) by the vectorized engine, without per-element Python objects:
+
+    x = EasyFloatArray.from_numpy(np.random.randn(1024).astype(np.float16))
+    y = np.exp2(-abs(x)) * x + 1.0       # EasyFloatArray in E5M10
+    y.to_numpy()                         # np.float16, zero-copy
+
+Supported ufuncs: add, subtract, negative, absolute, multiply, divide,
+reciprocal and exp2; fma(a, b, c) is a separate function. Operands that are
+not EasyFloatArray are plain numbers or float arrays, rounded into the format
+of the EasyFloatArray operands first.
+"""
+import numpy as np
+from numpy.lib.mixins import NDArrayOperatorsMixin
+
+from pyeasyfloat.float import FloatPoint, RoundingMode
+from pyeasyfloat.batch import (
+    bits_dtype, unpack_bits, round_raw_float_batch, mul_batch, add_batch, fma_batch,
+)
+from pyeasyfloat.backend import BaseFPBackend, get_backend
+from pyeasyfloat.fma import fma as fma_scalar, mul as mul_scalar
+
+# numpy float dtypes that share their bit layout with a (ew, mw) format
+NUMPY_FORMATS = {(5, 10): np.float16, (8, 23): np.float32, (11, 52): np.float64}
+
+# backend evaluating div, reciprocal and exp2. With "table", reciprocal and
+# exp2 of formats up to 16 bits are table lookups; divide, and the wider
+# formats, use the vectorized batch engine of PyEasyFloatBackend
+BACKEND = "table"
+_backends: dict[str, BaseFPBackend] = {}
+
+
+def _backend() -> BaseFPBackend:
+    backend = _backends.get(BACKEND)
+    if backend is None:
+        backend = _backends[BACKEND] = get_backend(BACKEND)
+    return backend
+
+
+def round_float64(x: np.ndarray, ew: int, mw: int, rm: RoundingMode = RoundingMode.RNE) -> np.ndarray:
+    """Packed (ew, mw) bits of float64 values, rounded like round_raw_float"""
+    raw = unpack_bits(np.asarray(x, dtype=np.float64).view(np.uint64), 11, 52)
+    return round_raw_float_batch(raw, ew, mw, rm)
+
+
+class EasyFloatArray(NDArrayOperatorsMixin):
+    """Packed (ew, mw) floats in a contiguous NumPy buffer of bits_dtype(ew, mw)"""
+    bits: np.ndarray
+    ew: int
+    mw: int
+
+    def __init__(self, bits: np.ndarray, ew: int, mw: int):
+        # not ascontiguousarray, which turns 0-d scalars into 1-element arrays
+        self.bits = np.asarray(bits, dtype=bits_dtype(ew, mw), order="C")
+        self.ew = ew
+        self.mw = mw
+
+    @classmethod
+    def from_numpy(cls, x: np.ndarray, ew: int | None = None, mw: int | None = None,
+                   rm: RoundingMode = RoundingMode.RNE) -> "EasyFloatArray":
+        """Wrap a float array. The format defaults to that of x's dtype, in which
+        case the bits are shared with x; other formats are rounded through float64."""
+        x = np.asarray(x)
+        if ew is None or mw is None:
+            fmt = next((fmt for fmt, dtype in NUMPY_FORMATS.items() if dtype == x.dtype), None)
+            if fmt is None:
+                raise ValueError(f"No easyfloat format matches {x.dtype}, pass ew and mw")
+            ew, mw = fmt
+        # np.dtype(None) is float64, so a missing dtype must not reach the comparison
+        dtype = NUMPY_FORMATS.get((ew, mw))
+        if dtype is not None and x.dtype == dtype:
+            return cls(x.view(bits_dtype(ew, mw)), ew, mw)
+        return cls(round_float64(x.astype(np.float64), ew, mw, rm), ew, mw)
+
+    def to_numpy(self) -> np.ndarray:
+        """As the matching numpy dtype (zero-copy) if there is one, else exactly as float64"""
+        dtype = NUMPY_FORMATS.get((self.ew, self.mw))
+        if dtype is not None:
+            return self.bits.view(dtype)
+        raw = unpack_bits(self.bits, self.ew, self.mw)
+        return round_raw_float_batch(raw, 11, 52).view(np.float64)
+
+    def __array__(self, dtype=None, copy=None):
+        x = self.to_numpy()
+        if copy:
+            x = x.copy()
+        return x if dtype is None else x.astype(dtype)
+
+    @property
+    def shape(self) -> tuple[int, ...]:
+        return self.bits.shape
+
+    @property
+    def ndim(self) -> int:
+        return self.bits.ndim
+
+    @property
+    def size(self) -> int:
+        return self.bits.size
+
+    def __len__(self) -> int:
+        return len(self.bits)
+
+    def __getitem__(self, index) -> "EasyFloatArray":
+        return EasyFloatArray(self.bits[index], self.ew, self.mw)
+
+    def __setitem__(self, index, value):
+        self.bits[index] = self._coerce(value).bits
+
+    def float_point(self, index) -> FloatPoint:
+        return FloatPoint.from_bits(int(self.bits[index]), self.ew, self.mw)
+
+    def reshape(self, *shape) -> "EasyFloatArray":
+        return EasyFloatArray(self.bits.reshape(*shape), self.ew, self.mw)
+
+    def __repr__(self):
+        return f"EasyFloatArray({self.to_numpy()!r}, ew={self.ew}, mw={self.mw})"
+
+    def _coerce(self, x) -> "EasyFloatArray":
+        """x in this array's format"""
+        if isinstance(x, EasyFloatArray):
+            if (x.ew, x.mw) != (self.ew, self.mw):
+                raise ValueError(f"Mixed formats E={x.ew} M={x.mw} and E={self.ew} M={self.mw}")
+            return x
+        if isinstance(x, FloatPoint):
+            if (x.ew, x.mw) == (self.ew, self.mw):
+                return EasyFloatArray(np.array(x.to_bits()), self.ew, self.mw)
+            x = x.to_numpy()
+        return EasyFloatArray.from_numpy(x, self.ew, self.mw)
+
+    def exp2(self, pwl_mul: tuple[int, int] | None = None, pwl_add: tuple[int, int] | None = None,
+             pwl_pieces: int = 8) -> "EasyFloatArray":
+        """2^x for x <= 0 through the PWL datapath, with mul/add formats defaulting to the array's"""
+        ew, mw = self.ew, self.mw
+        pwl_mul = pwl_mul or (ew, mw)
+        pwl_add = pwl_add or (ew, mw)
+        return _apply(lambda x: _backend().exp2_batch(x, ew, mw, ew, mw, *pwl_mul, *pwl_add, pwl_pieces),
+                      [self.bits], ew, mw)
+
+    def __array_ufunc__(self, ufunc, method, *inputs, **kwargs):
+        if method != "__call__" or kwargs:
+            return NotImplemented
+        ew, mw = self.ew, self.mw
+        args = [self._coerce(x).bits for x in inputs]
+        sign_bit = bits_dtype(ew, mw)(1 << (ew + mw))
+        match ufunc:
+            case np.add:
+                return _binary(add_batch, None, args, ew, mw)
+            case np.subtract:
+                return _binary(add_batch, None, [args[0], args[1] ^ sign_bit], ew, mw)
+            case np.multiply:
+                return _binary(mul_batch, mul_scalar, args, ew, mw)
+            case np.negative:
+                return EasyFloatArray(args[0] ^ sign_bit, ew, mw)
+            case np.absolute:
+                return EasyFloatArray(args[0] & ~sign_bit, ew, mw)
+            case np.divide:
+                return _apply(lambda x, y: _backend().div_batch(x, y, ew, mw), args, ew, mw)
+            case np.reciprocal:
+                return _apply(lambda x: _backend().reciprocal_batch(x, ew, mw), args, ew, mw)
+            case np.exp2:
+                return EasyFloatArray(args[0], ew, mw).exp2()
+        return NotImplemented
+
+
+def _apply(fn, args: list[np.ndarray], ew: int, mw: int) -> EasyFloatArray:
+    """Run a flat batch function over broadcast operands"""
+    args = np.broadcast_arrays(*args)
+    shape = args[0].shape
+    res = fn(*(np.ascontiguousarray(a).reshape(-1) for a in args))
+    return EasyFloatArray(np.asarray(res).reshape(shape), ew, mw)
+
+
+def _scalar_map(fn, args: list[np.ndarray], ew: int, mw: int, rm: RoundingMode) -> np.ndarray:
+    """Elementwise scalar reference, for formats too wide for the batch engine"""
+    res = [fn(*(FloatPoint.from_bits(v, ew, mw) for v in vs), ew, mw, rm).to_bits()
+           for vs in zip(*(a.tolist() for a in args))]
+    return np.array(res, dtype=bits_dtype(ew, mw))
+
+
+def _binary(batch, scalar, args: list[np.ndarray], ew: int, mw: int,
+            rm: RoundingMode = RoundingMode.RNE) -> EasyFloatArray:
+    def run(*flat):
+        try:
+            return batch(*flat, ew, mw, rm)
+        except ValueError:
+            if scalar is None:
+                raise
+            return _scalar_map(scalar, list(flat), ew, mw, rm)
+    return _apply(run, args, ew, mw)
+
+
+def fma(a, b, c, rm: RoundingMode = RoundingMode.RNE) -> EasyFloatArray:
+    """a * b + c with a single rounding, in the format of the EasyFloatArray operands"""
+    ref = next((x for x in (a, b, c) if isinstance(x, EasyFloatArray)), None)
+    if ref is None:
+        raise TypeError("fma needs at least one EasyFloatArray operand")
+    args = [ref._coerce(x).bits for x in (a, b, c)]
+    return _binary(fma_batch, fma_scalar, args, ref.ew, ref.mw, rm)
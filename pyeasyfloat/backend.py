@@ -1,10 +1,14 @@
 from abc import ABC
+import importlib
+import os
+import numpy as np
 from pyeasyfloat.fma import fma
+from pyeasyfloat.batch import fma_batch, pow2_batch, div_batch, reciprocal_batch, bits_dtype
 from pyeasyfloat.exp import pow2
 from pyeasyfloat.reciprocal import reciprocal
-from pyeasyfloat.div import div
+from pyeasyfloat.div import div, iter_cycles
 from pyeasyfloat.float import FloatPoint
-from pyverilator import PyVerilator
+from pyeasyfloat.table import reciprocal_table, pow2_table, MAX_TABLE_BITS
 
 class BaseFPBackend(ABC):
     def fma(self, a: FloatPoint, b: FloatPoint, c: FloatPoint, targetExpWidth: int, targetMantissaWidth: int) -> FloatPoint:
@@ -24,6 +28,48 @@ class BaseFPBackend(ABC):
     def div(self, x: FloatPoint, y: FloatPoint) -> FloatPoint:
         pass
 
+    def fma_batch(self, a: np.ndarray, b: np.ndarray, c: np.ndarray,
+                  mulExpWidth: int, mulMantissaWidth: int,
+                  addExpWidth: int, addMantissaWidth: int) -> np.ndarray:
+        """elementwise a * b + c over packed bit arrays, in precision of c"""
+        ret = np.empty(np.shape(c), dtype=bits_dtype(addExpWidth, addMantissaWidth))
+        for i, (x, y, z) in enumerate(zip(a, b, c)):
+            ret[i] = self.fma(FloatPoint.from_bits(x, mulExpWidth, mulMantissaWidth),
+                              FloatPoint.from_bits(y, mulExpWidth, mulMantissaWidth),
+                              FloatPoint.from_bits(z, addExpWidth, addMantissaWidth),
+                              addExpWidth, addMantissaWidth).to_bits()
+        return ret
+
+    def exp2_batch(self, x: np.ndarray, expWidth: int, mantissaWidth: int,
+                   targetExpWidth: int, targetMantissaWidth: int,
+                   pwlMulExpWidth: int, pwlMulMantissaWidth: int,
+                   pwlAddExpWidth: int, pwlAddMantissaWidth: int,
+                   pwlPieces: int = 8
+                   ) -> np.ndarray:
+        """elementwise exp2 over packed (expWidth, mantissaWidth) bit arrays"""
+        ret = np.empty(np.shape(x), dtype=bits_dtype(targetExpWidth, targetMantissaWidth))
+        for i, v in enumerate(x):
+            ret[i] = self.exp2(FloatPoint.from_bits(v, expWidth, mantissaWidth),
+                               targetExpWidth, targetMantissaWidth,
+                               pwlMulExpWidth, pwlMulMantissaWidth,
+                               pwlAddExpWidth, pwlAddMantissaWidth, pwlPieces).to_bits()
+        return ret
+
+    def reciprocal_batch(self, x: np.ndarray, expWidth: int, mantissaWidth: int) -> np.ndarray:
+        """elementwise reciprocal over packed (expWidth, mantissaWidth) bit arrays"""
+        ret = np.empty(np.shape(x), dtype=bits_dtype(expWidth, mantissaWidth))
+        for i, v in enumerate(x):
+            ret[i] = self.reciprocal(FloatPoint.from_bits(v, expWidth, mantissaWidth)).to_bits()
+        return ret
+
+    def div_batch(self, x: np.ndarray, y: np.ndarray, expWidth: int, mantissaWidth: int) -> np.ndarray:
+        """elementwise x / y over packed (expWidth, mantissaWidth) bit arrays"""
+        ret = np.empty(np.shape(x), dtype=bits_dtype(expWidth, mantissaWidth))
+        for i, (u, v) in enumerate(zip(x, y)):
+            ret[i] = self.div(FloatPoint.from_bits(u, expWidth, mantissaWidth),
+                              FloatPoint.from_bits(v, expWidth, mantissaWidth)).to_bits()
+        return ret
+
 
 class PyEasyFloatBackend(BaseFPBackend):
 
@@ -50,11 +96,117 @@ class PyEasyFloatBackend(BaseFPBackend):
     def div(self, x: FloatPoint, y: FloatPoint) -> FloatPoint:
         return div(x, y)
 
+    def fma_batch(self, a: np.ndarray, b: np.ndarray, c: np.ndarray,
+                  mulExpWidth: int, mulMantissaWidth: int,
+                  addExpWidth: int, addMantissaWidth: int) -> np.ndarray:
+        try:
+            return fma_batch(a, b, c, mulExpWidth, mulMantissaWidth,
+                             add_ew=addExpWidth, add_mw=addMantissaWidth)
+        except ValueError:
+            # formats too wide for the 64-bit vectorized engine
+            return super().fma_batch(a, b, c, mulExpWidth, mulMantissaWidth, addExpWidth, addMantissaWidth)
+
+    def exp2_batch(self, x: np.ndarray, expWidth: int, mantissaWidth: int,
+                   targetExpWidth: int, targetMantissaWidth: int,
+                   pwlMulExpWidth: int, pwlMulMantissaWidth: int,
+                   pwlAddExpWidth: int, pwlAddMantissaWidth: int,
+                   pwlPieces: int = 8
+                   ) -> np.ndarray:
+        try:
+            return pow2_batch(x, expWidth, mantissaWidth,
+                              targetExpWidth, targetMantissaWidth,
+                              pwlMulExpWidth, pwlMulMantissaWidth,
+                              pwlAddExpWidth, pwlAddMantissaWidth, pwl_pieces=pwlPieces)
+        except ValueError:
+            # formats too wide for the 64-bit vectorized engine
+            return super().exp2_batch(x, expWidth, mantissaWidth,
+                                      targetExpWidth, targetMantissaWidth,
+                                      pwlMulExpWidth, pwlMulMantissaWidth,
+                                      pwlAddExpWidth, pwlAddMantissaWidth, pwlPieces)
+
+    def reciprocal_batch(self, x: np.ndarray, expWidth: int, mantissaWidth: int) -> np.ndarray:
+        try:
+            return reciprocal_batch(x, expWidth, mantissaWidth)
+        except ValueError:
+            # formats too wide for the 64-bit vectorized engine
+            return super().reciprocal_batch(x, expWidth, mantissaWidth)
+
+    def div_batch(self, x: np.ndarray, y: np.ndarray, expWidth: int, mantissaWidth: int) -> np.ndarray:
+        try:
+            return div_batch(x, y, expWidth, mantissaWidth)
+        except ValueError:
+            # formats too wide for the 64-bit vectorized engine
+            return super().div_batch(x, y, expWidth, mantissaWidth)
+
+class TableBackend(PyEasyFloatBackend):
+    """PyEasyFloatBackend answering unary ops on <= 16 bit formats from lookup tables."""
+
+    def __init__(self):
+        super().__init__()
+
+    def exp2(self, x: FloatPoint, targetExpWidth: int, targetMantissaWidth: int,
+             pwlMulExpWidth: int, pwlMulMantissaWidth: int,
+             pwlAddExpWidth: int, pwlAddMantissaWidth: int,
+             pwlPieces: int = 8
+             ) -> FloatPoint:
+        if 1 + x.ew + x.mw > MAX_TABLE_BITS:
+            return super().exp2(x, targetExpWidth, targetMantissaWidth,
+                                pwlMulExpWidth, pwlMulMantissaWidth,
+                                pwlAddExpWidth, pwlAddMantissaWidth, pwlPieces)
+        table = pow2_table(x.ew, x.mw,
+                           targetExpWidth, targetMantissaWidth,
+                           pwlMulExpWidth, pwlMulMantissaWidth,
+                           pwlAddExpWidth, pwlAddMantissaWidth, pwl_pieces=pwlPieces)
+        return table(x)
+
+    def reciprocal(self, x: FloatPoint) -> FloatPoint:
+        if 1 + x.ew + x.mw > MAX_TABLE_BITS:
+            return super().reciprocal(x)
+        return reciprocal_table(x.ew, x.mw)(x)
+
+    def exp2_batch(self, x: np.ndarray, expWidth: int, mantissaWidth: int,
+                   targetExpWidth: int, targetMantissaWidth: int,
+                   pwlMulExpWidth: int, pwlMulMantissaWidth: int,
+                   pwlAddExpWidth: int, pwlAddMantissaWidth: int,
+                   pwlPieces: int = 8
+                   ) -> np.ndarray:
+        if 1 + expWidth + mantissaWidth > MAX_TABLE_BITS:
+            return super().exp2_batch(x, expWidth, mantissaWidth,
+                                      targetExpWidth, targetMantissaWidth,
+                                      pwlMulExpWidth, pwlMulMantissaWidth,
+                                      pwlAddExpWidth, pwlAddMantissaWidth, pwlPieces)
+        table = pow2_table(expWidth, mantissaWidth,
+                           targetExpWidth, targetMantissaWidth,
+                           pwlMulExpWidth, pwlMulMantissaWidth,
+                           pwlAddExpWidth, pwlAddMantissaWidth, pwl_pieces=pwlPieces)
+        return table.lookup(x)
+
+    def reciprocal_batch(self, x: np.ndarray, expWidth: int, mantissaWidth: int) -> np.ndarray:
+        if 1 + expWidth + mantissaWidth > MAX_TABLE_BITS:
+            return super().reciprocal_batch(x, expWidth, mantissaWidth)
+        return reciprocal_table(expWidth, mantissaWidth).lookup(x)
+
+# where PyVerilator.build writes the model of a design
+VERILATOR_BUILD_DIR = "obj_dir"
+
+def verilator_so_file(svTopFile: str, buildDir: str = VERILATOR_BUILD_DIR) -> str:
+    """Shared object PyVerilator.build(svTopFile, build_dir=buildDir) writes: buildDir/V<module>"""
+    module = os.path.splitext(os.path.basename(svTopFile))[0]
+    return os.path.abspath(os.path.join(buildDir, "V" + module))
+
 class HwBackend(BaseFPBackend):
 
-    def __init__(self, svTopFile: str):
+    def __init__(self, svTopFile: str, divBitsPerCycle: int = 2, soFile: str | None = None):
         super().__init__()
-        self.sim = PyVerilator.build(svTopFile)
+        # bitsPerCycle the Div module was generated with
+        self.divBitsPerCycle = divBitsPerCycle
+        # imported here so the pure-Python backends work without pyverilator
+        from pyverilator import PyVerilator
+        if soFile is None:
+            self.sim = PyVerilator.build(svTopFile, build_dir=VERILATOR_BUILD_DIR)
+        else:
+            # load a model already built from svTopFile, see HwBackendPool
+            self.sim = PyVerilator(soFile)
         self.sim.io.reset = 1
         self.sim.clock.tick()
         self.sim.io.reset = 0
@@ -104,3 +256,234 @@ class HwBackend(BaseFPBackend):
         ret = self.sim.io.io_out
         self.sim.clock.tick()
         return FloatPoint.from_bits(ret, x.ew, x.mw)
+
+    # The batch methods below drive the simulator with hoisted attribute
+    # lookups and plain Python ints, which is where the per-element time goes.
+
+    def fma_batch(self, a: np.ndarray, b: np.ndarray, c: np.ndarray,
+                  mulExpWidth: int, mulMantissaWidth: int,
+                  addExpWidth: int, addMantissaWidth: int) -> np.ndarray:
+        io = self.sim.io
+        io.io_in_exp2 = 0
+        ret = []
+        for x, y, z in zip(np.asarray(a).tolist(), np.asarray(b).tolist(), np.asarray(c).tolist()):
+            io.io_in_a = x
+            io.io_in_b = y
+            io.io_in_c = z
+            ret.append(io.io_out)
+        return np.array(ret, dtype=bits_dtype(addExpWidth, addMantissaWidth))
+
+    def exp2_batch(self, x: np.ndarray, expWidth: int, mantissaWidth: int,
+                   targetExpWidth: int, targetMantissaWidth: int,
+                   pwlMulExpWidth: int, pwlMulMantissaWidth: int,
+                   pwlAddExpWidth: int, pwlAddMantissaWidth: int,
+                   pwlPieces: int = 8
+                   ) -> np.ndarray:
+        io = self.sim.io
+        io.io_in_exp2 = 1
+        io.io_in_b = 0
+        io.io_in_c = 0
+        ret = []
+        for v in np.asarray(x).tolist():
+            io.io_in_a = v
+            ret.append(io.io_out)
+        return np.array(ret, dtype=bits_dtype(targetExpWidth, targetMantissaWidth))
+
+    def reciprocal_batch(self, x: np.ndarray, expWidth: int, mantissaWidth: int) -> np.ndarray:
+        io = self.sim.io
+        tick = self.sim.clock.tick
+        ret = []
+        for v in np.asarray(x).tolist():
+            io.io_in_reciprocal = 1
+            io.io_in_a = v
+            while not io.io_out_reciprocal:
+                tick()
+            ret.append(io.io_out)
+            io.io_in_reciprocal = 0
+            tick()
+        return np.array(ret, dtype=bits_dtype(expWidth, mantissaWidth))
+
+    def div_batch(self, x: np.ndarray, y: np.ndarray, expWidth: int, mantissaWidth: int) -> np.ndarray:
+        io = self.sim.io
+        tick = self.sim.clock.tick
+        # Div.nCycles = 1 cycle to accept + iterCycles + 1 cycle to return to idle
+        n_iter = iter_cycles(mantissaWidth, self.divBitsPerCycle)
+        ret = []
+        for u, v in zip(np.asarray(x).tolist(), np.asarray(y).tolist()):
+            io.io_in_a = u
+            io.io_in_b = v
+            io.io_in_valid = 1
+            tick()
+            io.io_in_valid = 0
+            for _ in range(n_iter):
+                tick()
+            assert io.io_out_valid, f"Div did not finish in {n_iter} cycles, check divBitsPerCycle"
+            ret.append(io.io_out)
+            tick()
+        return np.array(ret, dtype=bits_dtype(expWidth, mantissaWidth))
+
+
+# backend owned by a BackendPool worker process, set up once by _init_pool_worker
+_pool_backend: BaseFPBackend | None = None
+
+def _init_pool_worker(name: str, args: tuple):
+    global _pool_backend
+    _pool_backend = get_backend(name, *args)
+
+def _run_pool_chunk(method: str, inputs: list[tuple[str, str]], output: tuple[str, str],
+                    n: int, lo: int, hi: int, args: tuple):
+    """Run `method` on elements [lo, hi) of the shared input arrays, writing into the shared output"""
+    from multiprocessing.shared_memory import SharedMemory
+    shms = [SharedMemory(name, track=False) for name, _ in inputs + [output]]
+    try:
+        arrays = [np.ndarray((n,), dtype, buffer=shm.buf)
+                  for shm, (_, dtype) in zip(shms, inputs + [output])]
+        *xs, out = arrays
+        out[lo:hi] = getattr(_pool_backend, method)(*(x[lo:hi] for x in xs), *args)
+        # views must be gone before the buffers can be closed
+        del arrays, xs, out
+    finally:
+        for shm in shms:
+            shm.close()
+
+class BackendPool(BaseFPBackend):
+    """Runs the batch methods of `nWorkers` instances of a backend, each in its own process.
+
+    Operands and results are passed through shared memory as packed bits and
+    every call is split into contiguous chunks, so results come back in order.
+    The scalar methods go through the batch ones, so a pool can stand in for
+    a single backend anywhere.
+    """
+
+    def __init__(self, name: str, *args, nWorkers: int | None = None):
+        super().__init__()
+        # imported here: concurrent.futures.process is a large share of this module's import time
+        from concurrent.futures import ProcessPoolExecutor
+        self.nWorkers = nWorkers or os.cpu_count()
+        self.pool = ProcessPoolExecutor(self.nWorkers, initializer=_init_pool_worker, initargs=(name, args))
+
+    def close(self):
+        self.pool.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _map(self, method: str, inputs: list[np.ndarray], out_dtype: np.dtype, *args) -> np.ndarray:
+        from multiprocessing.shared_memory import SharedMemory
+        inputs = [np.ascontiguousarray(x) for x in inputs]
+        n = len(inputs[0])
+        out_dtype = np.dtype(out_dtype)
+        if n == 0:
+            return np.empty(0, dtype=out_dtype)
+        shms = []
+        try:
+            for x in inputs:
+                shm = SharedMemory(create=True, size=max(x.nbytes, 1))
+                shms.append(shm)
+                np.ndarray(x.shape, x.dtype, buffer=shm.buf)[:] = x
+            out_shm = SharedMemory(create=True, size=n * out_dtype.itemsize)
+            shms.append(out_shm)
+            names = [(shm.name, x.dtype.str) for shm, x in zip(shms, inputs)]
+            # a few chunks per worker so that uneven chunks (e.g. reciprocal latency) even out
+            bounds = np.linspace(0, n, min(n, 4 * self.nWorkers) + 1, dtype=np.int64).tolist()
+            futures = [self.pool.submit(_run_pool_chunk, method, names, (out_shm.name, out_dtype.str),
+                                        n, lo, hi, args)
+                       for lo, hi in zip(bounds, bounds[1:])]
+            for f in futures:
+                f.result()
+            return np.ndarray((n,), out_dtype, buffer=out_shm.buf).copy()
+        finally:
+            for shm in shms:
+                shm.close()
+                shm.unlink()
+
+    def fma(self, a: FloatPoint, b: FloatPoint, c: FloatPoint, targetExpWidth: int, targetMantissaWidth: int) -> FloatPoint:
+        ret = self.fma_batch(np.array([a.to_bits()]), np.array([b.to_bits()]), np.array([c.to_bits()]),
+                             a.ew, a.mw, c.ew, c.mw)
+        return FloatPoint.from_bits(int(ret[0]), c.ew, c.mw)
+
+    def exp2(self, x: FloatPoint, targetExpWidth: int, targetMantissaWidth: int,
+             pwlMulExpWidth: int, pwlMulMantissaWidth: int,
+             pwlAddExpWidth: int, pwlAddMantissaWidth: int,
+             pwlPieces: int = 8
+             ) -> FloatPoint:
+        ret = self.exp2_batch(np.array([x.to_bits()]), x.ew, x.mw, targetExpWidth, targetMantissaWidth,
+                              pwlMulExpWidth, pwlMulMantissaWidth, pwlAddExpWidth, pwlAddMantissaWidth, pwlPieces)
+        return FloatPoint.from_bits(int(ret[0]), targetExpWidth, targetMantissaWidth)
+
+    def reciprocal(self, x: FloatPoint) -> FloatPoint:
+        ret = self.reciprocal_batch(np.array([x.to_bits()]), x.ew, x.mw)
+        return FloatPoint.from_bits(int(ret[0]), x.ew, x.mw)
+
+    def div(self, x: FloatPoint, y: FloatPoint) -> FloatPoint:
+        ret = self.div_batch(np.array([x.to_bits()]), np.array([y.to_bits()]), x.ew, x.mw)
+        return FloatPoint.from_bits(int(ret[0]), x.ew, x.mw)
+
+    def fma_batch(self, a: np.ndarray, b: np.ndarray, c: np.ndarray,
+                  mulExpWidth: int, mulMantissaWidth: int,
+                  addExpWidth: int, addMantissaWidth: int) -> np.ndarray:
+        return self._map("fma_batch", [a, b, c], bits_dtype(addExpWidth, addMantissaWidth),
+                         mulExpWidth, mulMantissaWidth, addExpWidth, addMantissaWidth)
+
+    def exp2_batch(self, x: np.ndarray, expWidth: int, mantissaWidth: int,
+                   targetExpWidth: int, targetMantissaWidth: int,
+                   pwlMulExpWidth: int, pwlMulMantissaWidth: int,
+                   pwlAddExpWidth: int, pwlAddMantissaWidth: int,
+                   pwlPieces: int = 8
+                   ) -> np.ndarray:
+        return self._map("exp2_batch", [x], bits_dtype(targetExpWidth, targetMantissaWidth),
+                         expWidth, mantissaWidth, targetExpWidth, targetMantissaWidth,
+                         pwlMulExpWidth, pwlMulMantissaWidth, pwlAddExpWidth, pwlAddMantissaWidth, pwlPieces)
+
+    def reciprocal_batch(self, x: np.ndarray, expWidth: int, mantissaWidth: int) -> np.ndarray:
+        return self._map("reciprocal_batch", [x], bits_dtype(expWidth, mantissaWidth), expWidth, mantissaWidth)
+
+    def div_batch(self, x: np.ndarray, y: np.ndarray, expWidth: int, mantissaWidth: int) -> np.ndarray:
+        return self._map("div_batch", [x, y], bits_dtype(expWidth, mantissaWidth), expWidth, mantissaWidth)
+
+class HwBackendPool(BackendPool):
+    """`nWorkers` Verilator simulators of the same design, each reset like HwBackend.
+
+    The model is built once here and only loaded by the workers, so they do
+    not race on the build directory.
+    """
+
+    def __init__(self, svTopFile: str, divBitsPerCycle: int = 2, nWorkers: int | None = None):
+        from pyverilator import PyVerilator
+        # PyVerilator has no build-only entry point, the simulator it returns is dropped
+        PyVerilator.build(svTopFile, build_dir=VERILATOR_BUILD_DIR)
+        super().__init__("verilator", svTopFile, divBitsPerCycle, verilator_so_file(svTopFile), nWorkers=nWorkers)
+
+
+# name -> backend class, or "module:attribute" to import it from on first use
+_BACKENDS: dict[str, type[BaseFPBackend] | str] = {
+    "py": PyEasyFloatBackend,
+    "table": TableBackend,
+    "verilator": HwBackend,
+    "verilator-pool": HwBackendPool,
+}
+
+def register_backend(name: str, backend: type[BaseFPBackend] | str):
+    """Register a backend class under `name`.
+
+    Pass a "module:attribute" string to defer importing the module until the
+    backend is first requested.
+    """
+    _BACKENDS[name] = backend
+
+def backend_class(name: str) -> type[BaseFPBackend]:
+    try:
+        backend = _BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown backend: {name}, choose from {sorted(_BACKENDS)}") from None
+    if isinstance(backend, str):
+        module, _, attr = backend.partition(":")
+        backend = _BACKENDS[name] = getattr(importlib.import_module(module), attr)
+    return backend
+
+def get_backend(name: str, *args, **kwargs) -> BaseFPBackend:
+    """Instantiate the backend registered as `name`, e.g. get_backend("verilator", "Div.sv")"""
+    return backend_class(name)(*args, **kwargs)
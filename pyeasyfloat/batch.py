@@ -0,0 +1,441 @@
+"""Vectorized counterparts of the scalar routines in `fma.py`, `rounding.py`, `exp.py`,
+`div.py` and `reciprocal.py`.
+
+Operands are packed IEEE bit patterns held in unsigned NumPy arrays. Every
+function here is bit-exact with its scalar counterpart, so the scalar code
+stays the reference and this module is only a faster way to evaluate it.
+"""
+import functools
+import numpy as np
+from pyeasyfloat.float import RoundingMode
+from pyeasyfloat.exp import N_PIECES, PWL_CACHE_SIZE, pwl_coefficients
+from pyeasyfloat.reciprocal import max_iterations, seed_table
+
+_ONE = np.uint64(1)
+# width of the fixed-point window used by add_unrounded_batch
+_WINDOW = 64
+# elements per pass of pow2_batch
+_CHUNK = 1 << 14
+
+
+def bits_dtype(ew: int, mw: int) -> type[np.unsignedinteger]:
+    """Smallest unsigned dtype able to hold a packed (ew, mw) float."""
+    width = 1 + ew + mw
+    for dtype in (np.uint8, np.uint16, np.uint32, np.uint64):
+        if width <= np.iinfo(dtype).bits:
+            return dtype
+    raise ValueError(f"Unsupported float point format E={ew} M={mw}")
+
+
+def normal_bits(ew: int, mw: int, positive: bool = True, negative: bool = True) -> np.ndarray:
+    """Bit patterns of all normal numbers, in the order of FloatPoint.get_all_normal_numbers."""
+    magnitudes = np.arange(1 << mw, ((1 << ew) - 1) << mw, dtype=np.uint64)
+    signs = [sign for sign, keep in [(0, positive), (1, negative)] if keep]
+    parts = [magnitudes | np.uint64(sign << (ew + mw)) for sign in signs]
+    return np.concatenate(parts).astype(bits_dtype(ew, mw)) if parts else np.empty(0, bits_dtype(ew, mw))
+
+
+def mask(n: int | np.ndarray) -> np.uint64 | np.ndarray:
+    """(1 << n) - 1 for 0 <= n < 64, elementwise."""
+    return (_ONE << np.asarray(n, dtype=np.uint64)) - _ONE
+
+
+def bit_length(x: np.ndarray) -> np.ndarray:
+    """Elementwise int.bit_length() of a uint64 array."""
+    x = np.asarray(x, dtype=np.uint64)
+    _, e = np.frexp(x.astype(np.float64))
+    e = e.astype(np.uint64)
+    # the float conversion may round up to the next power of two
+    too_big = (e > 0) & ((x >> np.where(e > 0, e - _ONE, 0).astype(np.uint64)) == 0)
+    return e - too_big.astype(np.uint64)
+
+
+class RawFloatBatch:
+    """Array counterpart of RawFloatPoint.
+
+    Unlike the scalar class, every mantissa is normalized to the same `width`
+    (hidden bit at position width - 1) and `exp` is the exponent of that bit.
+    Trailing zeros never change rounding, so this is value-equivalent to the
+    variable-width mantissas produced by the scalar code.
+    """
+    sign: np.ndarray
+    exp: np.ndarray
+    mantissa: np.ndarray
+    width: int
+
+    is_zero: np.ndarray
+    is_inf: np.ndarray
+    is_nan: np.ndarray
+
+    def __repr__(self):
+        return f"RawFloatBatch(width={self.width}, n={np.size(self.mantissa)})"
+
+
+def unpack_bits(bits: np.ndarray, ew: int, mw: int) -> RawFloatBatch:
+    """Vectorized FloatPoint.from_bits(...).to_raw()."""
+    x = np.asarray(bits).astype(np.uint64)
+    assert not np.any(x >> np.uint64(1 + ew + mw)), f"bits do not fit in E={ew} M={mw}"
+    m = x & mask(mw)
+    e = (x >> np.uint64(mw)) & mask(ew)
+    max_exp = (1 << ew) - 1
+    raw = RawFloatBatch()
+    raw.sign = ((x >> np.uint64(ew + mw)) & _ONE).astype(bool)
+    raw.exp = e.astype(np.int64) - ((1 << (ew - 1)) - 1)
+    raw.mantissa = m | (_ONE << np.uint64(mw))
+    raw.width = mw + 1
+    raw.is_inf = (e == max_exp) & (m == 0)
+    raw.is_nan = (e == max_exp) & (m != 0)
+    # subnormals are flushed to zero
+    raw.is_zero = e == 0
+    return raw
+
+
+def mul_unrounded_batch(a: RawFloatBatch, b: RawFloatBatch) -> RawFloatBatch:
+    """Vectorized mul_unrounded: the product is exact in `a.width + b.width` bits."""
+    width = a.width + b.width
+    if width > _WINDOW:
+        raise ValueError(f"product of {a.width}-bit and {b.width}-bit mantissas does not fit in 64 bits")
+    a_m = np.where(a.is_zero, np.uint64(0), a.mantissa)
+    b_m = np.where(b.is_zero, np.uint64(0), b.mantissa)
+    m_product = a_m * b_m
+    # product in [2, 4) keeps its msb at width - 1, product in [1, 2) is one bit shorter
+    carry = ((m_product >> np.uint64(width - 1)) & _ONE).astype(bool)
+
+    res = RawFloatBatch()
+    res.sign = a.sign ^ b.sign
+    res.is_zero = a.is_zero | b.is_zero
+    res.exp = np.where(res.is_zero, 0, a.exp + b.exp + carry)
+    res.mantissa = np.where(carry, m_product, m_product << _ONE)
+    res.width = width
+    res.is_nan = a.is_nan | b.is_nan | (a.is_zero & b.is_inf) | (a.is_inf & b.is_zero)
+    res.is_inf = a.is_inf | b.is_inf
+    return res
+
+
+def add_unrounded_batch(a: RawFloatBatch, b: RawFloatBatch) -> RawFloatBatch:
+    """Vectorized add_unrounded.
+
+    The scalar code aligns with unbounded integers. Here both operands live in
+    a 64-bit window: the larger one is placed at the top and the smaller one is
+    shifted right with the shifted-out bits collapsed into a dedicated sticky
+    bit. That keeps every bit above the sticky position exact, which is all
+    round_raw_float_batch needs for targets up to 60 mantissa bits.
+    """
+    m_width = max(a.width, b.width)
+    guard = _WINDOW - 1 - m_width
+    if guard < 3:
+        raise ValueError(f"{m_width}-bit mantissas are too wide for the batch adder")
+    a_m = a.mantissa << np.uint64(m_width - a.width)
+    b_m = b.mantissa << np.uint64(m_width - b.width)
+
+    a_big = a.exp > b.exp
+    big_m = np.where(a_big, a_m, b_m)
+    small_m = np.where(a_big, b_m, a_m)
+    big_exp = np.where(a_big, a.exp, b.exp)
+    shift_amt = np.minimum(big_exp - np.where(a_big, b.exp, a.exp), 63).astype(np.uint64)
+
+    big_w = big_m << np.uint64(guard)
+    small_in = small_m << np.uint64(guard - 1)
+    sticky = (small_in & mask(shift_amt)) != 0
+    small_w = ((small_in >> shift_amt) << _ONE) | sticky.astype(np.uint64)
+
+    big_sign = np.where(a_big, a.sign, b.sign)
+    small_sign = np.where(a_big, b.sign, a.sign)
+    do_sub = big_sign != small_sign
+    # with equal exponents the nominally "small" operand may be the larger one
+    small_wins = do_sub & (small_w > big_w)
+    m_sum = np.where(
+        do_sub,
+        np.where(small_wins, small_w - big_w, big_w - small_w),
+        big_w + small_w,
+    )
+    sum_sign = np.where(small_wins, small_sign, big_sign)
+    sum_zero = m_sum == 0
+    sum_bits = bit_length(m_sum)
+    norm_shift = np.where(sum_zero, 0, _WINDOW - sum_bits.astype(np.int64)).astype(np.uint64)
+    sum_m = m_sum << norm_shift
+    # the big operand's hidden bit sits at window bit m_width + guard - 1
+    sum_exp = big_exp + sum_bits.astype(np.int64) - (m_width + guard)
+
+    res = RawFloatBatch()
+    res.width = _WINDOW
+    res.is_nan = a.is_nan | b.is_nan | (a.is_inf & b.is_inf & (a.sign != b.sign))
+    res.is_inf = a.is_inf | b.is_inf
+
+    inf_case = res.is_inf
+    both_zero = ~inf_case & a.is_zero & b.is_zero
+    only_b = ~inf_case & a.is_zero & ~b.is_zero
+    only_a = ~inf_case & b.is_zero & ~a.is_zero
+    general = ~(inf_case | both_zero | only_a | only_b)
+
+    pass_shift_a = np.uint64(_WINDOW - a.width)
+    pass_shift_b = np.uint64(_WINDOW - b.width)
+    res.sign = np.select(
+        [inf_case, both_zero, only_b, only_a],
+        [np.where(a.is_inf, a.sign, b.sign), a.sign & b.sign, b.sign, a.sign],
+        default=sum_sign & ~sum_zero,
+    )
+    res.exp = np.select(
+        [only_b, only_a, general & ~sum_zero],
+        [b.exp, a.exp, sum_exp],
+        default=0,
+    )
+    res.mantissa = np.select(
+        [only_b, only_a, general],
+        [b.mantissa << pass_shift_b, a.mantissa << pass_shift_a, sum_m],
+        default=np.uint64(0),
+    )
+    res.is_zero = both_zero | (general & sum_zero)
+    return res
+
+
+def round_raw_float_batch(raw: RawFloatBatch, target_ew: int, target_mw: int,
+                          rm: RoundingMode = RoundingMode.RNE) -> np.ndarray:
+    """Vectorized round_raw_float, returning packed bits."""
+    ow = 1 + target_mw
+    if raw.width == _WINDOW and ow > _WINDOW - 4:
+        raise ValueError(f"target mantissa width {target_mw} is too wide for the batch engine")
+    if raw.width <= ow:
+        m_rounded = raw.mantissa << np.uint64(ow - raw.width)
+        carry_out = np.zeros(np.shape(m_rounded), dtype=bool)
+    else:
+        drop = raw.width - ow
+        low_bits = raw.mantissa & mask(drop)
+        m_rounded = raw.mantissa >> np.uint64(drop)
+        g = (m_rounded & _ONE).astype(bool)
+        r = ((low_bits >> np.uint64(drop - 1)) & _ONE).astype(bool)
+        sticky = (low_bits & mask(drop - 1)) != 0
+        inexact = r | sticky
+        match rm:
+            case RoundingMode.RNE:
+                roundup = r & (sticky | g)
+            case RoundingMode.RTZ:
+                roundup = np.zeros_like(r)
+            case RoundingMode.RUP:
+                roundup = inexact & ~raw.sign
+            case RoundingMode.RDN:
+                roundup = inexact & raw.sign
+            case RoundingMode.RMM:
+                roundup = r
+        m_rounded = m_rounded + roundup.astype(np.uint64)
+        carry_out = m_rounded == (_ONE << np.uint64(ow))
+
+    bias = (1 << (target_ew - 1)) - 1
+    max_exp = (1 << target_ew) - 1
+    biased_exp = raw.exp + carry_out + bias
+
+    underflow = raw.is_zero | (biased_exp <= 0)
+    overflow = raw.is_inf | (biased_exp >= max_exp)
+    exp = np.select(
+        [raw.is_nan, underflow, overflow],
+        [max_exp, 0, max_exp],
+        default=biased_exp,
+    ).astype(np.uint64)
+    mantissa = np.select(
+        [raw.is_nan, underflow | overflow],
+        [_ONE << np.uint64(target_mw - 1), np.uint64(0)],
+        default=m_rounded & mask(target_mw),
+    )
+    sign = (raw.sign & ~raw.is_nan).astype(np.uint64)
+    packed = (sign << np.uint64(target_ew + target_mw)) | (exp << np.uint64(target_mw)) | mantissa
+    return packed.astype(bits_dtype(target_ew, target_mw))
+
+
+def mul_batch(a: np.ndarray, b: np.ndarray, ew: int, mw: int,
+              rm: RoundingMode = RoundingMode.RNE) -> np.ndarray:
+    """Vectorized mul over packed (ew, mw) bit arrays."""
+    raw = mul_unrounded_batch(unpack_bits(a, ew, mw), unpack_bits(b, ew, mw))
+    return round_raw_float_batch(raw, ew, mw, rm)
+
+
+def add_batch(a: np.ndarray, b: np.ndarray, ew: int, mw: int,
+              rm: RoundingMode = RoundingMode.RNE) -> np.ndarray:
+    """Vectorized add over packed (ew, mw) bit arrays."""
+    raw = add_unrounded_batch(unpack_bits(a, ew, mw), unpack_bits(b, ew, mw))
+    return round_raw_float_batch(raw, ew, mw, rm)
+
+
+def fma_batch(a: np.ndarray, b: np.ndarray, c: np.ndarray, ew: int, mw: int,
+              rm: RoundingMode = RoundingMode.RNE,
+              add_ew: int | None = None, add_mw: int | None = None) -> np.ndarray:
+    """Vectorized fma: a * b + c over packed bit arrays.
+
+    a and b are in (ew, mw); c and the result are in (add_ew, add_mw),
+    which default to the multiplier format.
+    """
+    add_ew = ew if add_ew is None else add_ew
+    add_mw = mw if add_mw is None else add_mw
+    raw_mul = mul_unrounded_batch(unpack_bits(a, ew, mw), unpack_bits(b, ew, mw))
+    raw_add = add_unrounded_batch(raw_mul, unpack_bits(c, add_ew, add_mw))
+    return round_raw_float_batch(raw_add, add_ew, add_mw, rm)
+
+
+def take(raw: RawFloatBatch, index: np.ndarray) -> RawFloatBatch:
+    """Elements of raw at index, e.g. per-element coefficients from a small table."""
+    res = RawFloatBatch()
+    res.sign = raw.sign[index]
+    res.exp = raw.exp[index]
+    res.mantissa = raw.mantissa[index]
+    res.width = raw.width
+    res.is_zero = raw.is_zero[index]
+    res.is_inf = raw.is_inf[index]
+    res.is_nan = raw.is_nan[index]
+    return res
+
+
+def split_float_batch(x: RawFloatBatch, pwl_segments: int) -> tuple[np.ndarray, np.ndarray, RawFloatBatch]:
+    """Vectorized split_float -> (integer part, PWL segment bits, fractional part).
+
+    Integer parts that would not fit in int64 are clamped below 2^62, far
+    beyond any exponent range, so they still overflow or underflow the result.
+    """
+    lookup_bits = int(np.log2(pwl_segments))
+    w = x.width
+    if lookup_bits > w - 1:
+        raise ValueError(f"{pwl_segments} PWL segments need more than {w - 1} mantissa bits")
+    big = x.exp >= 0
+
+    # x < 1: x is its own fraction, the segment comes from its top bits if it is large enough
+    r_shift = np.minimum(np.where(big, 0, -1 - x.exp), 63).astype(np.uint64)
+    small_msb = np.where(r_shift < lookup_bits, (x.mantissa >> np.uint64(w - lookup_bits)) >> r_shift, 0)
+
+    # x >= 1: 1x.xx0 split at the binary point, the fraction renormalized
+    xf = (x.mantissa << np.clip(x.exp, 0, 63).astype(np.uint64)) & mask(w - 1)
+    big_msb = xf >> np.uint64(w - 1 - lookup_bits)
+    xf_zero = xf == 0
+    lzc = np.where(xf_zero, 0, w - bit_length(xf).astype(np.int64))
+    down = np.clip(w - 1 - x.exp, 0, w - 1).astype(np.uint64)
+    up = np.clip(x.exp - (w - 1), 0, 62 - w).astype(np.uint64)
+    xi = ((x.mantissa >> down) << up).astype(np.int64)
+
+    res = RawFloatBatch()
+    res.sign = x.sign
+    res.width = w
+    res.is_nan = x.is_nan
+    res.is_inf = x.is_inf
+    res.is_zero = np.where(big, x.is_zero | xf_zero, x.is_zero)
+    res.exp = np.where(big, np.where(xf_zero, 0, -lzc), x.exp)
+    res.mantissa = np.where(big, np.where(xf_zero, np.uint64(0), xf << lzc.astype(np.uint64)), x.mantissa)
+    xi = np.where(big, np.where(x.sign, -xi, xi), 0)
+    return xi, np.where(big, big_msb, small_msb).astype(np.int64), res
+
+
+@functools.lru_cache(maxsize=PWL_CACHE_SIZE)
+def _pwl_batches(pwl_pieces: int, pwl_mul_ew: int, pwl_mul_mw: int,
+                 pwl_add_ew: int, pwl_add_mw: int) -> tuple[RawFloatBatch, RawFloatBatch]:
+    """pwl_coefficients as (slopes, intercepts) batches, indexed by segment"""
+    coeffs = pwl_coefficients(pwl_pieces, pwl_mul_ew, pwl_mul_mw, pwl_add_ew, pwl_add_mw)
+    slopes = np.array([c.to_bits() for c in coeffs.slopes], dtype=np.uint64)
+    intercepts = np.array([c.to_bits() for c in coeffs.intercepts], dtype=np.uint64)
+    return unpack_bits(slopes, pwl_mul_ew, pwl_mul_mw), unpack_bits(intercepts, pwl_add_ew, pwl_add_mw)
+
+
+def pow2_batch(x: np.ndarray, ew: int, mw: int,
+               target_ew: int, target_mw: int,
+               pwl_mul_ew: int, pwl_mul_mw: int,
+               pwl_add_ew: int, pwl_add_mw: int,
+               rm: RoundingMode = RoundingMode.RNE,
+               pwl_pieces: int = N_PIECES) -> np.ndarray:
+    """Vectorized pow2 over packed (ew, mw) bit arrays, returning packed (target_ew, target_mw) bits.
+
+    Evaluated _CHUNK elements at a time so the temporaries stay in cache.
+    """
+    x = np.asarray(x)
+    slopes, intercepts = _pwl_batches(pwl_pieces, pwl_mul_ew, pwl_mul_mw, pwl_add_ew, pwl_add_mw)
+    out = np.empty(x.shape, dtype=bits_dtype(target_ew, target_mw))
+    flat_x, flat_out = x.reshape(-1), out.reshape(-1)
+    for lo in range(0, flat_x.size, _CHUNK):
+        xi, frac_msb, xf = split_float_batch(unpack_bits(flat_x[lo:lo + _CHUNK], ew, mw), pwl_pieces)
+        segment = pwl_pieces - 1 - frac_msb
+        raw = add_unrounded_batch(mul_unrounded_batch(xf, take(slopes, segment)), take(intercepts, segment))
+        raw.sign = np.zeros_like(raw.sign)
+        raw.exp = xi + raw.exp
+        flat_out[lo:lo + _CHUNK] = round_raw_float_batch(raw, target_ew, target_mw, rm)
+    return out
+
+
+def div_batch(x: np.ndarray, y: np.ndarray, ew: int, mw: int,
+              rm: RoundingMode = RoundingMode.RNE) -> np.ndarray:
+    """Vectorized div over packed (ew, mw) bit arrays, the quotient from a single integer division."""
+    a = unpack_bits(x, ew, mw)
+    b = unpack_bits(y, ew, mw)
+    n_pad_bits = 2 if a.width % 2 == 0 else 3
+    quotient_bits = a.width + n_pad_bits
+    if a.width + quotient_bits - 1 > _WINDOW:
+        raise ValueError(f"{a.width}-bit mantissas are too wide for the batch divider")
+    dividend = a.mantissa << np.uint64(quotient_bits - 1)
+    quotient = dividend // b.mantissa
+    sticky = (dividend - quotient * b.mantissa) != 0
+    first_q_is_zero = a.mantissa < b.mantissa
+    y_subnormal = b.is_zero & ((np.asarray(y).astype(np.uint64) & mask(mw)) != 0)
+
+    raw = RawFloatBatch()
+    raw.sign = a.sign ^ b.sign
+    raw.is_nan = a.is_nan | b.is_nan | (a.is_inf & b.is_inf)
+    raw.is_inf = y_subnormal | (b.is_zero & ~a.is_zero)
+    raw.is_zero = a.is_zero | b.is_inf
+    raw.exp = a.exp - b.exp - first_q_is_zero
+    # normalized to quotient_bits, then the sticky bit appended
+    raw.mantissa = (quotient << np.where(first_q_is_zero, 2, 1).astype(np.uint64)) | sticky.astype(np.uint64)
+    raw.width = quotient_bits + 1
+    return round_raw_float_batch(raw, ew, mw, rm)
+
+
+def reciprocal_batch(x: np.ndarray, ew: int, mw: int, seed_bits: int | None = None) -> np.ndarray:
+    """Vectorized reciprocal over packed (ew, mw) bit arrays.
+
+    Every element runs the max_iterations(mw) Newton-Raphson steps of the
+    hardware, which is the value the scalar early exit returns too. Elements
+    drop out of the loop once their r stops changing. Like pow2_batch, this
+    works on _CHUNK elements at a time.
+    """
+    x = np.asarray(x)
+    out = np.empty(x.shape, dtype=bits_dtype(ew, mw))
+    flat_x, flat_out = x.reshape(-1), out.reshape(-1)
+    for lo in range(0, flat_x.size, _CHUNK):
+        flat_out[lo:lo + _CHUNK] = _reciprocal_chunk(flat_x[lo:lo + _CHUNK], ew, mw, seed_bits)
+    return out
+
+
+def _reciprocal_chunk(x: np.ndarray, ew: int, mw: int, seed_bits: int | None) -> np.ndarray:
+    raw = unpack_bits(x, ew, mw)
+    dtype = bits_dtype(ew, mw)
+    bias = (1 << (ew - 1)) - 1
+
+    # -1.xxx, the mantissa as a negative number in [1, 2)
+    xm_raw = unpack_bits(x, ew, mw)
+    xm_raw.sign = np.ones_like(raw.sign)
+    xm_raw.exp = np.zeros_like(raw.exp)
+    xm = round_raw_float_batch(xm_raw, ew, mw)
+
+    # 2^-exp, inf for zero and zero for inf
+    xe_raw = RawFloatBatch()
+    xe_raw.sign = raw.sign
+    xe_raw.exp = -raw.exp
+    xe_raw.mantissa = np.ones(np.shape(raw.mantissa), dtype=np.uint64)
+    xe_raw.width = 1
+    xe_raw.is_nan = raw.is_nan
+    xe_raw.is_inf = raw.is_zero
+    xe_raw.is_zero = raw.is_inf
+    xe = round_raw_float_batch(xe_raw, ew, mw)
+
+    two = dtype((bias + 1) << mw)
+    if seed_bits is None:
+        r = np.full(np.shape(xm), bias << mw, dtype=dtype)
+    else:
+        seeds = np.array([s.to_bits() for s in seed_table(ew, mw, seed_bits)], dtype=dtype)
+        r = seeds[((raw.mantissa & mask(mw)) << np.uint64(seed_bits)) >> np.uint64(mw)]
+
+    # elements whose r still changes, a settled r stays settled
+    active = np.arange(np.size(r))
+    for _ in range(max_iterations(mw)):
+        r_a = r[active]
+        # 2 - r*d
+        rd = fma_batch(r_a, xm[active], np.full_like(r_a, two), ew, mw)
+        # r*(2-rd)
+        r_next = fma_batch(r_a, rd, np.zeros_like(r_a), ew, mw)
+        r[active] = r_next
+        active = active[r_next != r_a]
+        if not active.size:
+            break
+    return fma_batch(r, xe, np.zeros_like(r), ew, mw)
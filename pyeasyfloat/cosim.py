@@ -0,0 +1,286 @@
+"""Co-simulation of a DUT against a reference, with the two running concurrently.
+
+Four stages connected by bounded queues:
+
+    source -> ref -> compare
+           -> dut ->
+
+The source thread produces chunks of operands and hands each one to both the
+reference and the DUT stage, each of which evaluates `<op>_batch` on its own
+backend in its own thread. The comparator, running in the caller's thread,
+pairs their results chunk by chunk, classifies them with verify.classify and
+yields the mismatches as they are found. Queues hold at most `depth` chunks,
+so a fast stage blocks instead of buffering the whole run.
+
+PyEasyFloatBackend evaluates chunks with the vectorized batch engine, whose
+NumPy kernels can share the process with the other stages. The batch drivers
+of HwBackend, and PyEasyFloatBackend's scalar fallback for formats too wide
+for the engine (fp64), are Python loops that hold the GIL. For those, pass
+backends as (registry name, *args) tuples with processes=True to give each
+stage its own process (a one-worker BackendPool); the stage threads then only
+wait on them.
+
+    sim = CoSimulation("fma", (8, 23, 8, 23), chunks, dut=("verilator", "MulAddExp2.sv"),
+                       ref=("py",), processes=True, max_failures=10)
+    for index, operands, dut_bits, ref_bits, kind in sim:
+        print(kind.name, index, operands, hex(dut_bits), hex(ref_bits))
+    print(sim.summary, sim.stats)
+
+    python -m pyeasyfloat.cosim fma 8 23 8 23 --dut verilator MulAddExp2.sv -n 1000000 --processes
+"""
+import argparse
+import queue
+import threading
+import time
+from typing import Iterable, Iterator, Sequence
+import numpy as np
+
+from pyeasyfloat.backend import BaseFPBackend, BackendPool, get_backend
+from pyeasyfloat.batch import bits_dtype
+from pyeasyfloat.golden import OPS
+from pyeasyfloat.testfloat import random_operands
+from pyeasyfloat.verify import Mismatch, ShardSummary, classify
+
+# marks the end of a stream
+_DONE = object()
+
+
+class StageStats:
+    """Work done by a stage and where its time went"""
+    name: str
+    chunks: int
+    elements: int
+    # computing
+    busy_s: float
+    # waiting for input
+    starved_s: float
+    # waiting for room downstream
+    blocked_s: float
+
+    def __init__(self, name: str):
+        self.name = name
+        self.chunks = 0
+        self.elements = 0
+        self.busy_s = 0.0
+        self.starved_s = 0.0
+        self.blocked_s = 0.0
+
+    @property
+    def throughput(self) -> float:
+        """elements per second of busy time"""
+        return self.elements / self.busy_s if self.busy_s else 0.0
+
+    def __repr__(self):
+        return (f"{self.name}: {self.elements} in {self.chunks} chunks, {self.throughput:.0f}/s busy, "
+                f"busy {self.busy_s:.2f}s starved {self.starved_s:.2f}s blocked {self.blocked_s:.2f}s")
+
+
+def chunked(operands: Sequence[np.ndarray], size: int) -> Iterator[list[np.ndarray]]:
+    """Slices of `size` vectors of operand arrays"""
+    n = len(operands[0])
+    for lo in range(0, n, size):
+        yield [x[lo:lo + size] for x in operands]
+
+
+class CoSimulation:
+    """Iterating yields (vector index, operand bits, dut bits, ref bits, Mismatch) for
+    every result that differs from the reference. `summary` counts every kind of
+    mismatch; iteration stops early once max_failures ERRORs have been seen."""
+    stats: dict[str, StageStats]
+    summary: ShardSummary
+
+    def __init__(self, op: str, op_args: Sequence[int], source: Iterable[Sequence[np.ndarray]],
+                 dut: BaseFPBackend | tuple, ref: BaseFPBackend | tuple = ("py",),
+                 processes: bool = False, depth: int = 4, max_failures: int | None = None):
+        if op not in OPS:
+            raise ValueError(f"Unknown op {op}, choose from {list(OPS)}")
+        _, _, result_fmt = OPS[op]
+        self.method = f"{op}_batch"
+        self.op_args = tuple(op_args)
+        self.ew, self.mw = self.op_args[result_fmt:result_fmt + 2]
+        self.source = source
+        self.backends = {"dut": dut, "ref": ref}
+        self.processes = processes
+        self.depth = depth
+        self.max_failures = max_failures
+        self.stats = {name: StageStats(name) for name in ("source", "ref", "dut", "compare")}
+        self.summary = ShardSummary(max_examples=0)
+
+    def _backend(self, spec: BaseFPBackend | tuple) -> tuple[BaseFPBackend, bool]:
+        """-> (backend, whether this run owns it)"""
+        if isinstance(spec, BaseFPBackend):
+            return spec, False
+        name, *args = (spec,) if isinstance(spec, str) else spec
+        if self.processes:
+            return BackendPool(name, *args, nWorkers=1), True
+        return get_backend(name, *args), True
+
+    def _put(self, q: queue.Queue, item, stats: StageStats) -> bool:
+        start = time.perf_counter()
+        try:
+            while not self._stop.is_set():
+                try:
+                    q.put(item, timeout=0.05)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+        finally:
+            stats.blocked_s += time.perf_counter() - start
+
+    def _get(self, q: queue.Queue, stats: StageStats):
+        start = time.perf_counter()
+        try:
+            while not self._stop.is_set():
+                try:
+                    return q.get(timeout=0.05)
+                except queue.Empty:
+                    pass
+            return _DONE
+        finally:
+            stats.starved_s += time.perf_counter() - start
+
+    def _run_source(self, outs: list[queue.Queue]):
+        stats = self.stats["source"]
+        try:
+            it = iter(self.source)
+            while not self._stop.is_set():
+                start = time.perf_counter()
+                chunk = next(it, _DONE)
+                stats.busy_s += time.perf_counter() - start
+                if chunk is _DONE:
+                    break
+                chunk = [np.asarray(x) for x in chunk]
+                stats.chunks += 1
+                stats.elements += len(chunk[0])
+                for q in outs:
+                    if not self._put(q, chunk, stats):
+                        return
+        except BaseException as e:
+            self._fail(e)
+        finally:
+            for q in outs:
+                self._put(q, _DONE, stats)
+
+    def _run_backend(self, name: str, backend: BaseFPBackend, inq: queue.Queue, outq: queue.Queue):
+        stats = self.stats[name]
+        fn = getattr(backend, self.method)
+        try:
+            while (chunk := self._get(inq, stats)) is not _DONE:
+                start = time.perf_counter()
+                res = np.asarray(fn(*chunk, *self.op_args))
+                stats.busy_s += time.perf_counter() - start
+                stats.chunks += 1
+                stats.elements += len(res)
+                if not self._put(outq, (chunk, res), stats):
+                    return
+        except BaseException as e:
+            self._fail(e)
+        finally:
+            self._put(outq, _DONE, stats)
+
+    def _fail(self, e: BaseException):
+        if self._error is None:
+            self._error = e
+        self._stop.set()
+
+    def __iter__(self) -> Iterator[tuple[int, tuple[int, ...], int, int, Mismatch]]:
+        self._stop = threading.Event()
+        self._error: BaseException | None = None
+        self.stats = {name: StageStats(name) for name in self.stats}
+        self.summary = ShardSummary(max_examples=0)
+        owned = []
+        queues = {name: (queue.Queue(self.depth), queue.Queue(self.depth)) for name in ("ref", "dut")}
+        threads = [threading.Thread(target=self._run_source, args=([q[0] for q in queues.values()],),
+                                    name="cosim-source", daemon=True)]
+        try:
+            for name, (inq, outq) in queues.items():
+                backend, own = self._backend(self.backends[name])
+                if own:
+                    owned.append(backend)
+                threads.append(threading.Thread(target=self._run_backend, args=(name, backend, inq, outq),
+                                                name=f"cosim-{name}", daemon=True))
+            for t in threads:
+                t.start()
+            yield from self._compare(queues["ref"][1], queues["dut"][1])
+        finally:
+            self._stop.set()
+            for t in threads:
+                t.join()
+            for backend in owned:
+                if isinstance(backend, BackendPool):
+                    backend.close()
+        if self._error is not None:
+            raise self._error
+
+    def _compare(self, ref_q: queue.Queue, dut_q: queue.Queue):
+        stats = self.stats["compare"]
+        index = 0
+        failures = 0
+        while True:
+            ref_item = self._get(ref_q, stats)
+            dut_item = self._get(dut_q, stats)
+            if ref_item is _DONE or dut_item is _DONE:
+                return
+            (operands, ref), (_, dut) = ref_item, dut_item
+            start = time.perf_counter()
+            codes = classify(dut, ref, self.ew, self.mw)
+            self.summary.tested += len(codes)
+            for m in self.summary.counts:
+                self.summary.counts[m] += int(np.count_nonzero(codes == m))
+            stats.busy_s += time.perf_counter() - start
+            stats.chunks += 1
+            stats.elements += len(codes)
+            for i in np.flatnonzero(codes):
+                yield (index + int(i), tuple(int(x[i]) for x in operands),
+                       int(dut[i]), int(ref[i]), Mismatch(codes[i]))
+                if codes[i] == Mismatch.ERROR:
+                    failures += 1
+                    if self.max_failures is not None and failures >= self.max_failures:
+                        return
+            index += len(codes)
+
+    def run(self) -> ShardSummary:
+        """Run to completion (or max_failures), discarding the mismatch stream"""
+        for _ in self:
+            pass
+        return self.summary
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("op", choices=list(OPS))
+    parser.add_argument("op_args", type=int, nargs="+", help="arguments of <op>_batch after the operands")
+    parser.add_argument("--dut", nargs="+", default=["table"], help="backend name and args")
+    parser.add_argument("--ref", nargs="+", default=["py"], help="backend name and args")
+    parser.add_argument("-n", type=int, default=1 << 20, help="random vectors")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--chunk", type=int, default=1 << 12, help="vectors per chunk")
+    parser.add_argument("--depth", type=int, default=4, help="chunks a queue holds")
+    parser.add_argument("--max-failures", type=int, default=16)
+    parser.add_argument("--processes", action="store_true", help="run ref and dut in their own processes")
+    args = parser.parse_args()
+
+    _, operand_fmts, _ = OPS[args.op]
+    formats = [tuple(args.op_args[i:i + 2]) for i in operand_fmts]
+
+    def source():
+        rng = np.random.default_rng(args.seed)
+        for lo in range(0, args.n, args.chunk):
+            n = min(args.chunk, args.n - lo)
+            yield [random_operands(rng, n, ew, mw).astype(bits_dtype(ew, mw)) for ew, mw in formats]
+
+    sim = CoSimulation(args.op, args.op_args, source(), tuple(args.dut), tuple(args.ref),
+                       args.processes, args.depth, args.max_failures)
+    begin = time.perf_counter()
+    for index, operands, dut, ref, kind in sim:
+        if kind == Mismatch.ERROR:
+            print(f"{kind.name} #{index}: operands={[hex(x) for x in operands]} dut={dut:#x} ref={ref:#x}")
+    elapsed = time.perf_counter() - begin
+    print(f"{sim.summary} ({sim.summary.tested / elapsed:.0f} vectors/s)")
+    for stats in sim.stats.values():
+        print(stats)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,47 @@
 from pyeasyfloat.float import *
 from pyeasyfloat.fma import *
 
-def div(x: FloatPoint, y: FloatPoint) -> FloatPoint:
+def iter_cycles(mw: int, bits_per_cycle: int) -> int:
+    """Iteration cycles of RawFloat_Div, same as Div.iterCycles in Div.scala"""
+    return (mw + 3 + bits_per_cycle - 1) // bits_per_cycle
+
+def div_mantissa(dividend: int, divisor: int, quotient_bits: int) -> tuple[int, bool, bool]:
+    """Restoring division of two normalized mantissas in a single divmod.
+
+    -> (quotient, sticky_bit, first_q_is_zero)
+    quotient holds `quotient_bits` bits, the msb being the integer bit of dividend / divisor.
+    """
+    quotient, reminder = divmod(dividend << (quotient_bits - 1), divisor)
+    return (quotient, reminder != 0, dividend < divisor)
+
+def div_mantissa_steps(dividend: int, divisor: int, quotient_bits: int, bits_per_cycle: int,
+                       trace: list[tuple[int, int]] | None = None) -> tuple[int, bool, bool]:
+    """Same as div_mantissa, but iterates like RawFloat_Div, `bits_per_cycle` quotient bits per cycle.
+
+    If `trace` is given, the (reminder, quotient) registers after each cycle are appended to it.
+    """
+    assert quotient_bits % bits_per_cycle == 0, "quotient_bits must be a multiple of bits_per_cycle"
+    reminder = dividend
+    quotient = 0
+    for _ in range(quotient_bits // bits_per_cycle):
+        for _ in range(bits_per_cycle):
+            q = reminder >= divisor
+            if q:
+                reminder -= divisor
+            reminder <<= 1
+            quotient = (quotient << 1) | q
+        if trace is not None:
+            trace.append((reminder, quotient))
+    return (quotient, reminder != 0, (quotient >> (quotient_bits - 1)) == 0)
+
+def div(x: FloatPoint, y: FloatPoint, rm: RoundingMode=RoundingMode.RNE,
+        bits_per_cycle: int | None = None, trace: list[tuple[int, int]] | None = None) -> FloatPoint:
     """
     return x / y
+
+    By default the quotient comes from a single integer division.
+    Pass `bits_per_cycle` to iterate like the hardware instead, optionally
+    recording the per-cycle (reminder, quotient) registers into `trace`.
     """
     assert x.ew == y.ew and x.mw == y.mw, "x and y must have the same ew and mw"
     raw_x = x.to_raw()
@@ -18,28 +56,18 @@ def div(x: FloatPoint, y: FloatPoint) -> FloatPoint:
 
     raw_res.exp = raw_x.exp - raw_y.exp
 
-    n_pad_bits = 2 if raw_x.mantissa.bit_length() % 2 == 0 else 3
-
-    reminder = raw_x.mantissa
-    divisor = raw_y.mantissa
-    quotient = 0
-    first_q_is_zero = False
-    quotient_bits = raw_x.mantissa.bit_length() + n_pad_bits
-    for i in range(quotient_bits):
-        if reminder >= divisor:
-            reminder -= divisor
-            q = 1
-        else:
-            q = 0
-            if i == 0:
-                first_q_is_zero = True
-        reminder <<= 1
-        quotient = (quotient << 1) | q
+    if bits_per_cycle is None:
+        n_pad_bits = 2 if raw_x.mantissa.bit_length() % 2 == 0 else 3
+        quotient_bits = raw_x.mantissa.bit_length() + n_pad_bits
+        quotient, sticky_bit, first_q_is_zero = div_mantissa(raw_x.mantissa, raw_y.mantissa, quotient_bits)
+    else:
+        quotient_bits = iter_cycles(x.mw, bits_per_cycle) * bits_per_cycle
+        quotient, sticky_bit, first_q_is_zero = div_mantissa_steps(
+            raw_x.mantissa, raw_y.mantissa, quotient_bits, bits_per_cycle, trace)
     if first_q_is_zero:
         quotient <<= 1
         raw_res.exp -= 1
         assert quotient.bit_length() == quotient_bits, f'{quotient.bit_length()} != {quotient_bits}'
-    sticky_bit = reminder != 0
     raw_res.mantissa = (quotient << 1) | sticky_bit
-    res = round_raw_float(raw_res, x.ew, x.mw)
+    res = round_raw_float(raw_res, x.ew, x.mw, rm)
     return res
@@ -1,3 +1,4 @@
+from functools import lru_cache
 from pyeasyfloat.fma import *
 
 def pow2_pwl(num_pieces: int):
@@ -15,6 +16,45 @@ def pow2_pwl(num_pieces: int):
 
 N_PIECES = 8
 SLOPES, INTERCEPTS = pow2_pwl(num_pieces=N_PIECES)
+# number of (pieces, mul format, add format) configs kept by pwl_coefficients
+PWL_CACHE_SIZE = 64
+
+class PwlCoefficients:
+    """Slopes and intercepts of pow2_pwl rounded to the PWL mul/add formats.
+
+    Index i covers the i-th piece of [-1, 0]. The raw_* tuples hold the same
+    values as RawFloatPoint, ready to be fed to mul_unrounded/add_unrounded.
+    """
+    __slots__ = ('slopes', 'intercepts', 'raw_slopes', 'raw_intercepts')
+    slopes: tuple[FloatPoint, ...]
+    intercepts: tuple[FloatPoint, ...]
+    raw_slopes: tuple[RawFloatPoint, ...]
+    raw_intercepts: tuple[RawFloatPoint, ...]
+
+@lru_cache(maxsize=PWL_CACHE_SIZE)
+def pwl_coefficients(
+    pwl_pieces: int,
+    pwl_mul_ew: int, pwl_mul_mw: int,
+    pwl_add_ew: int, pwl_add_mw: int
+) -> PwlCoefficients:
+    """PWL coefficients of pow2 rounded to the given formats, memoized per config.
+    These are also the ROM constants emitted by fp_consts.py."""
+    if pwl_pieces == N_PIECES:
+        slopes, intercepts = SLOPES, INTERCEPTS
+    else:
+        slopes, intercepts = pow2_pwl(num_pieces=pwl_pieces)
+    coeffs = PwlCoefficients()
+    coeffs.slopes = tuple(
+        round_raw_float(FloatPoint.from_bits(x.view(np.uint64), 11, 52).to_raw(), pwl_mul_ew, pwl_mul_mw)
+        for x in slopes
+    )
+    coeffs.intercepts = tuple(
+        round_raw_float(FloatPoint.from_bits(x.view(np.uint64), 11, 52).to_raw(), pwl_add_ew, pwl_add_mw)
+        for x in intercepts
+    )
+    coeffs.raw_slopes = tuple(x.to_raw() for x in coeffs.slopes)
+    coeffs.raw_intercepts = tuple(x.to_raw() for x in coeffs.intercepts)
+    return coeffs
 
 def split_float(x: RawFloatPoint, pwl_segments: int) -> tuple[int, int, RawFloatPoint]:
     """Split a floating point number into its integer and fractional parts.
@@ -75,15 +115,9 @@ def pow2(
     """Power of 2 for negative floating point numbers."""
     xi, frac_msb, xf = split_float(x.to_raw(), pwl_pieces)
     assert xf.exp < 0 or (xf.is_nan or xf.is_inf or xf.is_zero)
-    if pwl_pieces == N_PIECES:
-        slopes, intercepts = SLOPES, INTERCEPTS
-    else:
-        slopes, intercepts = pow2_pwl(num_pieces=pwl_pieces)
-    slope, intercept = slopes[pwl_pieces - 1 - frac_msb], intercepts[pwl_pieces - 1 - frac_msb]
-    slope = round_raw_float(FloatPoint.from_bits(slope.view(np.uint64), 11, 52).to_raw(), pwl_mul_ew, pwl_mul_mw)
-    intercept = round_raw_float(FloatPoint.from_bits(intercept.view(np.uint64), 11, 52).to_raw(), pwl_add_ew, pwl_add_mw)
-    mul = mul_unrounded(xf, slope.to_raw())
-    add = add_unrounded(mul, intercept.to_raw())
+    coeffs = pwl_coefficients(pwl_pieces, pwl_mul_ew, pwl_mul_mw, pwl_add_ew, pwl_add_mw)
+    mul = mul_unrounded(xf, coeffs.raw_slopes[pwl_pieces - 1 - frac_msb])
+    add = add_unrounded(mul, coeffs.raw_intercepts[pwl_pieces - 1 - frac_msb], target_mw + 1)
     raw_res = RawFloatPoint()
     raw_res.sign = False
     raw_res.exp = xi + add.exp
@@ -94,14 +128,29 @@ def pow2(
     res = round_raw_float(raw_res, target_ew, target_mw, rm)
     return res
 
+# numpy scalar type -> (ew, mw) of the PWL mul/add formats in exp(),
+# the inverse of array.NUMPY_FORMATS
+DTYPE_FORMATS = {np.float16: (5, 10), np.float32: (8, 23), np.float64: (11, 52)}
+
+def dtype_format(dtype) -> tuple[int, int]:
+    """(ew, mw) of a numpy float type, given as a scalar type, dtype or name"""
+    fmt = DTYPE_FORMATS.get(np.dtype(dtype).type)
+    if fmt is None:
+        raise ValueError(f"Unsupported float point format {dtype}")
+    return fmt
+
 def exp(
     x: FloatPoint, lg2_e: FloatPoint,
     target_ew: int, target_mw: int,
     rm: RoundingMode=RoundingMode.RNE,
     mulType=np.float32,
-    addType=np.float32
+    addType=np.float32,
+    pwl_pieces: int=N_PIECES
 ) -> FloatPoint:
-    """e^x = 2^(x * log2(e)) for negative floating point numbers."""
+    """e^x = 2^(x * log2(e)) for negative floating point numbers.
+    mulType/addType are the numpy types whose formats the PWL mul/add use."""
     assert x.is_zero or x.sign, "x must be a zero or a negative number"
     x = mul(x, lg2_e, target_ew, target_mw, rm)
-    return pow2(x, target_ew, target_mw, rm, mulType, addType)
+    pwl_mul_ew, pwl_mul_mw = dtype_format(mulType)
+    pwl_add_ew, pwl_add_mw = dtype_format(addType)
+    return pow2(x, target_ew, target_mw, pwl_mul_ew, pwl_mul_mw, pwl_add_ew, pwl_add_mw, rm, pwl_pieces)
@@ -10,6 +10,57 @@ class RoundingMode(Enum):
     RDN = auto()
     RMM = auto()
 
+class FloatFormat:
+    """Shared descriptor of an IEEE-like (ew, mw) format.
+
+    Use FloatFormat.get(ew, mw) to obtain the interned instance.
+
+    Formats of up to INTERN_MAX_BITS bits can also intern their values: after
+    intern(), FloatPoint.from_bits and round_raw_float return shared, immutable
+    FloatPoints from a pool holding every bit pattern of the format, which
+    also cache their to_raw(). Sweeps then stop allocating a FloatPoint per
+    value. A 16-bit pool takes about 7 MB, release() frees it.
+    """
+    __slots__ = ('ew', 'mw', 'bias', 'max_exp', 'exp_mask', 'mantissa_mask', 'hidden_bit', 'pool')
+
+    def __init__(self, ew: int, mw: int):
+        self.ew = ew
+        self.mw = mw
+        self.bias = (1 << (ew - 1)) - 1
+        self.max_exp = (1 << ew) - 1
+        self.exp_mask = (1 << ew) - 1
+        self.mantissa_mask = (1 << mw) - 1
+        self.hidden_bit = 1 << mw
+        # bits -> interned FloatPoint, while interning is on
+        self.pool: list[FloatPoint] | None = None
+
+    @staticmethod
+    def get(ew: int, mw: int) -> "FloatFormat":
+        fmt = _FORMATS.get((ew, mw))
+        if fmt is None:
+            fmt = _FORMATS[(ew, mw)] = FloatFormat(ew, mw)
+        return fmt
+
+    def intern(self) -> "FloatFormat":
+        """Preallocate the pool of this format's values and start handing them out"""
+        n_bits = 1 + self.ew + self.mw
+        if n_bits > INTERN_MAX_BITS:
+            raise ValueError(f"Cannot intern E={self.ew} M={self.mw}: {n_bits} bits > {INTERN_MAX_BITS}")
+        if self.pool is None:
+            self.pool = [_InternedFloatPoint(self, x) for x in range(1 << n_bits)]
+        return self
+
+    def release(self):
+        """Stop interning; values already handed out stay valid"""
+        self.pool = None
+
+    def __repr__(self):
+        return f"FloatFormat(ew={self.ew}, mw={self.mw})"
+
+_FORMATS: dict[tuple[int, int], FloatFormat] = {}
+# widest format (sign included) FloatFormat.intern() accepts
+INTERN_MAX_BITS = 16
+
 class RawFloatPoint:
     """Raw float point representation for normalized numbers (1.xxx * 2^exp).
 
@@ -20,6 +71,7 @@ class RawFloatPoint:
     Any special numbers: NaN, Inf, -Inf, 0, -0 are not represented in this format,
     they should be handled separately.
     """
+    __slots__ = ('sign', 'exp', 'mantissa', 'is_zero', 'is_inf', 'is_nan')
     sign: bool
     exp: int
     mantissa: int
@@ -28,32 +80,44 @@ class RawFloatPoint:
     is_inf: bool
     is_nan: bool
 
+    def copy(self) -> "RawFloatPoint":
+        res = RawFloatPoint()
+        for attr in RawFloatPoint.__slots__:
+            setattr(res, attr, getattr(self, attr))
+        return res
+
     def __repr__(self):
         return f"sign: {int(self.sign)} exp: {bin(self.exp)} ({self.exp}) mantissa: {bin(self.mantissa)} Z: {int(self.is_zero)} I: {int(self.is_inf)} N: {int(self.is_nan)}"
 
 class FloatPoint(RawFloatPoint):
     """IEEE 754 float point representation."""
+    __slots__ = ('ew', 'mw', 'fmt')
     ew: int
     mw: int
-    def __init__(self, ew: int, mw: int):
+    fmt: FloatFormat
+    def __init__(self, ew: int, mw: int, sign: bool=False, exp: int=0, mantissa: int=0):
         self.ew = ew
         self.mw = mw
+        self.fmt = _FORMATS.get((ew, mw)) or FloatFormat.get(ew, mw)
+        self.sign = sign
+        self.exp = exp
+        self.mantissa = mantissa
 
     @property
     def bias(self) -> int:
-        return (1 << (self.ew - 1)) - 1
+        return self.fmt.bias
 
     @property
     def max_exp(self) -> int:
-        return (1 << self.ew) - 1
+        return self.fmt.max_exp
 
     @property
     def is_nan(self) -> bool:
-        return self.exp == self.max_exp and self.mantissa != 0
+        return self.exp == self.fmt.max_exp and self.mantissa != 0
 
     @property
     def is_inf(self) -> bool:
-        return self.exp == self.max_exp and self.mantissa == 0
+        return self.exp == self.fmt.max_exp and self.mantissa == 0
 
     @property
     def is_subnormal(self) -> bool:
@@ -64,27 +128,28 @@ class FloatPoint(RawFloatPoint):
         return self.exp == 0 and self.mantissa == 0
 
     def to_raw(self) -> RawFloatPoint:
+        fmt = self.fmt
+        exp, mantissa = self.exp, self.mantissa
+        is_special = exp == fmt.max_exp
         raw = RawFloatPoint()
         raw.sign = self.sign
-        raw.exp = self.exp - self.bias
-        raw.mantissa = (1 << self.mw) | self.mantissa
-        raw.is_inf = self.is_inf
-        raw.is_nan = self.is_nan
-        raw.is_zero = self.is_zero | self.is_subnormal
+        raw.exp = exp - fmt.bias
+        raw.mantissa = fmt.hidden_bit | mantissa
+        raw.is_inf = is_special and mantissa == 0
+        raw.is_nan = is_special and mantissa != 0
+        # zero or subnormal
+        raw.is_zero = exp == 0
         return raw
 
     @classmethod
     def from_bits(cls, x: int, ew: int, mw: int) -> "FloatPoint":
         x = int(x)
-        ret = cls(ew, mw)
-        ret.mantissa = low(x, mw)
-        x >>= mw
-        ret.exp = low(x, ew)
-        x >>= ew
-        ret.sign = low(x, 1)
-        x >>= 1
-        assert x == 0
-        return ret
+        fmt = _FORMATS.get((ew, mw))
+        if fmt is not None and fmt.pool is not None and cls is FloatPoint and 0 <= x < len(fmt.pool):
+            return fmt.pool[x]
+        sign = x >> (ew + mw)
+        assert sign <= 1
+        return cls(ew, mw, sign, (x >> mw) & ((1 << ew) - 1), x & ((1 << mw) - 1))
 
     @classmethod
     def from_numpy(cls, x: np.float16 | np.float32 | np.float64) -> "FloatPoint":
@@ -126,15 +191,62 @@ class FloatPoint(RawFloatPoint):
         for sign in sign_range:
             for exp in exp_range:
                 for mantissa in mantissa_range:
-                    fp = FloatPoint(ew, mw)
-                    fp.sign = sign
-                    fp.exp = exp
-                    fp.mantissa = mantissa
-                    yield fp
+                    yield FloatPoint(ew, mw, sign, exp, mantissa)
 
     def random_normal(ew: int, mw: int) -> "FloatPoint":
-        fp = FloatPoint(ew, mw)
-        fp.sign = np.random.randint(0, 2) == 1
-        fp.exp = np.random.randint(1, (1 << ew) - 1)
-        fp.mantissa = np.random.randint(0, (1 << mw))
-        return fp
\ No newline at end of file
+        sign = np.random.randint(0, 2) == 1
+        exp = np.random.randint(1, (1 << ew) - 1)
+        mantissa = np.random.randint(0, (1 << mw))
+        return FloatPoint(ew, mw, sign, exp, mantissa)
+
+
+class _FrozenRawFloatPoint(RawFloatPoint):
+    """RawFloatPoint cached on an interned FloatPoint; copy() it to modify"""
+    __slots__ = ()
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"Cannot set {name}: this RawFloatPoint is shared, copy() it first")
+
+
+_set = object.__setattr__
+
+
+class _InternedFloatPoint(FloatPoint):
+    """Immutable FloatPoint from a FloatFormat pool, see FloatFormat.intern()"""
+    __slots__ = ('_raw',)
+
+    def __init__(self, fmt: FloatFormat, x: int):
+        _set(self, 'ew', fmt.ew)
+        _set(self, 'mw', fmt.mw)
+        _set(self, 'fmt', fmt)
+        _set(self, 'sign', x >> (fmt.ew + fmt.mw))
+        _set(self, 'exp', (x >> fmt.mw) & fmt.exp_mask)
+        _set(self, 'mantissa', x & fmt.mantissa_mask)
+        _set(self, '_raw', None)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"Cannot set {name}: interned FloatPoints are immutable")
+
+    def __reduce__(self):
+        return (FloatPoint.from_bits, (self.to_bits(), self.ew, self.mw))
+
+    def __eq__(self, other) -> bool:
+        """Same format and bits (NaNs included), identity first as values are shared.
+        Mutable FloatPoints keep identity equality, even against an interned value."""
+        if self is other:
+            return True
+        if not isinstance(other, _InternedFloatPoint):
+            return NotImplemented
+        return self.fmt is other.fmt and self.to_bits() == other.to_bits()
+
+    def __hash__(self) -> int:
+        return hash((self.ew, self.mw, self.to_bits()))
+
+    def to_raw(self) -> RawFloatPoint:
+        raw = self._raw
+        if raw is None:
+            raw = FloatPoint.to_raw(self)
+            # same layout, only attribute assignment changes
+            raw.__class__ = _FrozenRawFloatPoint
+            _set(self, '_raw', raw)
+        return raw
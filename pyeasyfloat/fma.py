@@ -1,30 +1,28 @@
 from pyeasyfloat.float import *
 from pyeasyfloat.rounding import round_raw_float
 
-def pad_mantissa(a: RawFloatPoint, b: RawFloatPoint) -> int:
-    # pad the mantissa to the same width
-    a_mw = a.mantissa.bit_length()
-    b_mw = b.mantissa.bit_length()
+def pad_mantissa(a: RawFloatPoint, b: RawFloatPoint) -> tuple[int, int, int]:
+    """Return the mantissas of a and b padded to the same width, and that width.
+    a and b are left untouched."""
+    a_m, b_m = a.mantissa, b.mantissa
+    a_mw = a_m.bit_length()
+    b_mw = b_m.bit_length()
     if a_mw < b_mw:
-        a.mantissa <<= (b_mw - a_mw)
+        return (a_m << (b_mw - a_mw), b_m, b_mw)
     elif a_mw > b_mw:
-        b.mantissa <<= (a_mw - b_mw)
-    return max(a_mw, b_mw)
+        return (a_m, b_m << (a_mw - b_mw), a_mw)
+    return (a_m, b_m, a_mw)
 
 # res <- a * b
 def mul_unrounded(a: RawFloatPoint, b: RawFloatPoint) -> RawFloatPoint:
-    pad_mantissa(a, b)
-    # always let a.exp < b.exp for convenience
-    if a.exp > b.exp:
-        a, b = b, a
-    
-    # left shift b to align the exp
-    shift_amt = b.exp - a.exp
-    a_m = 0 if a.is_zero else a.mantissa
-    b_m = 0 if b.is_zero else b.mantissa
-    bm_shifted = b_m << shift_amt
-    m_product = a_m * bm_shifted
-    m_width = a.mantissa.bit_length() + b.mantissa.bit_length() + shift_amt
+    a_m, b_m, mw = pad_mantissa(a, b)
+    # a product needs no alignment: the exponents are simply added below
+    if a.is_zero:
+        a_m = 0
+    if b.is_zero:
+        b_m = 0
+    m_product = a_m * b_m
+    m_width = 2 * mw
     """
     a_m <- [1, 2)  1.?...?
     b_m <- [1, 2)  1.?...?
@@ -50,7 +48,18 @@ def mul_unrounded(a: RawFloatPoint, b: RawFloatPoint) -> RawFloatPoint:
     res.is_inf = a.is_inf or b.is_inf
     return res
 
-def add_unrounded(a: RawFloatPoint, b: RawFloatPoint) -> RawFloatPoint:
+def add_unrounded(a: RawFloatPoint, b: RawFloatPoint, precision: int | None = None) -> RawFloatPoint:
+    """
+    res <- a + b
+
+    By default the sum is exact, however far apart the exponents are.
+    With `precision`, the mantissa bits of the result that will be kept by
+    rounding (target_mw + 1), the alignment shift is capped like in hardware:
+    the bigger operand is shifted by at most max(precision, width) + 3 bits
+    and the bits of the smaller one that fall off are ORed into its lsb.
+    The result rounds to the same value, while the cost no longer grows with
+    the exponent gap.
+    """
     res = RawFloatPoint()
     res.is_nan = a.is_nan or b.is_nan or (a.is_inf and b.is_inf and a.sign != b.sign)
     res.is_inf = a.is_inf or b.is_inf
@@ -74,13 +83,25 @@ def add_unrounded(a: RawFloatPoint, b: RawFloatPoint) -> RawFloatPoint:
         res.is_zero = False
         return res
     
-    pad_mantissa(a, b)
+    a_m, b_m, a_m_width = pad_mantissa(a, b)
     # always let a.exp < b.exp for convenience
     if a.exp > b.exp:
         a, b = b, a
+        a_m, b_m = b_m, a_m
     shift_amt = b.exp - a.exp
-    a_m = a.mantissa
-    b_m = b.mantissa
+    if precision is not None:
+        limit = max(precision, a_m_width) + 3
+        if shift_amt > limit:
+            # a lies entirely below the round bit: keep its top bits and a sticky bit
+            drop = shift_amt - limit
+            sticky = (a_m & ((1 << drop) - 1)) != 0
+            a_m = (a_m >> drop) | sticky
+            a_exp_offset = drop
+            shift_amt = limit
+        else:
+            a_exp_offset = 0
+    else:
+        a_exp_offset = 0
     b_m_shifted = b_m << shift_amt
     if a.sign == b.sign:
         m_sum = a_m + b_m_shifted
@@ -99,9 +120,8 @@ def add_unrounded(a: RawFloatPoint, b: RawFloatPoint) -> RawFloatPoint:
         res.exp = 0
     else:
         res.is_zero = False
-        a_m_width = a.mantissa.bit_length()
         res_m_width = m_sum.bit_length()
-        res.exp = a.exp + (res_m_width - a_m_width)
+        res.exp = a.exp + a_exp_offset + (res_m_width - a_m_width)
     res.mantissa = m_sum
     return res
 
@@ -110,12 +130,10 @@ def mul(a: FloatPoint, b: FloatPoint, target_ew: int, target_mw: int, rm: Roundi
     return round_raw_float(raw, target_ew, target_mw, rm)
 
 def add(a: FloatPoint, b: FloatPoint, target_ew: int, target_mw: int, rm: RoundingMode=RoundingMode.RNE) -> FloatPoint:
-    raw = add_unrounded(a.to_raw(), b.to_raw())
+    raw = add_unrounded(a.to_raw(), b.to_raw(), target_mw + 1)
     return round_raw_float(raw, target_ew, target_mw, rm)
 
 def fma(a: FloatPoint, b: FloatPoint, c: FloatPoint, target_ew: int, target_mw: int, rm: RoundingMode=RoundingMode.RNE) -> FloatPoint:
     raw_mul = mul_unrounded(a.to_raw(), b.to_raw())
-    # print(f"mul: {raw_mul}")
-    raw_add = add_unrounded(raw_mul, c.to_raw())
-    # print(f"add: {raw_add}")
+    raw_add = add_unrounded(raw_mul, c.to_raw(), target_mw + 1)
     return round_raw_float(raw_add, target_ew, target_mw, rm)
\ No newline at end of file
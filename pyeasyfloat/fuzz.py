@@ -0,0 +1,310 @@
+"""Coverage-guided differential fuzzing of a DUT backend against a reference.
+
+Coverage is the set of features an input reaches in the Python model: every
+(histogram, value) pair instrument() records while the scalar op runs, e.g.
+("round_raw_float.outcome", "carry_overflow"), ("add_unrounded.exact_zero",
+True) or ("add_unrounded.shift_amt", 27). Inputs are bit mutations of corpus
+entries aimed at those corners: adjacent values, exponents at the ends of the
+range or a few binades around another operand's, all-ones mantissas, sign
+flips, c = -(a * b) for fma, splices of two entries. An input reaching a
+feature nothing in the corpus reaches joins the corpus.
+
+Every candidate is also run through `<op>_batch` of the DUT and of the
+reference, in batches, and ERROR mismatches are collected.
+
+Workers fuzz from the same corpus in rounds; the parent merges what they found
+before the next round. At the end the corpus is minimized to a subset reaching
+the same features, and written with the failures as golden vectors.
+
+    python -m pyeasyfloat.fuzz fma 8 23 8 23 --dut verilator MulAddExp2.sv -j 8 --out fuzz_fma
+"""
+import argparse
+import os
+import random
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Sequence
+import numpy as np
+
+from pyeasyfloat.float import FloatPoint
+from pyeasyfloat.exp import N_PIECES
+from pyeasyfloat.fma import mul
+from pyeasyfloat.backend import BaseFPBackend, PyEasyFloatBackend, get_backend
+from pyeasyfloat.batch import bits_dtype
+from pyeasyfloat.golden import OPS, GoldenVectors
+from pyeasyfloat.instrument import instrument
+from pyeasyfloat.testfloat import random_operands
+from pyeasyfloat.verify import Mismatch, classify
+
+Vector = tuple[int, ...]
+Feature = tuple[str, object]
+
+# candidates per DUT/reference batch call
+BATCH = 256
+
+
+def operand_formats(op: str, config: Sequence[int]) -> list[tuple[int, int]]:
+    _, operand_fmts, _ = OPS[op]
+    return [tuple(config[i:i + 2]) for i in operand_fmts]
+
+
+def scalar_args(op: str, config: Sequence[int]) -> tuple:
+    """Arguments of the scalar PyEasyFloatBackend method after the operands"""
+    match op:
+        case "fma":
+            return tuple(config[2:4])
+        case "exp2":
+            return tuple(config[2:])
+        case _:
+            return ()
+
+
+class Mutator:
+    """Random bit-level edits of vectors of packed operands"""
+
+    def __init__(self, op: str, config: Sequence[int], rng: random.Random):
+        self.op = op
+        self.config = tuple(config)
+        self.formats = operand_formats(op, config)
+        self.rng = rng
+
+    def _fields(self, i: int, x: int) -> tuple[int, int, int]:
+        ew, mw = self.formats[i]
+        return x >> (ew + mw), (x >> mw) & ((1 << ew) - 1), x & ((1 << mw) - 1)
+
+    def _pack(self, i: int, sign: int, exp: int, mantissa: int) -> int:
+        ew, mw = self.formats[i]
+        return (sign << (ew + mw)) | ((exp & ((1 << ew) - 1)) << mw) | (mantissa & ((1 << mw) - 1))
+
+    def mutate(self, v: Vector, corpus: list[Vector]) -> Vector:
+        v = list(v)
+        for _ in range(self.rng.choice((1, 1, 2, 3))):
+            self._mutate_once(v, corpus)
+        return tuple(v)
+
+    def _mutate_once(self, v: list[int], corpus: list[Vector]):
+        rng = self.rng
+        i = rng.randrange(len(v))
+        ew, mw = self.formats[i]
+        sign, exp, mantissa = self._fields(i, v[i])
+        max_exp = (1 << ew) - 1
+        match rng.randrange(9):
+            case 0:
+                v[i] ^= 1 << rng.randrange(1 + ew + mw)
+            case 1:
+                # neighbouring values
+                v[i] = min(max(v[i] + rng.choice((-3, -2, -1, 1, 2, 3)), 0), (1 << (1 + ew + mw)) - 1)
+            case 2:
+                exp = rng.choice((0, 1, 2, max_exp - 2, max_exp - 1, max_exp, (1 << (ew - 1)) - 1))
+                v[i] = self._pack(i, sign, exp, mantissa)
+            case 3:
+                # exponent a few binades (or about a mantissa width) away from another operand's
+                j = rng.randrange(len(v))
+                _, other, _ = self._fields(j, v[j])
+                delta = rng.choice((0, 1, 2, 3, mw, mw + 1, mw + 2, mw + 3, mw + 4, 2 * mw + 2))
+                v[i] = self._pack(i, sign, min(max(other + rng.choice((-delta, delta)), 0), max_exp), mantissa)
+            case 4:
+                mantissa = rng.choice((0, 1, (1 << mw) - 1, (1 << mw) - 2, 1 << (mw - 1),
+                                       ((1 << mw) - 1) ^ 1, rng.getrandbits(mw) | 1))
+                v[i] = self._pack(i, sign, exp, mantissa)
+            case 5:
+                v[i] ^= 1 << (ew + mw)
+            case 6:
+                # splice an operand of another entry
+                v[i] = rng.choice(corpus)[i]
+            case 7 if self.op == "fma":
+                # c = -(a * b) rounded to c's format, then nudged: cancellation
+                (mew, mmw), (aew, amw) = self.formats[0], self.formats[2]
+                a, b = (FloatPoint.from_bits(x, mew, mmw) for x in v[:2])
+                c = mul(a, b, aew, amw).to_bits() ^ (1 << (aew + amw))
+                v[2] = min(max(c + rng.choice((0, 0, -1, 1)), 0), (1 << (1 + aew + amw)) - 1)
+            case _:
+                v[i] = rng.getrandbits(1 + ew + mw)
+
+
+class Fuzzer:
+    """Coverage of the Python model plus the DUT/reference comparison, in one process"""
+
+    def __init__(self, op: str, config: Sequence[int], dut: BaseFPBackend, ref: BaseFPBackend):
+        self.op = op
+        self.config = tuple(config)
+        self.formats = operand_formats(op, config)
+        _, _, result_fmt = OPS[op]
+        self.out_fmt = self.config[result_fmt:result_fmt + 2]
+        self.args = scalar_args(op, config)
+        self.model = getattr(PyEasyFloatBackend(), op)
+        self.dut = getattr(dut, f"{op}_batch")
+        self.ref = getattr(ref, f"{op}_batch")
+
+    def features(self, stats, v: Vector) -> frozenset[Feature]:
+        """Features the Python model reaches on v, inside an instrument() context"""
+        stats.histograms = defaultdict(Counter)
+        self.model(*(FloatPoint.from_bits(x, *fmt) for x, fmt in zip(v, self.formats)), *self.args)
+        return frozenset((name, value) for name, h in stats.histograms.items() for value in h)
+
+    def compare(self, vs: list[Vector]) -> list[tuple[Vector, int, int]]:
+        """-> (vector, dut bits, ref bits) of every ERROR mismatch"""
+        operands = [np.array(col, dtype=bits_dtype(*fmt)) for col, fmt in zip(zip(*vs), self.formats)]
+        dut = self.dut(*operands, *self.config)
+        ref = self.ref(*operands, *self.config)
+        errors = np.flatnonzero(classify(dut, ref, *self.out_fmt) == Mismatch.ERROR)
+        return [(vs[i], int(dut[i]), int(ref[i])) for i in errors]
+
+    def run(self, corpus: list[Vector], covered: set[Feature], iterations: int, seed: int):
+        """Fuzz from `corpus` -> (new entries with their features, failures, executions)"""
+        rng = random.Random(seed)
+        mutator = Mutator(self.op, self.config, rng)
+        corpus = list(corpus)
+        covered = set(covered)
+        found: list[tuple[Vector, frozenset[Feature]]] = []
+        failures = []
+        batch = []
+        with instrument() as stats:
+            for _ in range(iterations):
+                v = mutator.mutate(rng.choice(corpus), corpus)
+                f = self.features(stats, v)
+                if not f <= covered:
+                    covered |= f
+                    corpus.append(v)
+                    found.append((v, f))
+                batch.append(v)
+                if len(batch) == BATCH:
+                    failures += self.compare(batch)
+                    batch = []
+        if batch:
+            failures += self.compare(batch)
+        return found, failures, iterations
+
+
+# per-process Fuzzer, set up once by _init_worker
+_worker: dict = {}
+
+
+def _init_worker(op: str, config: tuple, dut: tuple, ref: tuple):
+    _worker["fuzzer"] = Fuzzer(op, config, get_backend(dut[0], *dut[1:]), get_backend(ref[0], *ref[1:]))
+
+
+def _run_worker(corpus: list[Vector], covered: set[Feature], iterations: int, seed: int):
+    return _worker["fuzzer"].run(corpus, covered, iterations, seed)
+
+
+def minimize(entries: list[tuple[Vector, frozenset[Feature]]]) -> list[Vector]:
+    """Greedy subset of the entries reaching all of their features"""
+    remaining = set().union(*(f for _, f in entries)) if entries else set()
+    kept = []
+    for v, f in sorted(entries, key=lambda e: -len(e[1])):
+        if f & remaining:
+            kept.append(v)
+            remaining -= f
+    return kept
+
+
+class FuzzResult:
+    corpus: list[Vector]
+    covered: set[Feature]
+    # distinct failing vectors -> (dut bits, ref bits)
+    failures: dict[Vector, tuple[int, int]]
+    executions: int
+    elapsed_s: float
+
+    def __init__(self):
+        self.corpus = []
+        self.covered = set()
+        self.failures = {}
+        self.executions = 0
+        self.elapsed_s = 0.0
+        self._entries: list[tuple[Vector, frozenset[Feature]]] = []
+
+    def merge(self, found: list[tuple[Vector, frozenset[Feature]]], failures: list, executions: int):
+        """Add what a worker found, keeping entries that still reach something new"""
+        for v, f in found:
+            if not f <= self.covered:
+                self.covered |= f
+                self._entries.append((v, f))
+        for v, dut, ref in failures:
+            self.failures.setdefault(v, (dut, ref))
+        self.executions += executions
+        self.corpus = [v for v, _ in self._entries]
+
+    def __repr__(self):
+        return (f"corpus: {len(self.corpus)} features: {len(self.covered)} failures: {len(self.failures)} "
+                f"executions: {self.executions} ({self.executions / max(self.elapsed_s, 1e-9):.0f}/s)")
+
+
+def _run_seeds(vs: list[Vector]):
+    fuzzer: Fuzzer = _worker["fuzzer"]
+    with instrument() as stats:
+        found = [(v, fuzzer.features(stats, v)) for v in vs]
+    return found, fuzzer.compare(vs), len(vs)
+
+
+def fuzz(op: str, config: Sequence[int], dut: tuple = ("py",), ref: tuple = ("py",),
+         rounds: int = 10, iterations: int = 2000, workers: int = 1, seed: int = 0,
+         seeds: int = 64, progress=None) -> FuzzResult:
+    """Fuzz `dut.<op>_batch(*operands, *config)` against `ref` for rounds x workers x iterations inputs.
+
+    dut/ref are (registry name, *constructor args) tuples, so that each worker
+    can build its own instances. The corpus starts from `seeds` testfloat
+    operands; progress(round, result) is called after each round.
+    """
+    config = tuple(config)
+    if op == "exp2" and len(config) == OPS[op][0] - 1:
+        config += (N_PIECES,)
+    formats = operand_formats(op, config)
+    rng = np.random.default_rng(seed)
+    initial = [tuple(int(x) for x in v) for v in
+               zip(*(random_operands(rng, seeds, ew, mw) for ew, mw in formats))]
+    result = FuzzResult()
+    begin = time.perf_counter()
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(op, config, dut, ref)) as pool:
+        result.merge(*pool.submit(_run_seeds, initial).result())
+        for r in range(rounds):
+            futures = [pool.submit(_run_worker, result.corpus, result.covered, iterations,
+                                   seed * 7919 + r * workers + w) for w in range(workers)]
+            for fut in futures:
+                result.merge(*fut.result())
+            result.elapsed_s = time.perf_counter() - begin
+            if progress:
+                progress(r, result)
+    result.corpus = minimize(result._entries)
+    return result
+
+
+def save(result: FuzzResult, op: str, config: Sequence[int], directory: str):
+    """Write the corpus and the failing vectors as golden vectors under `directory`"""
+    formats = operand_formats(op, config)
+    ref = PyEasyFloatBackend()
+    for name, vs in (("corpus", result.corpus), ("failures", list(result.failures))):
+        if not vs:
+            continue
+        operands = [np.array(col, dtype=bits_dtype(*fmt)) for col, fmt in zip(zip(*vs), formats)]
+        GoldenVectors(op, config, os.path.join(directory, name)).generate(operands, ref)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("op", choices=list(OPS))
+    parser.add_argument("config", type=int, nargs="+", help="arguments of <op>_batch after the operands")
+    parser.add_argument("--dut", nargs="+", default=["table"], help="backend name and args")
+    parser.add_argument("--ref", nargs="+", default=["py"], help="backend name and args")
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--iterations", type=int, default=2000, help="inputs per worker and round")
+    parser.add_argument("-j", "--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=None, help="directory to save the corpus and failures to")
+    args = parser.parse_args()
+
+    def progress(r, result):
+        print(f"round {r}: {result}", flush=True)
+
+    result = fuzz(args.op, args.config, tuple(args.dut), tuple(args.ref), args.rounds, args.iterations,
+                  args.workers, args.seed, progress=progress)
+    for v, (d, x) in list(result.failures.items())[:16]:
+        print(f"ERROR: operands={[hex(b) for b in v]} dut={d:#x} ref={x:#x}")
+    if args.out:
+        save(result, args.op, args.config, args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Matrix products accumulated with the easyfloat FMA.
+
+Every output element is a chain of fma(a, b, acc) calls, products in the mul
+format and the accumulator in the acc format, like RawFloat_FMA. The order of
+accumulation decides the rounding, so it is explicit:
+
+  "sequential"  acc = fma(a[k], b[k], acc) for k = 0..K-1, starting from +0
+  "chunked"     K is split into runs of `chunk` elements, each accumulated
+                sequentially from +0; the partial sums are then added pairwise
+  "tree"        "chunked" with chunk = 1: products rounded to the acc format,
+                then added pairwise
+
+Pairwise means (p0 + p1) + (p2 + p3) and so on; at each level an odd one out
+is added to the sum of all that precede it, last.
+
+dot() is the scalar reference on FloatPoints; matmul() evaluates the same
+chains for all outputs of a block at once with the batch engine, tile by tile.
+"""
+from typing import Callable, Iterable, TypeVar
+import numpy as np
+
+from pyeasyfloat.float import FloatPoint, RoundingMode
+from pyeasyfloat.fma import fma, add
+from pyeasyfloat.batch import fma_batch, add_batch, bits_dtype
+
+ORDERS = ("sequential", "chunked", "tree")
+
+T = TypeVar("T")
+
+
+def pairwise_sum(xs: Iterable[T], add: Callable[[T, T], T]) -> T | None:
+    """Pairwise reduction of a stream, holding at most log2(len(xs)) partial sums"""
+    # (level, partial sum) with levels strictly decreasing from the bottom
+    stack: list[tuple[int, T]] = []
+    for x in xs:
+        level = 0
+        while stack and stack[-1][0] == level:
+            x = add(stack.pop()[1], x)
+            level += 1
+        stack.append((level, x))
+    if not stack:
+        return None
+    _, total = stack.pop()
+    while stack:
+        total = add(stack.pop()[1], total)
+    return total
+
+
+def _runs(k: int, order: str, chunk: int) -> list[tuple[int, int]]:
+    match order:
+        case "sequential":
+            size = max(k, 1)
+        case "chunked":
+            size = chunk
+        case "tree":
+            size = 1
+        case _:
+            raise ValueError(f"Unknown order {order}, choose from {ORDERS}")
+    return [(lo, min(lo + size, k)) for lo in range(0, k, size)]
+
+
+def dot(a: list[FloatPoint], b: list[FloatPoint], acc_fmt: tuple[int, int],
+        rm: RoundingMode = RoundingMode.RNE, order: str = "sequential", chunk: int = 32) -> FloatPoint:
+    """Scalar reference: sum of a[k] * b[k] in acc_fmt, accumulated in `order`"""
+    acc_ew, acc_mw = acc_fmt
+    zero = FloatPoint(acc_ew, acc_mw)
+
+    def chain(lo: int, hi: int) -> FloatPoint:
+        acc = zero
+        for k in range(lo, hi):
+            acc = fma(a[k], b[k], acc, acc_ew, acc_mw, rm)
+        return acc
+
+    total = pairwise_sum((chain(lo, hi) for lo, hi in _runs(len(a), order, chunk)),
+                         lambda x, y: add(x, y, acc_ew, acc_mw, rm))
+    return zero if total is None else total
+
+
+def matmul(A: np.ndarray, B: np.ndarray, mul_fmt: tuple[int, int], acc_fmt: tuple[int, int],
+           rm: RoundingMode = RoundingMode.RNE, order: str = "sequential", chunk: int = 32,
+           block: int = 256) -> np.ndarray:
+    """A @ B on packed bits: A (M, K) and B (K, N) in mul_fmt, the result (M, N) in acc_fmt.
+
+    Bit-exact with dot() on every row of A and column of B. Outputs are
+    computed in block x block tiles so the accumulators stay in cache while
+    the whole of K is swept. EasyFloatArray operands give an EasyFloatArray.
+    """
+    from pyeasyfloat.array import EasyFloatArray
+    if isinstance(A, EasyFloatArray) or isinstance(B, EasyFloatArray):
+        bits = matmul(getattr(A, "bits", A), getattr(B, "bits", B), mul_fmt, acc_fmt, rm, order, chunk, block)
+        return EasyFloatArray(bits, *acc_fmt)
+
+    A = np.asarray(A)
+    B = np.asarray(B)
+    (M, K), (K2, N) = A.shape, B.shape
+    assert K == K2, f"inner dimensions differ: {K} != {K2}"
+    runs = _runs(K, order, chunk)
+    out = np.zeros((M, N), dtype=bits_dtype(*acc_fmt))
+    for i in range(0, M, block):
+        for j in range(0, N, block):
+            a = A[i:i + block]
+            b = B[:, j:j + block]
+            tile = pairwise_sum((_chain(a, b, lo, hi, mul_fmt, acc_fmt, rm) for lo, hi in runs),
+                                lambda x, y: add_batch(x, y, *acc_fmt, rm))
+            if tile is not None:
+                out[i:i + block, j:j + block] = tile
+    return out
+
+
+def _chain(a: np.ndarray, b: np.ndarray, lo: int, hi: int,
+           mul_fmt: tuple[int, int], acc_fmt: tuple[int, int], rm: RoundingMode) -> np.ndarray:
+    """Sequential fma chain over k in [lo, hi) for a whole tile"""
+    acc = np.zeros((a.shape[0], b.shape[1]), dtype=bits_dtype(*acc_fmt))
+    for k in range(lo, hi):
+        acc = fma_batch(a[:, k, None], b[None, k, :], acc, *mul_fmt, rm, *acc_fmt)
+    return acc
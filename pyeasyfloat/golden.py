@@ -0,0 +1,247 @@
+"""Golden vectors: reference results computed once, memory-mapped on later runs.
+
+A store holds the vectors of one op config, given as the arguments of the
+backend `<op>_batch` method that follow the operands:
+
+    store = GoldenVectors("reciprocal", (5, 10))
+    (xs,), ref = store.load_or_generate([np.arange(1 << 16, dtype=np.uint16)])
+    errors = store.compare(dut.reciprocal_batch(xs, 5, 10), ref) == Mismatch.ERROR
+
+Its directory, under cache_dir()/golden, is named after a hash of the op, the
+config and the source of the reference model, so any change to the model
+starts a new store instead of comparing against stale results.
+
+Every append() writes a shard, to a temp file renamed into place like the
+lookup tables, so producers can run in parallel and readers never see a
+partial shard; merge() compacts the shards into one file. A shard is a JSON
+header (op, config, reference version, dtype, rows) padded to 64 bytes,
+followed by a (rows, operands + 1) array of bits: the operands, then the
+expected result.
+
+    python -m pyeasyfloat.golden exp2 5 10 5 10 5 10 5 10 -j 4
+"""
+import argparse
+import fcntl
+import functools
+import glob
+import hashlib
+import importlib.util
+import json
+import os
+import struct
+import tempfile
+from typing import Sequence
+import numpy as np
+
+from pyeasyfloat.batch import bits_dtype
+from pyeasyfloat.exp import N_PIECES
+from pyeasyfloat.table import cache_dir
+from pyeasyfloat.backend import BaseFPBackend, PyEasyFloatBackend, BackendPool
+from pyeasyfloat.verify import classify
+
+# bump when the file layout changes
+GOLDEN_VERSION = 1
+MAGIC = b"EFGV"
+ALIGN = 64
+
+# modules whose source defines the reference results
+REFERENCE_MODULES = [
+    "pyeasyfloat.float", "pyeasyfloat.fp_utils", "pyeasyfloat.rounding", "pyeasyfloat.fma",
+    "pyeasyfloat.batch", "pyeasyfloat.div", "pyeasyfloat.reciprocal", "pyeasyfloat.exp",
+    "pyeasyfloat.backend",
+]
+
+# op -> (config length, config index of each operand format, config index of the result format)
+OPS = {
+    "fma": (4, (0, 0, 2), 2),
+    "exp2": (9, (0,), 2),
+    "reciprocal": (2, (0,), 0),
+    "div": (2, (0, 0), 0),
+}
+
+
+def reference_files() -> list[str]:
+    """Paths of the REFERENCE_MODULES sources, in hashing order"""
+    return [importlib.util.find_spec(name).origin for name in REFERENCE_MODULES]
+
+
+@functools.cache
+def reference_version() -> str:
+    """Hash of the reference model sources: sha256 of their concatenation, first 16 hex digits"""
+    h = hashlib.sha256()
+    for path in reference_files():
+        with open(path, "rb") as f:
+            h.update(f.read())
+    return h.hexdigest()[:16]
+
+
+def read_shard(path: str) -> tuple[dict, np.ndarray]:
+    """-> (header, memory-mapped (rows, operands + 1) array)"""
+    with open(path, "rb") as f:
+        magic, header_len = struct.unpack("<4sI", f.read(8))
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a golden vector file")
+        header = json.loads(f.read(header_len))
+    shape = (header["rows"], header["columns"])
+    if header["rows"] == 0:
+        return header, np.empty(shape, dtype=header["dtype"])
+    return header, np.memmap(path, dtype=header["dtype"], mode="r", offset=8 + header_len, shape=shape)
+
+
+def write_shard(path: str, header: dict, rows: np.ndarray):
+    """Write atomically: to a temp file in the same directory, then rename"""
+    rows = np.ascontiguousarray(rows, dtype=np.dtype(header["dtype"]))
+    header = {**header, "rows": rows.shape[0], "columns": rows.shape[1]}
+    body = json.dumps(header).encode()
+    body += b" " * (-(8 + len(body)) % ALIGN)
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(struct.pack("<4sI", MAGIC, len(body)))
+            f.write(body)
+            f.write(rows.tobytes())
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+class GoldenVectors:
+    """Stored (operands, expected result) bits of one op config"""
+
+    def __init__(self, op: str, config: Sequence[int], directory: str | None = None):
+        if op not in OPS:
+            raise ValueError(f"Unknown op {op}, choose from {list(OPS)}")
+        config = tuple(int(x) for x in config)
+        n_config, operand_fmts, result_fmt = OPS[op]
+        if op == "exp2" and len(config) == n_config - 1:
+            config += (N_PIECES,)
+        if len(config) != n_config:
+            raise ValueError(f"{op} takes {n_config} config values, got {config}")
+        self.op = op
+        self.config = config
+        self.operand_formats = [config[i:i + 2] for i in operand_fmts]
+        self.ew, self.mw = config[result_fmt:result_fmt + 2]
+        widest = max([*self.operand_formats, (self.ew, self.mw)], key=sum)
+        self.dtype = np.dtype(bits_dtype(*widest)).newbyteorder("<")
+        self.version = reference_version()
+        key = json.dumps([op, config, self.version, GOLDEN_VERSION]).encode()
+        name = f"{op}_{hashlib.sha256(key).hexdigest()[:16]}"
+        self.path = os.path.join(directory or os.path.join(cache_dir(), "golden"), name)
+
+    def header(self) -> dict:
+        return {"op": self.op, "config": list(self.config), "version": self.version, "dtype": self.dtype.str}
+
+    def shards(self) -> list[str]:
+        return sorted(glob.glob(os.path.join(self.path, "*.gv")))
+
+    def exists(self) -> bool:
+        return bool(self.shards())
+
+    def append(self, operands: Sequence[np.ndarray], expected: np.ndarray) -> str:
+        """Store vectors as a new shard, -> its path"""
+        assert len(operands) == len(self.operand_formats), f"{self.op} takes {len(self.operand_formats)} operands"
+        rows = np.stack([*(np.asarray(x) for x in operands), np.asarray(expected)], axis=1)
+        path = os.path.join(self.path, f"{os.getpid()}-{os.urandom(4).hex()}.gv")
+        write_shard(path, self.header(), rows)
+        return path
+
+    def generate(self, operands: Sequence[np.ndarray], backend: BaseFPBackend | None = None) -> np.ndarray:
+        """Compute the expected results with the reference backend and append them"""
+        backend = backend or PyEasyFloatBackend()
+        expected = getattr(backend, f"{self.op}_batch")(*operands, *self.config)
+        self.append(operands, expected)
+        return expected
+
+    def vectors(self) -> np.ndarray:
+        """All stored rows, zero-copy when there is a single shard"""
+        arrays = [read_shard(p)[1] for p in self.shards()]
+        if not arrays:
+            return np.empty((0, len(self.operand_formats) + 1), dtype=self.dtype)
+        return arrays[0] if len(arrays) == 1 else np.concatenate(arrays)
+
+    def _columns(self, rows: np.ndarray) -> tuple[list[np.ndarray], np.ndarray]:
+        operands = [rows[:, i].astype(bits_dtype(*fmt), copy=False) for i, fmt in enumerate(self.operand_formats)]
+        return operands, rows[:, -1].astype(bits_dtype(self.ew, self.mw), copy=False)
+
+    def load(self) -> tuple[list[np.ndarray], np.ndarray]:
+        """-> (operand columns, expected column), each in the bits dtype of its format"""
+        return self._columns(self.vectors())
+
+    def load_or_generate(self, operands: Sequence[np.ndarray],
+                         backend: BaseFPBackend | None = None) -> tuple[list[np.ndarray], np.ndarray]:
+        """Vectors of exactly these operands: from the shard holding them if there is
+        one, else computed with the reference backend and stored for the next run"""
+        operands = [np.asarray(x) for x in operands]
+        for path in self.shards():
+            rows = read_shard(path)[1]
+            if len(rows) == len(operands[0]) and all(np.array_equal(rows[:, i], x) for i, x in enumerate(operands)):
+                return self._columns(rows)
+        return operands, self.generate(operands, backend)
+
+    def merge(self, dedup: bool = True) -> str | None:
+        """Compact all shards into one, keeping the first row of repeated operands"""
+        os.makedirs(self.path, exist_ok=True)
+        with open(os.path.join(self.path, ".lock"), "w") as lock:
+            # one merger at a time, or two could each rewrite the same shards
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            shards = self.shards()
+            if len(shards) <= 1:
+                return shards[0] if shards else None
+            rows = np.concatenate([read_shard(p)[1] for p in shards])
+            if dedup:
+                keys = np.ascontiguousarray(rows[:, :-1]).view(np.dtype((np.void, rows.dtype.itemsize * (rows.shape[1] - 1))))
+                _, first = np.unique(keys.reshape(-1), return_index=True)
+                rows = rows[np.sort(first)]
+            path = os.path.join(self.path, f"merged-{os.urandom(4).hex()}.gv")
+            write_shard(path, self.header(), rows)
+            for p in shards:
+                os.unlink(p)
+            return path
+
+    def compare(self, dut: np.ndarray, expected: np.ndarray | None = None) -> np.ndarray:
+        """Elementwise Mismatch codes of DUT results against the stored expected results"""
+        if expected is None:
+            expected = self.vectors()[:, -1]
+        assert len(dut) == len(expected), f"{len(dut)} DUT results for {len(expected)} vectors"
+        return classify(dut, expected, self.ew, self.mw)
+
+
+def random_operands(store: GoldenVectors, n: int, seed: int = 0) -> list[np.ndarray]:
+    """n random bit patterns per operand, or every pattern of a unary op's input when n < 0"""
+    rng = np.random.default_rng(seed)
+    if n < 0:
+        assert len(store.operand_formats) == 1, "only unary ops can be swept exhaustively"
+        ew, mw = store.operand_formats[0]
+        return [np.arange(1 << (1 + ew + mw), dtype=bits_dtype(ew, mw))]
+    return [rng.integers(0, 1 << (1 + ew + mw), n, dtype=np.uint64).astype(bits_dtype(ew, mw))
+            for ew, mw in store.operand_formats]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate golden vectors with the reference model")
+    parser.add_argument("op", choices=list(OPS))
+    parser.add_argument("config", type=int, nargs="+", help="arguments of <op>_batch after the operands")
+    parser.add_argument("-n", type=int, default=-1, help="random vectors (default: exhaustive, unary ops only)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-j", "--workers", type=int, default=1)
+    parser.add_argument("--dir", default=None, help="store root, default $PYEASYFLOAT_CACHE/golden")
+    parser.add_argument("--merge", action="store_true", help="only compact existing shards")
+    args = parser.parse_args()
+
+    store = GoldenVectors(args.op, args.config, args.dir)
+    if not args.merge:
+        operands = random_operands(store, args.n, args.seed)
+        if args.workers > 1:
+            with BackendPool("py", nWorkers=args.workers) as backend:
+                store.generate(operands, backend)
+        else:
+            store.generate(operands)
+    path = store.merge()
+    print(f"{store.op} {store.config}: {len(store.vectors())} vectors in {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+"""Counters, timers, histograms and traces of the arithmetic core.
+
+    with instrument(trace=True) as stats:
+        fma(a, b, c, 8, 23)
+    print(stats.to_json())
+
+While the context is active, the functions listed in INSTRUMENTED are
+replaced by wrappers in every loaded module that refers to them (including
+names bound by `from pyeasyfloat.fma import fma`), and put back on exit.
+Nothing is checked on the normal path, so there is no cost when
+instrumentation is off.
+
+Recorded per function: number of calls and inclusive time. Histograms:
+  add_unrounded.shift_amt  exponent difference the smaller operand is aligned by
+  mul_unrounded.product_carry  product of the mantissas in [2, 4), which
+      bumps the exponent by one
+  mul_unrounded.mantissa_bits / add_unrounded.mantissa_bits  width of the
+      unrounded mantissa, to compare against the datapath widths in FMA.scala
+  round_mantissa.carry_out  rounding overflowing into a new msb
+  round_raw_float.outcome  nan, zero, underflow, inf, overflow, carry_overflow
+      (rounding up into the inf exponent), carry or normal
+  add_unrounded.exp_drop  exponent of the larger operand minus that of the
+      result: bits lost to cancellation, -1 for a carry
+  add_unrounded.exact_zero  x + (-x)
+  div_mantissa.first_q_is_zero  dividend mantissa below the divisor's
+  split_float.branch  int (|x| >= 1), frac (|x| < 1, piece index taken from the
+      mantissa) or tiny (|x| too small to select a piece)
+With trace=True every call also appends an event with its depth, arguments and
+result, intermediate RawFloatPoint values included.
+"""
+import functools
+import importlib
+import json
+import sys
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator
+
+from pyeasyfloat.float import RawFloatPoint, FloatPoint, RoundingMode
+
+INSTRUMENTED = [
+    "pyeasyfloat.fma:mul_unrounded",
+    "pyeasyfloat.fma:add_unrounded",
+    "pyeasyfloat.fma:mul",
+    "pyeasyfloat.fma:add",
+    "pyeasyfloat.fma:fma",
+    "pyeasyfloat.rounding:round_mantissa",
+    "pyeasyfloat.rounding:round_raw_float",
+    "pyeasyfloat.div:div",
+    "pyeasyfloat.div:div_mantissa",
+    "pyeasyfloat.reciprocal:reciprocal",
+    "pyeasyfloat.exp:pow2",
+    "pyeasyfloat.exp:split_float",
+    "pyeasyfloat.batch:mul_batch",
+    "pyeasyfloat.batch:add_batch",
+    "pyeasyfloat.batch:fma_batch",
+]
+
+
+class Stats:
+    calls: Counter
+    # function -> total inclusive time in ns
+    time_ns: Counter
+    # histogram name -> value -> count
+    histograms: defaultdict[str, Counter]
+    trace: list[dict] | None
+    max_trace: int
+    depth: int
+
+    def __init__(self, trace: bool = False, max_trace: int = 1 << 20):
+        self.calls = Counter()
+        self.time_ns = Counter()
+        self.histograms = defaultdict(Counter)
+        self.trace = [] if trace else None
+        self.max_trace = max_trace
+        self.depth = 0
+
+    def to_dict(self) -> dict:
+        return {
+            "calls": dict(self.calls),
+            "time_s": {k: v * 1e-9 for k, v in self.time_ns.items()},
+            "histograms": {k: dict(sorted(h.items())) for k, h in self.histograms.items()},
+            "trace": self.trace,
+        }
+
+    def to_json(self, **kwargs) -> str:
+        return json.dumps(self.to_dict(), **kwargs)
+
+    def dump(self, path: str):
+        with open(path, "w") as f:
+            f.write(self.to_json(indent=1))
+
+
+def to_record(x: Any) -> Any:
+    """JSON friendly form of arguments and results"""
+    if isinstance(x, FloatPoint):
+        return {"ew": x.ew, "mw": x.mw, "bits": x.to_bits(), "sign": int(x.sign), "exp": x.exp, "mantissa": x.mantissa}
+    if isinstance(x, RawFloatPoint):
+        return {"sign": int(x.sign), "exp": x.exp, "mantissa": x.mantissa, "width": x.mantissa.bit_length(),
+                "is_zero": x.is_zero, "is_inf": x.is_inf, "is_nan": x.is_nan}
+    if isinstance(x, RoundingMode):
+        return x.name
+    if isinstance(x, (tuple, list)):
+        return [to_record(v) for v in x]
+    if isinstance(x, dict):
+        return {k: to_record(v) for k, v in x.items()}
+    if isinstance(x, (bool, int, float, str)) or x is None:
+        return x
+    return repr(x)
+
+
+def _observe(stats: Stats, name: str, args: tuple, res: Any):
+    """Histograms derived from the arguments and result of `name`"""
+    h = stats.histograms
+    match name:
+        case "mul_unrounded":
+            a, b = args
+            if not res.is_zero:
+                width = max(a.mantissa.bit_length(), b.mantissa.bit_length())
+                # same test as the exponent correction in mul_unrounded
+                h["mul_unrounded.product_carry"][res.mantissa.bit_length() == 2 * width] += 1
+            h["mul_unrounded.mantissa_bits"][res.mantissa.bit_length()] += 1
+        case "add_unrounded":
+            a, b = args[:2]
+            # same condition as the alignment path in add_unrounded
+            if not (a.is_inf or b.is_inf or a.is_zero or b.is_zero):
+                h["add_unrounded.shift_amt"][abs(a.exp - b.exp)] += 1
+                h["add_unrounded.mantissa_bits"][res.mantissa.bit_length()] += 1
+                h["add_unrounded.exact_zero"][res.is_zero] += 1
+                if not res.is_zero:
+                    h["add_unrounded.exp_drop"][max(a.exp, b.exp) - res.exp] += 1
+        case "round_mantissa":
+            h["round_mantissa.carry_out"][bool(res[1])] += 1
+        case "round_raw_float":
+            raw, ew = args[0], args[1]
+            bias = (1 << (ew - 1)) - 1
+            max_exp = (1 << ew) - 1
+            if raw.is_nan:
+                outcome = "nan"
+            elif raw.is_zero:
+                outcome = "zero"
+            elif raw.is_inf:
+                outcome = "inf"
+            elif res.exp == 0:
+                outcome = "underflow"
+            elif res.exp == max_exp:
+                outcome = "carry_overflow" if raw.exp + bias == max_exp - 1 else "overflow"
+            else:
+                outcome = "carry" if res.exp != raw.exp + bias else "normal"
+            h["round_raw_float.outcome"][outcome] += 1
+        case "div_mantissa":
+            h["div_mantissa.first_q_is_zero"][bool(res[2])] += 1
+        case "split_float":
+            x, pwl_segments = args[0], args[1]
+            if x.exp >= 0:
+                branch = "int"
+            elif -1 - x.exp < pwl_segments.bit_length() - 1:
+                branch = "frac"
+            else:
+                branch = "tiny"
+            h["split_float.branch"][branch] += 1
+
+
+def _wrap(stats: Stats, name: str, fn: Callable) -> Callable:
+    traced = not name.endswith("_batch")
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        depth = stats.depth
+        stats.depth = depth + 1
+        start = time.perf_counter_ns()
+        try:
+            res = fn(*args, **kwargs)
+        finally:
+            stats.time_ns[name] += time.perf_counter_ns() - start
+            stats.depth = depth
+        stats.calls[name] += 1
+        if traced:
+            _observe(stats, name, args, res)
+            # events are appended as calls return, callees before their caller
+            if stats.trace is not None and len(stats.trace) < stats.max_trace:
+                stats.trace.append({
+                    "fn": name, "depth": depth,
+                    "args": to_record(args), "kwargs": to_record(kwargs), "result": to_record(res),
+                })
+        return res
+    return wrapper
+
+
+_active: Stats | None = None
+
+
+@contextmanager
+def instrument(trace: bool = False, max_trace: int = 1 << 20) -> Iterator[Stats]:
+    """Collect Stats of every call to the INSTRUMENTED functions made inside the block.
+
+    The trace is capped at `max_trace` events; counters and histograms are not.
+    """
+    global _active
+    if _active is not None:
+        raise RuntimeError("instrument() is already active")
+    stats = Stats(trace, max_trace)
+    # id of the original function -> wrapper
+    wrappers = {}
+    for target in INSTRUMENTED:
+        module, _, attr = target.partition(":")
+        fn = getattr(importlib.import_module(module), attr)
+        wrappers[id(fn)] = _wrap(stats, attr, fn)
+    # rebind every module level reference, including those made by `from ... import ...`
+    patched = []
+    for mod in list(sys.modules.values()):
+        namespace = getattr(mod, "__dict__", None)
+        if not isinstance(namespace, dict):
+            continue
+        for attr, value in list(namespace.items()):
+            wrapper = wrappers.get(id(value))
+            if wrapper is not None and wrapper.__wrapped__ is value:
+                namespace[attr] = wrapper
+                patched.append((namespace, attr, value))
+    _active = stats
+    try:
+        yield stats
+    finally:
+        for namespace, attr, value in patched:
+            namespace[attr] = value
+        _active = None
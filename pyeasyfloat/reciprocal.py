@@ -1,44 +1,56 @@
-
+from functools import cache
 from pyeasyfloat.float import *
 from pyeasyfloat.fma import *
 
-def reciprocal(x: FloatPoint) -> FloatPoint:
+def max_iterations(mw: int) -> int:
+    """Iterations run by the hardware, starting from r0 = 1.0 (Reciprocal.nIterations)"""
+    # log2Up(mw + 1): iterations needed without round off error
+    min_iter = mw.bit_length()
+    # TODO: 4 is an empirical value to fix the round-off error, as in Reciprocal.scala
+    return min_iter + 4
+
+@cache
+def _constants(ew: int, mw: int) -> tuple[FloatPoint, FloatPoint, FloatPoint]:
+    """(1.0, 2.0, 0.0) in (ew, mw)"""
+    bias = (1 << (ew - 1)) - 1
+    one = FloatPoint(ew, mw, False, bias, 0)
+    two = FloatPoint(ew, mw, False, bias + 1, 0)
+    zero = FloatPoint(ew, mw, False, 0, 0)
+    return (one, two, zero)
+
+@cache
+def seed_table(ew: int, mw: int, seed_bits: int) -> list[FloatPoint]:
+    """Initial approximations of 1 / 1.xxx, indexed by the top `seed_bits` mantissa bits.
+    Each entry is the reciprocal of its interval midpoint."""
+    seeds = []
+    for i in range(1 << seed_bits):
+        mid = 1 + (i + 0.5) / (1 << seed_bits)
+        seeds.append(round_raw_float(FloatPoint.from_numpy(np.float64(1 / mid)).to_raw(), ew, mw))
+    return seeds
+
+def newton_raphson(x: FloatPoint, seed_bits: int | None = None) -> tuple[FloatPoint, int]:
     """
-    x: 1.xxx * 2^exp
-    1/x =  1 / (1.xxx * 2^exp) = (1 / 1.xxx) * 2^-exp
+    -> (1 / x, number of iterations used)
 
-    special cases:
-    1 / zero -> inf
-    1 / inf -> zero
-    1 / nan -> nan
+    By default r starts at 1.0, exactly as in Reciprocal.scala. Iterations stop
+    as soon as r settles, but the result is always the value the hardware holds
+    after max_iterations(x.mw) iterations: once r cycles between two values the
+    one matching the parity of the remaining iterations is returned.
+
+    With `seed_bits`, r starts from seed_table(...) instead. That is a different
+    datapath: results can differ from the hardware in the last bit. The loop is
+    still bounded by max_iterations(x.mw), not by the log2((mw + 1) / seed_bits)
+    iterations a seed would need without round-off, so seeding only saves the
+    iterations the early stop skips.
     """
+    one, two, zero = _constants(x.ew, x.mw)
 
-    r = RawFloatPoint()
-    r.sign = 0
-    r.exp = 0
-    r.mantissa = 1
-    r.is_inf = 0
-    r.is_nan = 0
-    r.is_zero = 0
-    r = round_raw_float(r, x.ew, x.mw)
-
-    two = RawFloatPoint()
-    two.sign = 0
-    two.exp = 1
-    two.mantissa = 1
-    two.is_inf = 0
-    two.is_nan = 0
-    two.is_zero = 0
-    two = round_raw_float(two, x.ew, x.mw)
-
-    zero = FloatPoint.from_bits(0, x.ew, x.mw)
-
-    xm = x.to_raw()
+    xm = x.to_raw().copy()
     xm.sign = True
     xm.exp = 0
     xm = round_raw_float(xm, x.ew, x.mw)
 
-    xe = x.to_raw()
+    xe = x.to_raw().copy()
     xe.mantissa = 1
     xe.exp = -xe.exp
     xe.is_nan = x.is_nan
@@ -46,14 +58,38 @@ def reciprocal(x: FloatPoint) -> FloatPoint:
     xe.is_zero = x.is_inf
     xe = round_raw_float(xe, x.ew, x.mw)
 
-    # min iterations needed without round off error
-    min_iter = int(np.log2(x.mw + 1))
-    # TODO: 4 is an empirical value, not a theoretical value
-    iter = min_iter + 5
-    for _ in range(iter):
+    n_iter = max_iterations(x.mw)
+    if seed_bits is None:
+        r = one
+    else:
+        r = seed_table(x.ew, x.mw, seed_bits)[(x.mantissa << seed_bits) >> x.mw]
+
+    r_prev = None
+    n_used = 0
+    for n_used in range(1, n_iter + 1):
         # 2 - r*d
         rd = fma(r, xm, two, x.ew, x.mw)
         # r*(2-rd)
-        r = fma(r, rd, zero, x.ew, x.mw)
+        r_next = fma(r, rd, zero, x.ew, x.mw)
+        if r_next.to_bits() == r.to_bits():
+            break
+        if r_prev is not None and r_next.to_bits() == r_prev.to_bits():
+            # r_prev, r, r_prev, r, ... from here on
+            if (n_iter - n_used) % 2 == 0:
+                r = r_next
+            break
+        r_prev, r = r, r_next
+
+    return (fma(r, xe, zero, x.ew, x.mw), n_used)
+
+def reciprocal(x: FloatPoint, seed_bits: int | None = None) -> FloatPoint:
+    """
+    x: 1.xxx * 2^exp
+    1/x =  1 / (1.xxx * 2^exp) = (1 / 1.xxx) * 2^-exp
 
-    return fma(r, xe, zero, x.ew, x.mw)
+    special cases:
+    1 / zero -> inf
+    1 / inf -> zero
+    1 / nan -> nan
+    """
+    return newton_raphson(x, seed_bits)[0]
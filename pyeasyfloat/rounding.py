@@ -1,4 +1,4 @@
-from pyeasyfloat.float import FloatPoint, RawFloatPoint, RoundingMode
+from pyeasyfloat.float import FloatFormat, FloatPoint, RawFloatPoint, RoundingMode
 from pyeasyfloat.fp_utils import low
 
 # -> (x', carry_out)
@@ -39,29 +39,24 @@ def round_mantissa(sign: int, x: int, xw: int, ow: int,  rm: RoundingMode=Roundi
 def round_raw_float(raw: RawFloatPoint, target_ew: int, target_mw: int, rm: RoundingMode=RoundingMode.RNE) -> FloatPoint:
     # round the result
     # add 1 to target_ew to account for the hidden bit
-    target = FloatPoint(target_ew, target_mw)
-    target.sign = raw.sign
-    m_rounded, carry_out = round_mantissa(raw.sign, raw.mantissa, raw.mantissa.bit_length(), 1 + target_mw, rm)
-    exp = raw.exp + int(carry_out)
-    biased_exp = exp + target.bias
+    fmt = FloatFormat.get(target_ew, target_mw)
 
     if raw.is_nan:
-        target.sign = False
-        target.exp = target.max_exp
-        target.mantissa = 1 << (target_mw - 1)
-        return target
-    elif raw.is_zero or biased_exp <= 0:
-        # underflow
-        target.exp = 0
-        target.mantissa = 0
-        return target
-    elif raw.is_inf or biased_exp >= target.max_exp:
-        # overflow
-        target.exp = target.max_exp
-        target.mantissa = 0
-        return target
+        sign, exp, mantissa = False, fmt.max_exp, 1 << (target_mw - 1)
     else:
-        target.exp = biased_exp
-        # remove the hidden bit
-        target.mantissa = low(m_rounded, target.mw)
-        return target
\ No newline at end of file
+        m_rounded, carry_out = round_mantissa(raw.sign, raw.mantissa, raw.mantissa.bit_length(), 1 + target_mw, rm)
+        biased_exp = raw.exp + int(carry_out) + fmt.bias
+        sign = raw.sign
+        if raw.is_zero or biased_exp <= 0:
+            # underflow
+            exp, mantissa = 0, 0
+        elif raw.is_inf or biased_exp >= fmt.max_exp:
+            # overflow
+            exp, mantissa = fmt.max_exp, 0
+        else:
+            # remove the hidden bit
+            exp, mantissa = biased_exp, m_rounded & fmt.mantissa_mask
+
+    if fmt.pool is not None:
+        return fmt.pool[(sign << (target_ew + target_mw)) | (exp << target_mw) | mantissa]
+    return FloatPoint(target_ew, target_mw, sign, exp, mantissa)
@@ -0,0 +1,145 @@
+"""Softmax / attention probabilities on the MulAddExp2Rec datapath.
+
+Every step is an operation the hardware performs in a single (ew, mw) format,
+so results are bit-exact with it when run on the same backend:
+
+    y = fma(x, scale, 0)          scale = log2(e) / sqrt(dk) for attention
+    m = max(y)                    per row
+    z = fma(y, 1, -m)             z <= 0
+    e = exp2(z)                   PWL pow2, coefficients in (ew, mw)
+    s = fma(e[k], 1, s)           sequentially over the row, from +0
+    r = reciprocal(s)             Newton-Raphson on the FMA
+    p = fma(e, r, 0)
+
+Scores are processed `row_chunk` rows at a time. With `col_chunk`, each row
+block is also swept in column chunks over three passes (max, exp2 + sum,
+normalize), so memory does not grow with the sequence length.
+"""
+from typing import Iterable, Iterator
+import numpy as np
+
+from pyeasyfloat.float import FloatPoint, FloatFormat
+from pyeasyfloat.rounding import round_raw_float
+from pyeasyfloat.batch import bits_dtype
+from pyeasyfloat.backend import BaseFPBackend, get_backend
+
+LOG2_E = np.log2(np.e)
+
+
+def round_constant(x: float, ew: int, mw: int) -> int:
+    """Bits of the float64 value x rounded to (ew, mw), as fp_consts.py emits constants"""
+    return round_raw_float(FloatPoint.from_numpy(np.float64(x)).to_raw(), ew, mw).to_bits()
+
+
+def attention_scale(dk: int, ew: int, mw: int) -> int:
+    """Bits of log2(e) / sqrt(dk), the attentionScale constant of fp_consts.py"""
+    return round_constant(LOG2_E / np.sqrt(dk, dtype=np.float64), ew, mw)
+
+
+def order_key(bits: np.ndarray, ew: int, mw: int) -> np.ndarray:
+    """int64 keys that sort packed floats by value (NaN above +inf)"""
+    bits = np.asarray(bits).astype(np.int64)
+    sign = bits >> (ew + mw)
+    magnitude = bits & ((1 << (ew + mw)) - 1)
+    return np.where(sign == 1, -magnitude, magnitude)
+
+
+class _Ops:
+    """Backend batch methods over arrays of any shape, in one (ew, mw) format"""
+
+    def __init__(self, backend: BaseFPBackend, ew: int, mw: int):
+        self.backend = backend
+        self.ew = ew
+        self.mw = mw
+        self.dtype = bits_dtype(ew, mw)
+        self.zero = self.dtype(0)
+        self.one = self.dtype(FloatFormat.get(ew, mw).bias << mw)
+        self.sign_bit = self.dtype(1 << (ew + mw))
+
+    def fma(self, a, b, c) -> np.ndarray:
+        a, b, c = np.broadcast_arrays(*(np.asarray(x, dtype=self.dtype) for x in (a, b, c)))
+        flat = [np.ascontiguousarray(x).reshape(-1) for x in (a, b, c)]
+        res = self.backend.fma_batch(*flat, self.ew, self.mw, self.ew, self.mw)
+        return np.asarray(res, dtype=self.dtype).reshape(a.shape)
+
+    def exp2(self, x: np.ndarray) -> np.ndarray:
+        ew, mw = self.ew, self.mw
+        res = self.backend.exp2_batch(np.ascontiguousarray(x).reshape(-1), ew, mw, ew, mw, ew, mw, ew, mw)
+        return np.asarray(res, dtype=self.dtype).reshape(x.shape)
+
+    def reciprocal(self, x: np.ndarray) -> np.ndarray:
+        res = self.backend.reciprocal_batch(np.ascontiguousarray(x).reshape(-1), self.ew, self.mw)
+        return np.asarray(res, dtype=self.dtype).reshape(x.shape)
+
+
+def _softmax_block(x: np.ndarray, ops: _Ops, scale: np.unsignedinteger, col_chunk: int) -> np.ndarray:
+    rows, cols = x.shape
+    chunks = [(lo, min(lo + col_chunk, cols)) for lo in range(0, cols, col_chunk)]
+
+    def scaled(lo, hi):
+        return ops.fma(x[:, lo:hi], scale, ops.zero)
+
+    # pass 1: row max of the scaled scores
+    m = np.zeros(rows, dtype=ops.dtype)
+    m_key = np.full(rows, np.iinfo(np.int64).min)
+    for lo, hi in chunks:
+        y = scaled(lo, hi)
+        idx = np.argmax(order_key(y, ops.ew, ops.mw), axis=1)
+        y_max = y[np.arange(rows), idx]
+        y_key = order_key(y_max, ops.ew, ops.mw)
+        m = np.where(y_key > m_key, y_max, m)
+        m_key = np.maximum(y_key, m_key)
+    neg_m = (m ^ ops.sign_bit)[:, None]
+
+    # pass 2: exp2 and its sequential sum
+    out = np.empty((rows, cols), dtype=ops.dtype)
+    acc = np.zeros(rows, dtype=ops.dtype)
+    for lo, hi in chunks:
+        e = ops.exp2(ops.fma(scaled(lo, hi), ops.one, neg_m))
+        out[:, lo:hi] = e
+        for k in range(hi - lo):
+            acc = ops.fma(e[:, k], ops.one, acc)
+
+    # pass 3: normalize
+    r = ops.reciprocal(acc)[:, None]
+    for lo, hi in chunks:
+        out[:, lo:hi] = ops.fma(out[:, lo:hi], r, ops.zero)
+    return out
+
+
+def softmax_blocks(blocks: Iterable[np.ndarray], ew: int, mw: int, scale: float = LOG2_E,
+                   backend: BaseFPBackend | str = "table", col_chunk: int | None = None) -> Iterator[np.ndarray]:
+    """Softmax of each (rows, cols) block of packed scores, one block at a time.
+
+    `scale` multiplies the scores before exp2, so LOG2_E gives softmax(x) and
+    LOG2_E / sqrt(dk) attention probabilities; it is rounded to (ew, mw) first.
+    """
+    if isinstance(backend, str):
+        backend = get_backend(backend)
+    ops = _Ops(backend, ew, mw)
+    scale_bits = ops.dtype(round_constant(scale, ew, mw))
+    for block in blocks:
+        block = np.asarray(block)
+        yield _softmax_block(block, ops, scale_bits, col_chunk or max(block.shape[1], 1))
+
+
+def softmax(scores: np.ndarray, ew: int, mw: int, scale: float = LOG2_E,
+            backend: BaseFPBackend | str = "table", row_chunk: int = 256, col_chunk: int | None = None,
+            out: np.ndarray | None = None) -> np.ndarray:
+    """Row-wise softmax of a (rows, cols) matrix of packed scores, e.g. a np.memmap.
+
+    Results are written into `out` (allocated if not given) `row_chunk` rows at a time.
+    """
+    rows = scores.shape[0]
+    if out is None:
+        out = np.empty(scores.shape, dtype=bits_dtype(ew, mw))
+    starts = range(0, rows, row_chunk)
+    blocks = (scores[lo:lo + row_chunk] for lo in starts)
+    for lo, res in zip(starts, softmax_blocks(blocks, ew, mw, scale, backend, col_chunk)):
+        out[lo:lo + len(res)] = res
+    return out
+
+
+def attention_probs(scores: np.ndarray, dk: int, ew: int, mw: int, **kwargs) -> np.ndarray:
+    """softmax(QK^T / sqrt(dk)) from packed QK^T scores, with the attentionScale constant"""
+    return softmax(scores, ew, mw, scale=LOG2_E / np.sqrt(dk, dtype=np.float64), **kwargs)
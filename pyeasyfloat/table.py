@@ -0,0 +1,103 @@
+"""Precomputed lookup tables for unary ops on small (<= 16 bit) formats.
+
+A table holds the result bits of an op for every input bit pattern. It is
+built once with the scalar reference, saved as a `.npy` file in a cache
+directory keyed by the op config and golden.reference_version(), and
+memory-mapped on later runs. Any change to the reference model therefore
+builds new tables instead of serving stale ones.
+"""
+import os
+import tempfile
+from typing import Callable
+import numpy as np
+
+from pyeasyfloat.float import FloatPoint, RoundingMode
+from pyeasyfloat.batch import bits_dtype
+from pyeasyfloat.exp import pow2, N_PIECES
+from pyeasyfloat.reciprocal import reciprocal
+from pyeasyfloat.div import div
+
+MAX_TABLE_BITS = 16
+
+
+def cache_dir() -> str:
+    """Directory holding the tables, overridable with $PYEASYFLOAT_CACHE."""
+    default = os.path.join(os.path.expanduser("~"), ".cache", "pyeasyfloat")
+    return os.environ.get("PYEASYFLOAT_CACHE", default)
+
+
+class UnaryOpTable:
+    """Result bits of a unary op for every (ew, mw) input bit pattern."""
+
+    def __init__(self, key: str, ew: int, mw: int, out_ew: int, out_mw: int,
+                 fn: Callable[[FloatPoint], FloatPoint], directory: str | None = None):
+        if 1 + ew + mw > MAX_TABLE_BITS:
+            raise ValueError(f"Format E={ew} M={mw} is too wide for a lookup table")
+        self.key = key
+        self.ew, self.mw = ew, mw
+        self.out_ew, self.out_mw = out_ew, out_mw
+        # golden imports cache_dir from here
+        from pyeasyfloat.golden import reference_version
+        self.path = os.path.join(directory or cache_dir(), f"{key}.{reference_version()}.npy")
+        if not os.path.exists(self.path):
+            self._build(fn)
+        self.table: np.ndarray = np.load(self.path, mmap_mode="r")
+
+    def _build(self, fn: Callable[[FloatPoint], FloatPoint]):
+        table = np.empty(1 << (1 + self.ew + self.mw), dtype=bits_dtype(self.out_ew, self.out_mw))
+        for i in range(len(table)):
+            table[i] = fn(FloatPoint.from_bits(i, self.ew, self.mw)).to_bits()
+        directory = os.path.dirname(self.path)
+        os.makedirs(directory, exist_ok=True)
+        # write to a temp file first so concurrent builders never see a partial table
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix=".npy")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.save(f, table)
+            os.replace(tmp, self.path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def __call__(self, x: FloatPoint) -> FloatPoint:
+        assert x.ew == self.ew and x.mw == self.mw, f"table {self.key} expects E={self.ew} M={self.mw}"
+        return FloatPoint.from_bits(self.table[x.to_bits()], self.out_ew, self.out_mw)
+
+    def lookup(self, bits: np.ndarray) -> np.ndarray:
+        """Gather results for an array of input bit patterns."""
+        return self.table[np.asarray(bits)]
+
+
+_TABLES: dict[str, UnaryOpTable] = {}
+
+
+def _get_table(key: str, ew: int, mw: int, out_ew: int, out_mw: int,
+               fn: Callable[[FloatPoint], FloatPoint]) -> UnaryOpTable:
+    if key not in _TABLES:
+        _TABLES[key] = UnaryOpTable(key, ew, mw, out_ew, out_mw, fn)
+    return _TABLES[key]
+
+
+def reciprocal_table(ew: int = 5, mw: int = 10) -> UnaryOpTable:
+    return _get_table(f"reciprocal_e{ew}m{mw}", ew, mw, ew, mw, reciprocal)
+
+
+def pow2_table(
+    ew: int, mw: int,
+    target_ew: int, target_mw: int,
+    pwl_mul_ew: int, pwl_mul_mw: int,
+    pwl_add_ew: int, pwl_add_mw: int,
+    rm: RoundingMode=RoundingMode.RNE,
+    pwl_pieces: int=N_PIECES
+) -> UnaryOpTable:
+    key = (f"pow2_e{ew}m{mw}_t{target_ew}m{target_mw}_mul{pwl_mul_ew}m{pwl_mul_mw}"
+           f"_add{pwl_add_ew}m{pwl_add_mw}_p{pwl_pieces}_{rm.name}")
+    fn = lambda x: pow2(x, target_ew, target_mw, pwl_mul_ew, pwl_mul_mw,
+                        pwl_add_ew, pwl_add_mw, rm, pwl_pieces)
+    return _get_table(key, ew, mw, target_ew, target_mw, fn)
+
+
+def div_by_const_table(y: FloatPoint) -> UnaryOpTable:
+    """Table of x / y for every x in the format of y."""
+    key = f"div_e{y.ew}m{y.mw}_by{y.to_bits():x}"
+    return _get_table(key, y.ew, y.mw, y.ew, y.mw, lambda x: div(x, y))
@@ -0,0 +1,300 @@
+"""Batched testfloat vectors.
+
+Lines look like `testfloat_gen` output, one vector per line in hex:
+
+    <operands...> <expected result> <exception flags>
+
+read_vectors() parses such a stream in large chunks into a (n, fields) uint64
+array. generate() writes the same format from a local generator (random
+operands plus edge cases), so the tests still run where Berkeley testfloat
+is not built. vectors() picks testfloat_gen when it is available, otherwise
+the local generator.
+
+    python -m pyeasyfloat.testfloat f16_mulAdd -n 1000 -seed 1
+"""
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+from typing import BinaryIO, Iterator
+import numpy as np
+
+TESTFLOAT_GEN = os.environ.get("TESTFLOAT_GEN", "../berkeley-testfloat-3/build/Linux-x86_64-GCC/testfloat_gen")
+TESTFLOAT_FLAGS = ["-tininessafter", "-exact", "-rnear_even"]
+
+# operation -> number of operands
+OPS = {"mulAdd": 3, "div": 2, "recip": 1}
+
+# exception flags, same bits as softfloat
+FLAG_INEXACT = 0x01
+FLAG_UNDERFLOW = 0x02
+FLAG_OVERFLOW = 0x04
+FLAG_INFINITE = 0x08
+FLAG_INVALID = 0x10
+
+_FORMATS = {(5, 10): ("f16", np.float16, np.uint16), (8, 23): ("f32", np.float32, np.uint32)}
+
+# ascii -> hex digit value
+_HEX_VALUE = np.zeros(256, dtype=np.uint64)
+for _i, _c in enumerate(b"0123456789abcdef"):
+    _HEX_VALUE[_c] = _i
+    _HEX_VALUE[ord(chr(_c).upper())] = _i
+_HEX_DIGIT = np.frombuffer(b"0123456789ABCDEF", dtype=np.uint8)
+
+
+def _format(ew: int, mw: int) -> tuple[str, type, type]:
+    try:
+        return _FORMATS[(ew, mw)]
+    except KeyError:
+        raise ValueError(f"Unsupported format E={ew} M={mw}") from None
+
+
+def hex_digits(ew: int, mw: int) -> int:
+    return (1 + ew + mw + 3) // 4
+
+
+def subnormal_mask(bits: np.ndarray, ew: int, mw: int) -> np.ndarray:
+    """bits that encode a subnormal (exp == 0, mantissa != 0)"""
+    bits = np.asarray(bits, dtype=np.uint64)
+    exp = (bits >> np.uint64(mw)) & np.uint64((1 << ew) - 1)
+    return (exp == 0) & ((bits & np.uint64((1 << mw) - 1)) != 0)
+
+
+def parse_lines(chunk: bytes, n_fields: int) -> np.ndarray:
+    """Parse whole lines of whitespace separated hex fields into a (lines, n_fields) uint64 array.
+
+    testfloat pads every field to a fixed width, in which case the digits are
+    decoded as one uint8 matrix; ragged input goes through int() per field.
+    """
+    line_len = chunk.find(b"\n") + 1
+    if line_len == 0:
+        return np.empty((0, n_fields), dtype=np.uint64)
+    if len(chunk) % line_len == 0:
+        lines = np.frombuffer(chunk, dtype=np.uint8).reshape(-1, line_len)
+        spaces = np.flatnonzero(lines[0] == ord(" "))
+        if (len(spaces) == n_fields - 1 and (lines[:, -1] == ord("\n")).all()
+                and (lines[:, spaces] == ord(" ")).all()):
+            starts = [0, *(spaces + 1).tolist()]
+            ends = [*spaces.tolist(), line_len - 1]
+            fields = np.empty((len(lines), n_fields), dtype=np.uint64)
+            for k, (lo, hi) in enumerate(zip(starts, ends)):
+                value = np.zeros(len(lines), dtype=np.uint64)
+                for col in range(lo, hi):
+                    value = (value << np.uint64(4)) | _HEX_VALUE[lines[:, col]]
+                fields[:, k] = value
+            return fields
+    tokens = chunk.split()
+    return np.array([int(t, 16) for t in tokens], dtype=np.uint64).reshape(-1, n_fields)
+
+
+def format_lines(fields: np.ndarray, digits: list[int]) -> bytes:
+    """Inverse of parse_lines: (lines, n_fields) values -> fixed width hex lines"""
+    fields = np.asarray(fields, dtype=np.uint64)
+    columns = []
+    for k, width in enumerate(digits):
+        shifts = np.arange(width - 1, -1, -1, dtype=np.uint64) * np.uint64(4)
+        columns.append(_HEX_DIGIT[(fields[:, k, None] >> shifts) & np.uint64(0xf)])
+        columns.append(np.full((len(fields), 1), ord(" ") if k + 1 < len(digits) else ord("\n"), dtype=np.uint8))
+    return np.hstack(columns).tobytes()
+
+
+def read_vectors(stream: BinaryIO, n_fields: int, chunk_bytes: int = 1 << 22) -> Iterator[np.ndarray]:
+    """Yield (lines, n_fields) uint64 arrays from a binary stream of hex lines"""
+    rest = b""
+    while True:
+        data = stream.read(chunk_bytes)
+        if not data:
+            break
+        data = rest + data
+        cut = data.rfind(b"\n") + 1
+        rest = data[cut:]
+        if cut:
+            yield parse_lines(data[:cut], n_fields)
+    if rest.strip():
+        yield parse_lines(rest + b"\n", n_fields)
+
+
+def _round_to_odd(s: np.ndarray, direction: np.ndarray) -> np.ndarray:
+    """s: float64 nearest to an exact value, direction: sign(exact - s).
+
+    Rounding the result to odd keeps enough information for a second, correct
+    rounding to any format at least 2 bits narrower than float64.
+    """
+    even = (s.view(np.uint64) & np.uint64(1)) == 0
+    step = (direction != 0) & even & np.isfinite(s)
+    return np.where(step, np.nextafter(s, np.where(direction > 0, np.inf, -np.inf)), s)
+
+
+def _round_to_format(s: np.ndarray, direction: np.ndarray, ew: int, mw: int,
+                     nan_operand: np.ndarray, flags: np.ndarray) -> np.ndarray:
+    """Correctly rounded (RNE) bits of the exact value bracketed by (s, direction), and its flags"""
+    _, ftype, utype = _format(ew, mw)
+    s = _round_to_odd(s, direction)
+    res = s.astype(ftype)
+    res64 = res.astype(np.float64)
+    inexact = np.isfinite(s) & ((direction != 0) | (res64 != s))
+    min_normal = np.float64(2.0) ** (2 - (1 << (ew - 1)))
+    # tininess after rounding: |exact| rounded with an unbounded exponent is below min normal
+    tiny = np.abs(s) < min_normal * (1 - np.float64(2.0) ** -(mw + 2))
+    flags |= np.where(inexact, FLAG_INEXACT, 0).astype(np.uint64)
+    flags |= np.where(inexact & tiny, FLAG_UNDERFLOW, 0).astype(np.uint64)
+    flags |= np.where(np.isfinite(s) & np.isinf(res), FLAG_OVERFLOW | FLAG_INEXACT, 0).astype(np.uint64)
+    flags |= np.where(np.isnan(s) & ~nan_operand, FLAG_INVALID, 0).astype(np.uint64)
+    bits = res.view(utype).astype(np.uint64)
+    # softfloat's default NaN
+    default_nan = np.uint64(((1 << (ew + 1)) - 1) << (mw - 1))
+    return np.where(np.isnan(s), default_nan, bits)
+
+
+def reference(op: str, operands: list[np.ndarray], ew: int, mw: int) -> tuple[np.ndarray, np.ndarray]:
+    """Correctly rounded RNE results of `op` on packed operands -> (result bits, flags)"""
+    _, ftype, utype = _format(ew, mw)
+    xs = [np.asarray(x).astype(utype).view(ftype).astype(np.float64) for x in operands]
+    nan_operand = np.logical_or.reduce([np.isnan(x) for x in xs])
+    flags = np.zeros(len(xs[0]), dtype=np.uint64)
+    with np.errstate(all="ignore"):
+        match op:
+            case "mulAdd":
+                a, b, c = xs
+                # exact in float64 for f16/f32 operands
+                p = a * b
+                s = p + c
+                # two-sum: e = (p + c) - s exactly
+                bb = s - p
+                e = (p - (s - bb)) + (c - bb)
+                direction = np.sign(np.nan_to_num(e))
+            case "div" | "recip":
+                if op == "div":
+                    a, b = xs
+                else:
+                    a, b = np.ones_like(xs[0]), xs[0]
+                s = a / b
+                # sign(a / b - s) = sign(a - s * b) * sign(b), s * b split exactly into hi + lo
+                hi, lo = _two_product(s, b)
+                rem = (a - hi) - lo
+                direction = np.sign(np.nan_to_num(rem)) * np.sign(b)
+                flags |= np.where((b == 0) & np.isfinite(a) & (a != 0), FLAG_INFINITE, 0).astype(np.uint64)
+            case _:
+                raise ValueError(f"Unknown op {op}, choose from {list(OPS)}")
+        direction = np.where(np.isfinite(s), direction, 0)
+        return (_round_to_format(s, direction, ew, mw, nan_operand, flags), flags)
+
+
+def _two_product(a: np.ndarray, b: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """a * b = hi + lo exactly (Dekker), for finite products without over/underflow"""
+    def split(x):
+        t = x * np.float64(134217729.0)  # 2^27 + 1
+        hi = t - (t - x)
+        return hi, x - hi
+    hi = a * b
+    a_hi, a_lo = split(a)
+    b_hi, b_lo = split(b)
+    lo = ((a_hi * b_hi - hi) + a_hi * b_lo + a_lo * b_hi) + a_lo * b_lo
+    return hi, lo
+
+
+def random_operands(rng: np.random.Generator, n: int, ew: int, mw: int) -> np.ndarray:
+    """Packed operands with exponents spread evenly over the whole range and a share of edge cases"""
+    exp_max = (1 << ew) - 1
+    sign = rng.integers(0, 2, n, dtype=np.uint64)
+    exp = rng.integers(0, exp_max + 1, n, dtype=np.uint64)
+    mantissa = rng.integers(0, 1 << mw, n, dtype=np.uint64)
+    # mantissas near the ends of the binade
+    pattern = rng.integers(0, 8, n)
+    mantissa = np.where(pattern == 0, np.uint64(0), mantissa)
+    mantissa = np.where(pattern == 1, np.uint64((1 << mw) - 1), mantissa)
+    bits = (sign << np.uint64(ew + mw)) | (exp << np.uint64(mw)) | mantissa
+    bias = (1 << (ew - 1)) - 1
+    edges = np.array([
+        0,                                     # zero
+        exp_max << mw,                         # inf
+        (exp_max << mw) | (1 << (mw - 1)),     # nan
+        1 << mw,                               # min normal
+        ((exp_max - 1) << mw) | ((1 << mw) - 1),  # max normal
+        1,                                     # min subnormal
+        (1 << mw) - 1,                         # max subnormal
+        bias << mw,                            # 1.0
+        ((bias - 1) << mw) | ((1 << mw) - 1),  # 1.0 - ulp
+        (bias << mw) | 1,                      # 1.0 + ulp
+    ], dtype=np.uint64)
+    edge = rng.random(n) < 1 / 16
+    return np.where(edge, rng.choice(edges, n) | (sign << np.uint64(ew + mw)), bits)
+
+
+def generate(op: str, ew: int, mw: int, n: int, seed: int = 0, chunk: int = 1 << 16) -> Iterator[bytes]:
+    """Yield testfloat formatted lines for n vectors of `op`, `chunk` vectors at a time"""
+    _, ftype, utype = _format(ew, mw)
+    rng = np.random.default_rng(seed)
+    digits = [hex_digits(ew, mw)] * (OPS[op] + 1) + [2]
+    for lo in range(0, n, chunk):
+        m = min(chunk, n - lo)
+        operands = [random_operands(rng, m, ew, mw) for _ in range(OPS[op])]
+        if op == "mulAdd":
+            # c close to -a*b for massive cancellation
+            a, b, c = (x.astype(utype).view(ftype) for x in operands)
+            with np.errstate(all="ignore"):
+                cancel = (-(a.astype(np.float64) * b)).astype(ftype).view(utype).astype(np.uint64)
+            operands[2] = np.where(rng.random(m) < 1 / 8, cancel, operands[2])
+        ref, flags = reference(op, operands, ew, mw)
+        yield format_lines(np.stack([*operands, ref, flags], axis=1), digits)
+
+
+class _ChunkReader:
+    """Minimal binary stream over an iterator of bytes"""
+
+    def __init__(self, chunks: Iterator[bytes]):
+        self.chunks = chunks
+
+    def read(self, size: int = -1) -> bytes:
+        return next(self.chunks, b"")
+
+
+def testfloat_available() -> bool:
+    return shutil.which(TESTFLOAT_GEN) is not None
+
+
+def vectors(op: str, ew: int, mw: int, n: int = -1, seed: int = 0, level: int = 1,
+            local: bool | None = None) -> Iterator[np.ndarray]:
+    """Yield (lines, operands + 2) uint64 arrays of `op` vectors: operands, expected result, flags.
+
+    Uses testfloat_gen if it is installed (or local=False), else the local generator.
+    n = -1 means every vector testfloat generates at `level`; the local
+    generator then produces 2^20 vectors per level.
+    """
+    fmt, _, _ = _format(ew, mw)
+    if local is None:
+        local = not testfloat_available()
+    if local:
+        count = n if n >= 0 else (1 << 20) * level
+        yield from read_vectors(_ChunkReader(generate(op, ew, mw, count, seed)), OPS[op] + 2)
+        return
+    if op not in ("mulAdd", "div"):
+        raise ValueError(f"testfloat_gen does not generate {op}")
+    cmd = [TESTFLOAT_GEN, *TESTFLOAT_FLAGS, "-seed", str(seed), "-level", str(level)]
+    if n >= 0:
+        cmd += ["-n", str(n)]
+    process = subprocess.Popen([*cmd, f"{fmt}_{op}"], stdout=subprocess.PIPE, stderr=sys.stderr)
+    try:
+        yield from read_vectors(process.stdout, OPS[op] + 2)
+    finally:
+        process.stdout.close()
+        process.kill()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="testfloat_gen compatible local vector generator")
+    parser.add_argument("function", help="e.g. f16_mulAdd, f32_div, f16_recip")
+    parser.add_argument("-n", type=int, default=1 << 20)
+    parser.add_argument("-seed", type=int, default=0)
+    args = parser.parse_args()
+    fmt, _, op = args.function.partition("_")
+    ew, mw = {name: key for key, (name, _, _) in _FORMATS.items()}[fmt]
+    out = sys.stdout.buffer
+    for lines in generate(op, ew, mw, args.n, args.seed):
+        out.write(lines)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,375 @@
+"""Sharded exhaustive verification across worker processes, resumable.
+
+The input space [start, stop) is split into shards. With several operands an
+input is a flat index into the product of their bit spaces, the first operand
+in the most significant bits (for fp16 div, x = i >> 16 and y = i & 0xffff).
+Every worker process builds its own DUT and reference backends once, runs
+`<op>_batch` on both for each shard it receives, and returns a ShardSummary.
+Summaries are merged in the parent, so all mismatches are counted instead of
+stopping at the first.
+
+With a checkpoint path, the completed shards and their merged summary are
+written there atomically every few seconds and when the sweep stops. Running
+the same sweep with the same checkpoint skips the shards already done, so a
+2^32 input sweep survives being killed.
+
+    python -m pyeasyfloat.verify reciprocal --ew 5 --mw 10 --dut table --ref py -j 8
+    python -m pyeasyfloat.verify div --ew 5 --mw 10 --dut verilator Div.sv -j 8 --checkpoint div16.json
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from enum import IntEnum
+from typing import Callable, Sequence
+import numpy as np
+
+from pyeasyfloat.backend import BaseFPBackend, get_backend
+from pyeasyfloat.batch import bits_dtype
+
+
+class Mismatch(IntEnum):
+    """Why a DUT result differs from the reference, 0 meaning it does not."""
+    NONE = 0
+    # reference is subnormal, DUT flushed it to zero
+    SUBNORMAL_FLUSH = 1
+    # both are NaN with different sign/payload
+    NAN_PAYLOAD = 2
+    # +0 vs -0
+    SIGNED_ZERO = 3
+    ERROR = 4
+
+
+def classify(dut: np.ndarray, ref: np.ndarray, ew: int, mw: int) -> np.ndarray:
+    """Elementwise Mismatch codes of dut vs ref packed (ew, mw) results."""
+    dut = np.asarray(dut).astype(np.uint64)
+    ref = np.asarray(ref).astype(np.uint64)
+    m_mask = np.uint64((1 << mw) - 1)
+    e_mask = np.uint64((1 << ew) - 1)
+    body_mask = np.uint64((1 << (ew + mw)) - 1)
+
+    def fields(x):
+        return (x >> np.uint64(mw)) & e_mask, x & m_mask
+
+    dut_e, dut_m = fields(dut)
+    ref_e, ref_m = fields(ref)
+    dut_nan = (dut_e == e_mask) & (dut_m != 0)
+    ref_nan = (ref_e == e_mask) & (ref_m != 0)
+    dut_zero = (dut & body_mask) == 0
+    ref_zero = (ref & body_mask) == 0
+    ref_subnormal = (ref_e == 0) & (ref_m != 0)
+
+    return np.select(
+        [dut == ref, dut_nan & ref_nan, dut_zero & ref_zero, dut_zero & ref_subnormal],
+        [Mismatch.NONE, Mismatch.NAN_PAYLOAD, Mismatch.SIGNED_ZERO, Mismatch.SUBNORMAL_FLUSH],
+        default=Mismatch.ERROR,
+    ).astype(np.int8)
+
+
+class ShardSummary:
+    """Mismatch counts over a set of inputs, plus the first few examples of each kind."""
+    tested: int
+    counts: dict[Mismatch, int]
+    # category -> up to max_examples (input bits or flat index, dut bits, ref bits)
+    by_kind: dict[Mismatch, list[tuple[int, int, int]]]
+    max_examples: int
+
+    def __init__(self, max_examples: int = 16):
+        self.tested = 0
+        self.counts = {m: 0 for m in Mismatch if m != Mismatch.NONE}
+        self.by_kind = {m: [] for m in self.counts}
+        self.max_examples = max_examples
+
+    def add(self, xs: np.ndarray, dut: np.ndarray, ref: np.ndarray, ew: int, mw: int):
+        codes = classify(dut, ref, ew, mw)
+        self.tested += len(xs)
+        for m in self.counts:
+            hits = np.flatnonzero(codes == m)
+            self.counts[m] += len(hits)
+            examples = self.by_kind[m]
+            for i in hits[:self.max_examples - len(examples)]:
+                examples.append((int(xs[i]), int(dut[i]), int(ref[i])))
+
+    def merge(self, other: "ShardSummary") -> "ShardSummary":
+        self.tested += other.tested
+        for m, n in other.counts.items():
+            self.counts[m] += n
+            examples = self.by_kind[m]
+            examples.extend(other.by_kind[m][:self.max_examples - len(examples)])
+        return self
+
+    @property
+    def examples(self) -> list[tuple[int, int, int, Mismatch]]:
+        """(input bits or flat index, dut bits, ref bits, category), grouped by category"""
+        return [(x, d, r, m) for m, examples in self.by_kind.items() for x, d, r in examples]
+
+    def to_dict(self) -> dict:
+        return {"tested": self.tested, "counts": {m.name: n for m, n in self.counts.items()},
+                "examples": {m.name: [list(e) for e in examples] for m, examples in self.by_kind.items()}}
+
+    @classmethod
+    def from_dict(cls, d: dict, max_examples: int = 16) -> "ShardSummary":
+        summary = cls(max_examples)
+        summary.tested = d["tested"]
+        summary.counts = {m: d["counts"].get(m.name, 0) for m in summary.counts}
+        for m in summary.by_kind:
+            summary.by_kind[m] = [tuple(e) for e in d["examples"].get(m.name, [])][:max_examples]
+        return summary
+
+    @property
+    def errors(self) -> int:
+        return self.counts[Mismatch.ERROR]
+
+    def __repr__(self):
+        counts = " ".join(f"{m.name.lower()}: {n}" for m, n in self.counts.items())
+        return f"tested: {self.tested} {counts}"
+
+
+def operands_at(index: np.ndarray, in_fmts: Sequence[tuple[int, int]]) -> list[np.ndarray]:
+    """Operand bits of flat indices into the product of the operands' bit spaces"""
+    index = np.asarray(index, dtype=np.uint64)
+    operands = []
+    shift = sum(1 + ew + mw for ew, mw in in_fmts)
+    for ew, mw in in_fmts:
+        shift -= 1 + ew + mw
+        operands.append(((index >> np.uint64(shift)) & np.uint64((1 << (1 + ew + mw)) - 1)).astype(bits_dtype(ew, mw)))
+    return operands
+
+
+class Checkpoint:
+    """Progress of a sweep on disk: what was swept, the completed shards, their merged summary.
+
+    Shards below `watermark` are all done; `done` holds the ones completed
+    above it, out of order. Saves go to a temp file renamed over the old one.
+    """
+    path: str | None
+    sweep: dict
+    watermark: int
+    done: set[int]
+    summary: ShardSummary
+
+    def __init__(self, path: str | None, sweep: dict, max_examples: int = 16):
+        self.path = path
+        self.sweep = sweep
+        self.watermark = 0
+        self.done = set()
+        self.summary = ShardSummary(max_examples)
+        if path and os.path.exists(path):
+            with open(path) as f:
+                state = json.load(f)
+            if state["sweep"] != sweep:
+                raise ValueError(f"{path} checkpoints a different sweep: {state['sweep']}")
+            self.watermark = state["watermark"]
+            self.done = set(state["done"])
+            self.summary = ShardSummary.from_dict(state["summary"], max_examples)
+
+    def is_done(self, shard: int) -> bool:
+        return shard < self.watermark or shard in self.done
+
+    def complete(self, shard: int, summary: ShardSummary):
+        self.summary.merge(summary)
+        self.done.add(shard)
+        while self.watermark in self.done:
+            self.done.remove(self.watermark)
+            self.watermark += 1
+
+    def save(self):
+        state = {"sweep": self.sweep, "watermark": self.watermark, "done": sorted(self.done),
+                 "summary": self.summary.to_dict()}
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(state, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+
+# per-process state, set up once by _init_worker
+_worker: dict = {}
+
+
+def _init_worker(dut: tuple, ref: tuple, op: str, op_args: tuple, out_fmt: tuple[int, int],
+                 max_examples: int):
+    _worker["dut"] = get_backend(dut[0], *dut[1:])
+    _worker["ref"] = get_backend(ref[0], *ref[1:])
+    _worker["op"] = f"{op}_batch"
+    _worker["op_args"] = op_args
+    _worker["out_fmt"] = out_fmt
+    _worker["max_examples"] = max_examples
+
+
+def _run_shard(start: int, stop: int, in_fmts: list[tuple[int, int]]) -> ShardSummary:
+    xs = np.arange(start, stop, dtype=np.uint64)
+    operands = operands_at(xs, in_fmts)
+    dut: BaseFPBackend = _worker["dut"]
+    ref: BaseFPBackend = _worker["ref"]
+    dut_bits = getattr(dut, _worker["op"])(*operands, *_worker["op_args"])
+    ref_bits = getattr(ref, _worker["op"])(*operands, *_worker["op_args"])
+    summary = ShardSummary(_worker["max_examples"])
+    summary.add(xs, dut_bits, ref_bits, *_worker["out_fmt"])
+    return summary
+
+
+def verify_sweep(
+    op: str, op_args: tuple,
+    in_fmts: Sequence[tuple[int, int]], out_fmt: tuple[int, int],
+    dut: tuple = ("py",), ref: tuple = ("py",),
+    start: int = 0, stop: int | None = None,
+    shard_size: int = 1 << 16, workers: int | None = None,
+    max_examples: int = 16,
+    progress: Callable[[int, int], None] | None = None,
+    checkpoint: str | None = None, checkpoint_interval: float = 30.0,
+) -> ShardSummary:
+    """Compare `dut.<op>_batch(*operands, *op_args)` against `ref` for every flat input index in [start, stop).
+
+    dut/ref are (registry name, *constructor args) tuples, e.g. ("verilator", "Div.sv"),
+    so that each worker can build its own instance. op_args follow the operands,
+    e.g. (5, 10) for div_batch. progress(done, total) is called once on start,
+    then after each shard. With `checkpoint`, progress is saved there at most
+    every checkpoint_interval seconds and on exit, and resumed from it.
+    """
+    in_fmts = [tuple(fmt) for fmt in in_fmts]
+    stop = (1 << sum(1 + ew + mw for ew, mw in in_fmts)) if stop is None else stop
+    workers = workers or os.cpu_count()
+    n_shards = (stop - start + shard_size - 1) // shard_size
+    total = stop - start
+    sweep = {"op": op, "op_args": list(op_args), "in_fmts": [list(f) for f in in_fmts], "out_fmt": list(out_fmt),
+             "dut": list(dut), "ref": list(ref), "start": start, "stop": stop, "shard_size": shard_size}
+    state = Checkpoint(checkpoint, sweep, max_examples)
+    done = state.summary.tested
+    if progress:
+        progress(done, total)
+    last_save = time.monotonic()
+    initargs = (dut, ref, op, op_args, tuple(out_fmt), max_examples)
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=initargs) as pool:
+        # keep a bounded number of shards in flight so 2^32 inputs never materialize at once
+        pending = {}
+
+        def collect(finished):
+            nonlocal done, last_save
+            for f in finished:
+                state.complete(pending.pop(f), f.result())
+                done += f.result().tested
+                if progress:
+                    progress(done, total)
+            if checkpoint and time.monotonic() - last_save >= checkpoint_interval:
+                state.save()
+                last_save = time.monotonic()
+
+        try:
+            for shard in range(n_shards):
+                if state.is_done(shard):
+                    continue
+                lo = start + shard * shard_size
+                pending[pool.submit(_run_shard, lo, min(lo + shard_size, stop), in_fmts)] = shard
+                if len(pending) >= 2 * workers:
+                    finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    collect(finished)
+            while pending:
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                collect(finished)
+        finally:
+            if checkpoint:
+                state.save()
+            for f in pending:
+                f.cancel()
+    return state.summary
+
+
+def verify_unary(
+    op: str, op_args: tuple,
+    ew: int, mw: int, out_ew: int, out_mw: int,
+    dut: tuple = ("py",), ref: tuple = ("py",),
+    start: int = 0, stop: int | None = None,
+    shard_size: int = 1 << 16, workers: int | None = None,
+    max_examples: int = 16,
+    progress: Callable[[int, int], None] | None = None,
+    checkpoint: str | None = None,
+) -> ShardSummary:
+    """Compare `dut.<op>_batch(xs, *op_args)` against `ref` for every xs in [start, stop).
+
+    e.g. op_args (5, 10) for reciprocal_batch, see verify_sweep.
+    """
+    return verify_sweep(op, op_args, [(ew, mw)], (out_ew, out_mw), dut, ref, start, stop, shard_size,
+                        workers, max_examples, progress, checkpoint)
+
+
+class ProgressReport:
+    """progress callback printing throughput of this run and the ETA"""
+
+    def __init__(self, interval: float = 1.0):
+        self.interval = interval
+        self.begin = None
+        self.last = 0.0
+
+    def __call__(self, done: int, total: int):
+        now = time.perf_counter()
+        if self.begin is None:
+            self.begin, self.first = now, done
+        if now - self.last < self.interval and done < total:
+            return
+        self.last = now
+        rate = (done - self.first) / max(now - self.begin, 1e-9)
+        eta = time.strftime("%H:%M:%S", time.gmtime((total - done) / rate)) if rate else "?"
+        days = int((total - done) / rate // 86400) if rate else 0
+        eta = f"{days}d {eta}" if days else eta
+        print(f"\r{done}/{total} ({100 * done / total:.2f}%) {rate:.0f} inputs/s ETA {eta}   ",
+              end="", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("op", choices=["reciprocal", "exp2", "div", "fma"])
+    parser.add_argument("--ew", type=int, default=5)
+    parser.add_argument("--mw", type=int, default=10)
+    parser.add_argument("--dut", nargs="+", default=["table"], help="backend name and args")
+    parser.add_argument("--ref", nargs="+", default=["py"], help="backend name and args")
+    parser.add_argument("--start", type=lambda s: int(s, 0), default=0)
+    parser.add_argument("--stop", type=lambda s: int(s, 0), default=None)
+    parser.add_argument("--shard-size", type=lambda s: int(s, 0), default=1 << 16)
+    parser.add_argument("--pwl", type=int, nargs=4, default=None,
+                        help="exp2 mul/add formats: MUL_EW MUL_MW ADD_EW ADD_MW (default: input format)")
+    parser.add_argument("--pwl-pieces", type=int, default=8)
+    parser.add_argument("--acc", type=int, nargs=2, default=None,
+                        help="fma addend and result format: EW MW (default: input format)")
+    parser.add_argument("-j", "--workers", type=int, default=None)
+    parser.add_argument("--checkpoint", default=None, help="file to save progress to and resume from")
+    args = parser.parse_args()
+
+    ew, mw = args.ew, args.mw
+    out_fmt = (ew, mw)
+    match args.op:
+        case "reciprocal":
+            in_fmts, op_args = [(ew, mw)], (ew, mw)
+        case "exp2":
+            pwl = args.pwl or [ew, mw, ew, mw]
+            in_fmts, op_args = [(ew, mw)], (ew, mw, ew, mw, *pwl, args.pwl_pieces)
+        case "div":
+            in_fmts, op_args = [(ew, mw)] * 2, (ew, mw)
+        case "fma":
+            out_fmt = tuple(args.acc or (ew, mw))
+            in_fmts, op_args = [(ew, mw), (ew, mw), out_fmt], (ew, mw, *out_fmt)
+
+    begin = time.perf_counter()
+    summary = verify_sweep(
+        args.op, op_args, in_fmts, out_fmt,
+        dut=tuple(args.dut), ref=tuple(args.ref),
+        start=args.start, stop=args.stop, shard_size=args.shard_size, workers=args.workers,
+        progress=ProgressReport(), checkpoint=args.checkpoint,
+    )
+    elapsed = time.perf_counter() - begin
+    print(f"\n{summary} ({elapsed:.0f}s)")
+    for x, d, r, m in summary.examples:
+        operands = " ".join(f"{int(b[0]):#x}" for b in operands_at(np.array([x]), in_fmts))
+        print(f"{m.name}: {operands} dut={d:#x} ref={r:#x}")
+
+
+if __name__ == "__main__":
+    main()
@@ -56,15 +56,65 @@ object PyFPConst {
     }
   }
 
+  /*
+  constants written by `fp_consts.py grid` (default --out-dir) are read from
+  here instead of running the script once per constant, as long as the
+  reference model sources hashed into manifest.json are unchanged
+  */
+  private val gridDir = "build/fp_consts"
+  private val gridUpToDate = scala.collection.mutable.Map.empty[String, Boolean]
+
+  // same hash as golden.reference_version(): sha256 of the concatenated sources, first 16 hex digits
+  private def referenceVersion(projectDir: String, files: Seq[String]): Option[String] = Try {
+    val digest = java.security.MessageDigest.getInstance("SHA-256")
+    files.foreach(f => digest.update(java.nio.file.Files.readAllBytes(new File(projectDir, f).toPath)))
+    digest.digest().map("%02x".format(_)).mkString.take(16)
+  }.toOption
+
+  private def gridIsCurrent(projectDir: String): Boolean = gridUpToDate.getOrElseUpdate(projectDir, {
+    val manifest = new File(new File(projectDir, gridDir), "manifest.json")
+    val current = manifest.isFile && {
+      val source = scala.io.Source.fromFile(manifest)
+      val text = try source.mkString finally source.close()
+      val version = """"reference_version"\s*:\s*"([0-9a-f]+)"""".r.findFirstMatchIn(text).map(_.group(1))
+      val files = """"reference_files"\s*:\s*\[([^\]]*)\]""".r.findFirstMatchIn(text).map { m =>
+        """"([^"]+)"""".r.findAllMatchIn(m.group(1)).map(_.group(1)).toSeq
+      }
+      (version, files) match {
+        case (Some(v), Some(fs)) if fs.nonEmpty => referenceVersion(projectDir, fs).contains(v)
+        case _ => false
+      }
+    }
+    if (!current && new File(projectDir, gridDir).isDirectory) {
+      System.err.println(s"[PyFPConst] $gridDir is stale, rerun `fp_consts.py grid`; running the script per constant")
+    }
+    current
+  })
+
+  private def pregenerated(projectDir: String, name: String): Option[Seq[BigInt]] = {
+    val file = new File(new File(projectDir, gridDir), name + ".mem")
+    if (!file.isFile || !gridIsCurrent(projectDir)) {
+      None
+    } else {
+      val source = scala.io.Source.fromFile(file)
+      try Some(source.getLines().map(_.strip).filter(_.nonEmpty).map(BigInt(_, 16)).toList)
+      finally source.close()
+    }
+  }
+
   def attentionScale(ew: Int, mw: Int, dk: Int, projectDir: String = "."): BigInt = {
-    val out = runScript("attentionScale", ew, mw, projectDir, Seq("--dk", dk.toString)).strip()
-    BigInt(out, 16)
+    pregenerated(projectDir, s"attentionScale_e${ew}m${mw}_dk${dk}").map(_.head).getOrElse {
+      val out = runScript("attentionScale", ew, mw, projectDir, Seq("--dk", dk.toString)).strip()
+      BigInt(out, 16)
+    }
   }
 
   private def pwl(choice: String)(ew: Int, mw: Int, projectDir: String = ".", pieces: Int = 8): Seq[BigInt] = {
-    runScript(choice, ew, mw, projectDir, Seq("--pwl-pieces", pieces.toString)).split("\n").map(s =>
-      BigInt(s, 16)
-    )
+    pregenerated(projectDir, s"${choice}_e${ew}m${mw}_p${pieces}").getOrElse {
+      runScript(choice, ew, mw, projectDir, Seq("--pwl-pieces", pieces.toString)).split("\n").map(s =>
+        BigInt(s, 16)
+      ).toSeq
+    }
   }
 
   def slopes(ew: Int, mw: Int, projectDir: String = ".", pieces: Int = 8) : Seq[BigInt] =
@@ -0,0 +1,69 @@
+import random
+from pyeasyfloat.float import RawFloatPoint, RoundingMode
+from pyeasyfloat.fma import add_unrounded
+from pyeasyfloat.rounding import round_raw_float
+
+# (target ew, target mw) the sums are rounded to, precision = mw + 1
+TARGETS = [(5, 10), (8, 7), (8, 23)]
+# mantissa widths of the operands, e.g. 2 * (mw + 1) for products
+WIDTHS = [8, 11, 16, 22, 24, 48]
+
+
+def raw(sign: bool, exp: int, mantissa: int) -> RawFloatPoint:
+    x = RawFloatPoint()
+    x.sign = sign
+    x.exp = exp
+    x.mantissa = mantissa
+    x.is_zero = False
+    x.is_inf = False
+    x.is_nan = False
+    return x
+
+
+def mantissa(rng: random.Random, width: int) -> int:
+    """width-bit mantissa with the msb set, often with only a few low bits set for the sticky"""
+    match rng.randrange(4):
+        case 0:
+            return 1 << (width - 1)
+        case 1:
+            return (1 << (width - 1)) | 1
+        case 2:
+            return (1 << width) - 1
+        case _:
+            return (1 << (width - 1)) | rng.getrandbits(width - 1)
+
+
+def test_add_unrounded(n: int = 200, seed: int = 0) -> int:
+    """add_unrounded(a, b, precision) rounds to the same value as the unbounded sum,
+    for exponent gaps around the alignment limit max(precision, width) + 3"""
+    rng = random.Random(seed)
+    errors = 0
+    tested = 0
+    for ew, mw in TARGETS:
+        precision = mw + 1
+        for wa in WIDTHS:
+            for wb in WIDTHS:
+                limit = max(precision, wa, wb) + 3
+                gaps = [*range(limit - 3, limit + 5), 2 * limit, 200]
+                for _ in range(n):
+                    shift = rng.choice(gaps)
+                    exp = rng.randrange(-20, 20)
+                    a = raw(rng.random() < 0.5, exp, mantissa(rng, wa))
+                    b = raw(rng.random() < 0.5, exp + shift, mantissa(rng, wb))
+                    if rng.random() < 0.5:
+                        a, b = b, a
+                    exact = add_unrounded(a, b)
+                    capped = add_unrounded(a, b, precision)
+                    for rm in RoundingMode:
+                        tested += 1
+                        ref = round_raw_float(exact, ew, mw, rm).to_bits()
+                        res = round_raw_float(capped, ew, mw, rm).to_bits()
+                        if res != ref:
+                            errors += 1
+                            print(f"({ew}, {mw}) {rm.name} widths {wa} {wb} gap {shift}: "
+                                  f"a={a} b={b} capped={res:x} exact={ref:x}")
+    print(f"Test finished! tested: {tested} errors: {errors}")
+    return errors
+
+
+test_add_unrounded()
@@ -0,0 +1,73 @@
+import numpy as np
+from pyeasyfloat.array import EasyFloatArray, fma, round_float64
+from pyeasyfloat.float import FloatPoint
+from pyeasyfloat.fma import mul as mul_scalar, fma as fma_scalar
+
+# formats without a numpy dtype: float64 operands are rounded into them
+NON_NATIVE = [(8, 7), (4, 3), (5, 2)]
+
+
+def check(name: str, got: np.ndarray, want: np.ndarray) -> int:
+    got, want = np.asarray(got), np.asarray(want)
+    if got.shape != want.shape or np.any(got != want):
+        print(f"{name}: got {got!r}, want {want!r}")
+        return 1
+    return 0
+
+
+def test_coercion() -> int:
+    """float64 arrays and Python scalars are rounded into formats without a numpy dtype"""
+    errors = 0
+    xs = np.linspace(-3, 3, 7)
+    for ew, mw in NON_NATIVE:
+        fmt = f"({ew}, {mw})"
+        a = EasyFloatArray.from_numpy(xs, ew, mw)
+        errors += check(f"from_numpy float64 {fmt}", a.bits, round_float64(xs, ew, mw))
+        errors += check(f"from_numpy float64 {fmt} values", a.to_numpy(), xs)
+        errors += check(f"from_numpy float32 {fmt}", EasyFloatArray.from_numpy(xs.astype(np.float32), ew, mw).bits, a.bits)
+        errors += check(f"from_numpy scalar {fmt}", EasyFloatArray.from_numpy(1.0, ew, mw).bits, round_float64(1.0, ew, mw))
+        errors += check(f"+ 1.0 {fmt}", (a + 1.0).to_numpy(), xs + 1)
+        errors += check(f"1.0 - {fmt}", (1.0 - a).to_numpy(), 1 - xs)
+        errors += check(f"* array {fmt}", (a * np.full(7, 2.0)).to_numpy(), xs * 2)
+        errors += check(f"* int {fmt}", (a * 2).to_numpy(), xs * 2)
+        b = a.reshape(7, 1) * np.array([[1.0, -1.0]])
+        errors += check(f"broadcast {fmt}", b.to_numpy(), xs[:, None] * np.array([[1.0, -1.0]]))
+        c = EasyFloatArray.from_numpy(xs, ew, mw)
+        c[0] = 0.5
+        errors += check(f"setitem {fmt}", c.to_numpy()[0], 0.5)
+    return errors
+
+
+def test_zero_copy() -> int:
+    """native formats share the buffer both ways"""
+    errors = 0
+    for dtype, (ew, mw) in [(np.float16, (5, 10)), (np.float32, (8, 23)), (np.float64, (11, 52))]:
+        x = np.linspace(-2, 2, 9).astype(dtype)
+        a = EasyFloatArray.from_numpy(x)
+        if (a.ew, a.mw) != (ew, mw) or not np.shares_memory(a.bits, x):
+            print(f"from_numpy {dtype.__name__} copied or picked ({a.ew}, {a.mw})")
+            errors += 1
+        y = a.to_numpy()
+        if y.dtype != dtype or not np.shares_memory(y, x):
+            print(f"to_numpy {dtype.__name__} copied or returned {y.dtype}")
+            errors += 1
+        errors += check(f"round trip {dtype.__name__}", y, x)
+    return errors
+
+
+def test_fp64_fallback(n: int = 200, seed: int = 0) -> int:
+    """fp64 products are too wide for the batch engine and go through the scalar reference"""
+    rng = np.random.default_rng(seed)
+    errors = 0
+    x, y, z = (rng.standard_normal(n) * 2.0 ** rng.integers(-60, 60, n) for _ in range(3))
+    a, b, c = (EasyFloatArray.from_numpy(v) for v in (x, y, z))
+    fp = lambda v: FloatPoint.from_numpy(np.float64(v))
+    ref_mul = [mul_scalar(fp(u), fp(v), 11, 52).to_bits() for u, v in zip(x, y)]
+    ref_fma = [fma_scalar(fp(u), fp(v), fp(w), 11, 52).to_bits() for u, v, w in zip(x, y, z)]
+    errors += check("fp64 multiply", (a * b).bits, np.array(ref_mul, dtype=np.uint64))
+    errors += check("fp64 fma", fma(a, b, c).bits, np.array(ref_fma, dtype=np.uint64))
+    return errors
+
+
+errors = test_coercion() + test_zero_copy() + test_fp64_fallback()
+print(f"Test finished! errors: {errors}")
@@ -0,0 +1,190 @@
+import numpy as np
+from pyeasyfloat.backend import *
+from pyeasyfloat.batch import mul_batch, add_batch, fma_batch, div_batch, reciprocal_batch, pow2_batch
+from pyeasyfloat.float import FloatPoint, RoundingMode
+from pyeasyfloat.fma import mul, add, fma
+from pyeasyfloat.div import div
+from pyeasyfloat.reciprocal import reciprocal
+from pyeasyfloat.exp import pow2
+from pyeasyfloat.testfloat import random_operands
+
+# (mul format, add format) pairs of fma_batch
+FORMATS = [
+    ((5, 10), (5, 10)),
+    ((5, 10), (8, 23)),
+    ((8, 7), (8, 23)),
+    ((8, 7), (5, 10)),
+    ((8, 23), (8, 23)),
+    ((8, 23), (5, 10)),
+]
+
+
+def with_exp(bits: np.ndarray, exp: np.ndarray, ew: int, mw: int) -> np.ndarray:
+    """bits with their exponent field replaced, clipped to the normal range"""
+    exp = np.clip(exp, 1, (1 << ew) - 2).astype(np.uint64)
+    return (bits & ~np.uint64(((1 << ew) - 1) << mw)) | (exp << np.uint64(mw))
+
+
+def fma_operands(rng: np.random.Generator, n: int, mul_fmt: tuple[int, int], add_fmt: tuple[int, int]):
+    """random a, b, c with edge cases, plus c at large exponent gaps from a*b and c close to -(a*b)"""
+    (ew, mw), (add_ew, add_mw) = mul_fmt, add_fmt
+    a = random_operands(rng, n, ew, mw)
+    b = random_operands(rng, n, ew, mw)
+    c = random_operands(rng, n, add_ew, add_mw)
+    bias, add_bias = (1 << (ew - 1)) - 1, (1 << (add_ew - 1)) - 1
+    field = lambda x: ((x >> np.uint64(mw)) & np.uint64((1 << ew) - 1)).astype(np.int64)
+    product_exp = field(a) + field(b) - 2 * bias + add_bias
+    # c far above or below the product, around the alignment limits of the adder
+    gap = rng.choice([0, 1, 2, mw, add_mw, add_mw + 1, add_mw + 2, add_mw + 3, add_mw + 4,
+                      2 * mw + 2, 2 * mw + 3, 2 * mw + 5, 60, 62, 63, 64, 70], n)
+    gap = np.where(rng.random(n) < 0.5, gap, -gap)
+    c_gap = with_exp(c, product_exp + gap, add_ew, add_mw)
+    # c = -(a*b) rounded, nudged by a few ulps: massive cancellation
+    ref = [mul(FloatPoint.from_bits(x, ew, mw), FloatPoint.from_bits(y, ew, mw), add_ew, add_mw).to_bits()
+           for x, y in zip(a.tolist(), b.tolist())]
+    nudge = rng.integers(-2, 3, n)
+    c_cancel = np.clip((np.array(ref, dtype=np.int64) ^ (1 << (add_ew + add_mw))) + nudge,
+                       0, (1 << (1 + add_ew + add_mw)) - 1).astype(np.uint64)
+    kind = rng.integers(0, 3, n)
+    c = np.select([kind == 0, kind == 1], [c, c_gap], default=c_cancel)
+    return a, b, c
+
+
+def test_fma_batch(n: int = 3000, seed: int = 0) -> int:
+    rng = np.random.default_rng(seed)
+    errors = 0
+    for mul_fmt, add_fmt in FORMATS:
+        (ew, mw), (add_ew, add_mw) = mul_fmt, add_fmt
+        a, b, c = fma_operands(rng, n, mul_fmt, add_fmt)
+        for rm in RoundingMode:
+            dut = fma_batch(a, b, c, ew, mw, rm, add_ew, add_mw)
+            for i, (x, y, z) in enumerate(zip(a.tolist(), b.tolist(), c.tolist())):
+                ref = fma(FloatPoint.from_bits(x, ew, mw), FloatPoint.from_bits(y, ew, mw),
+                          FloatPoint.from_bits(z, add_ew, add_mw), add_ew, add_mw, rm).to_bits()
+                if int(dut[i]) != ref:
+                    errors += 1
+                    print(f"fma {mul_fmt} {add_fmt} {rm.name}: {x:x} {y:x} {z:x} batch={int(dut[i]):x} scalar={ref:x}")
+    return errors
+
+
+def test_mul_add_batch(n: int = 3000, seed: int = 1) -> int:
+    rng = np.random.default_rng(seed)
+    errors = 0
+    for ew, mw in [(5, 10), (8, 7), (8, 23)]:
+        a = random_operands(rng, n, ew, mw)
+        b = random_operands(rng, n, ew, mw)
+        # half of the addends within a few binades of each other, some of them -a +- a few ulps
+        bias = (1 << (ew - 1)) - 1
+        near = with_exp(b, ((a >> np.uint64(mw)) & np.uint64((1 << ew) - 1)).astype(np.int64)
+                        + rng.integers(-mw - 3, mw + 4, n), ew, mw)
+        cancel = np.clip((a.astype(np.int64) ^ (1 << (ew + mw))) + rng.integers(-2, 3, n),
+                         0, (1 << (1 + ew + mw)) - 1).astype(np.uint64)
+        kind = rng.integers(0, 3, n)
+        b_add = np.select([kind == 0, kind == 1], [b, near], default=cancel)
+        for rm in RoundingMode:
+            for name, batch, scalar, ys in [("mul", mul_batch, mul, b), ("add", add_batch, add, b_add)]:
+                dut = batch(a, ys, ew, mw, rm)
+                for i, (x, y) in enumerate(zip(a.tolist(), ys.tolist())):
+                    ref = scalar(FloatPoint.from_bits(x, ew, mw), FloatPoint.from_bits(y, ew, mw), ew, mw, rm).to_bits()
+                    if int(dut[i]) != ref:
+                        errors += 1
+                        print(f"{name} ({ew}, {mw}) {rm.name}: {x:x} {y:x} batch={int(dut[i]):x} scalar={ref:x}")
+    return errors
+
+
+def test_fallback(n: int = 500, seed: int = 2) -> int:
+    """Formats too wide for the 64-bit window raise ValueError, and the backend falls back to the scalar loop"""
+    rng = np.random.default_rng(seed)
+    errors = 0
+    backend = PyEasyFloatBackend()
+    for (ew, mw), (add_ew, add_mw) in [((11, 52), (11, 52)), ((5, 10), (3, 60))]:
+        a = random_operands(rng, n, ew, mw)
+        b = random_operands(rng, n, ew, mw)
+        c = random_operands(rng, n, add_ew, add_mw)
+        try:
+            fma_batch(a, b, c, ew, mw, add_ew=add_ew, add_mw=add_mw)
+            print(f"fma_batch accepted ({ew}, {mw}) x ({add_ew}, {add_mw}), too wide for the window")
+            errors += 1
+        except ValueError:
+            pass
+        dut = backend.fma_batch(a, b, c, ew, mw, add_ew, add_mw)
+        for i, (x, y, z) in enumerate(zip(a.tolist(), b.tolist(), c.tolist())):
+            ref = fma(FloatPoint.from_bits(x, ew, mw), FloatPoint.from_bits(y, ew, mw),
+                      FloatPoint.from_bits(z, add_ew, add_mw), add_ew, add_mw).to_bits()
+            if int(dut[i]) != ref:
+                errors += 1
+                print(f"fallback ({ew}, {mw}) x ({add_ew}, {add_mw}): {x:x} {y:x} {z:x} batch={int(dut[i]):x} scalar={ref:x}")
+    return errors
+
+
+def edge_operands(ew: int, mw: int) -> np.ndarray:
+    """zeros, subnormals, min/max normals, around 1.0, infs and NaNs, of both signs"""
+    exp_max = (1 << ew) - 1
+    bias = (1 << (ew - 1)) - 1
+    edges = np.array([
+        0, 1, (1 << mw) - 1, 1 << mw, ((exp_max - 1) << mw) | ((1 << mw) - 1),
+        bias << mw, ((bias - 1) << mw) | ((1 << mw) - 1), (bias << mw) | 1,
+        exp_max << mw, (exp_max << mw) | 1, (exp_max << mw) | (1 << (mw - 1)),
+    ], dtype=np.uint64)
+    return np.concatenate([edges, edges | np.uint64(1 << (ew + mw))])
+
+
+def all_bits(ew: int, mw: int) -> np.ndarray:
+    return np.arange(1 << (1 + ew + mw), dtype=np.uint64)
+
+
+def compare_unary(name: str, xs: np.ndarray, dut: np.ndarray, scalar, ew: int, mw: int) -> int:
+    errors = 0
+    for x, d in zip(xs.tolist(), dut.tolist()):
+        ref = scalar(FloatPoint.from_bits(x, ew, mw)).to_bits()
+        if d != ref:
+            errors += 1
+            print(f"{name}: {x:x} batch={d:x} scalar={ref:x}")
+    return errors
+
+
+def test_div_batch(n: int = 2000, seed: int = 3) -> int:
+    """random operands plus every pair of edge operands, in every rounding mode"""
+    rng = np.random.default_rng(seed)
+    errors = 0
+    for ew, mw in [(8, 7), (8, 23)]:
+        edges = edge_operands(ew, mw)
+        x = np.concatenate([random_operands(rng, n, ew, mw), np.repeat(edges, len(edges))])
+        y = np.concatenate([random_operands(rng, n, ew, mw), np.tile(edges, len(edges))])
+        for rm in RoundingMode:
+            dut = div_batch(x, y, ew, mw, rm)
+            for i, (a, b) in enumerate(zip(x.tolist(), y.tolist())):
+                ref = div(FloatPoint.from_bits(a, ew, mw), FloatPoint.from_bits(b, ew, mw), rm).to_bits()
+                if int(dut[i]) != ref:
+                    errors += 1
+                    print(f"div ({ew}, {mw}) {rm.name}: {a:x} {b:x} batch={int(dut[i]):x} scalar={ref:x}")
+    return errors
+
+
+def test_reciprocal_batch() -> int:
+    """every fp16 and bf16 input, also from a seed table"""
+    errors = 0
+    for (ew, mw), seed_bits in [((5, 10), None), ((8, 7), None), ((5, 10), 4)]:
+        xs = all_bits(ew, mw)
+        dut = reciprocal_batch(xs, ew, mw, seed_bits)
+        errors += compare_unary(f"reciprocal ({ew}, {mw}) seed {seed_bits}", xs, dut,
+                                lambda x: reciprocal(x, seed_bits), ew, mw)
+    return errors
+
+
+def test_pow2_batch() -> int:
+    """every fp16 and bf16 input, for several PWL piece counts and an fp32 adder"""
+    errors = 0
+    for (ew, mw), add_fmt in [((5, 10), (5, 10)), ((8, 7), (8, 7)), ((5, 10), (8, 23))]:
+        xs = all_bits(ew, mw)
+        for pieces in [1, 4, 8, 32]:
+            config = (ew, mw, ew, mw, *add_fmt)
+            dut = pow2_batch(xs, ew, mw, *config, pwl_pieces=pieces)
+            errors += compare_unary(f"pow2 ({ew}, {mw}) add {add_fmt} pieces {pieces}", xs, dut,
+                                    lambda x: pow2(x, *config, pwl_pieces=pieces), ew, mw)
+    return errors
+
+
+errors = test_fma_batch() + test_mul_add_batch() + test_fallback()
+errors += test_div_batch() + test_reciprocal_batch() + test_pow2_batch()
+print(f"Test finished! errors: {errors}")
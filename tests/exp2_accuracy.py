@@ -1,32 +1,36 @@
 import numpy as np
 from pyeasyfloat.backend import *
-from pyeasyfloat.float import FloatPoint
+from pyeasyfloat.batch import normal_bits
 
 
 backend = PyEasyFloatBackend()
 
+# numpy dtype -> (ew, mw, bits dtype)
+FORMATS = {np.float16: (5, 10, np.uint16), np.float32: (8, 23, np.uint32)}
 
-def error_analysis(pwl_pieces: int) -> tuple[float, float]:
-    abs_err_list = []
-    rel_err_list = []
-    for fp16 in FloatPoint.get_all_normal_numbers(5, 10, postive=False, negative=True):
-        fp16: FloatPoint
-        exp2_dut = backend.exp2(fp16, 5, 10, 5, 10, 8, 23, pwlPieces=pwl_pieces)
-        exp2_dut = exp2_dut.to_numpy()
-        exp2_ref = np.exp2(fp16.to_numpy())
-        exp2_ref = np.float32(exp2_ref)  # Convert to float32 for comparison
-        abs_error = np.abs(exp2_dut - exp2_ref)
-        rel_error = abs_error / np.abs(exp2_ref) if exp2_ref != 0 else abs_error
-        abs_err_list.append(abs_error)
-        rel_err_list.append(rel_error)
 
-    mean_abs_error = np.mean(abs_err_list)
-    mean_rel_error = np.mean(rel_err_list)
-    return mean_abs_error, mean_rel_error
+def error_analysis(pwl_pieces: int, dtype=np.float16, n: int | None = None) -> tuple[float, float]:
+    """Mean errors of exp2 over the negative normal numbers of dtype (n random ones if given)
+    against numpy, with the PWL multiply in dtype and the add in fp32"""
+    ew, mw, utype = FORMATS[dtype]
+    if n is None:
+        xs = normal_bits(ew, mw, positive=False, negative=True)
+    else:
+        rng = np.random.default_rng(0)
+        exps = rng.integers(1, (1 << ew) - 1, n, dtype=np.uint64)
+        xs = ((1 << (ew + mw)) | (exps << mw) | rng.integers(0, 1 << mw, n, dtype=np.uint64)).astype(utype)
+    exp2_dut = backend.exp2_batch(xs, ew, mw, ew, mw, ew, mw, 8, 23, pwlPieces=pwl_pieces)
+    exp2_dut = exp2_dut.astype(utype).view(dtype).astype(np.float32)
+    # Convert to float32 for comparison
+    exp2_ref = np.float32(np.exp2(xs.view(dtype)))
+    abs_error = np.abs(exp2_dut - exp2_ref)
+    rel_error = np.where(exp2_ref != 0, abs_error / np.where(exp2_ref != 0, np.abs(exp2_ref), 1), abs_error)
+    return np.mean(abs_error), np.mean(rel_error)
 
 
-for pwl_pieces in [1, 2, 4, 8, 16, 32, 64, 128]:
-    mean_abs_error, mean_rel_error = error_analysis(pwl_pieces)
-    print(f"Error analysis for {pwl_pieces} PWL pieces:")
-    print(f"Mean Absolute Error: {mean_abs_error}")
-    print(f"Mean Relative Error: {mean_rel_error}")
\ No newline at end of file
+for dtype, n in [(np.float16, None), (np.float32, 1 << 22)]:
+    for pwl_pieces in [1, 2, 4, 8, 16, 32, 64, 128]:
+        mean_abs_error, mean_rel_error = error_analysis(pwl_pieces, dtype, n)
+        print(f"Error analysis for {dtype.__name__} with {pwl_pieces} PWL pieces:")
+        print(f"Mean Absolute Error: {mean_abs_error}")
+        print(f"Mean Relative Error: {mean_rel_error}")
@@ -1,24 +1,26 @@
 import numpy as np
 from pyeasyfloat.backend import *
 from pyeasyfloat.float import FloatPoint
+from pyeasyfloat.golden import GoldenVectors
 
 def test_exp2(dut: HwBackend, ref: PyEasyFloatBackend, seed: int = 0):
-    # exp2 only works for negative numbers
-    for i in range(1 << 15,  (1 << 16) - 1):
-        fx = FloatPoint.from_bits(i, 5, 10)
-        dut_v = dut.exp2(fx, 5, 10, 5, 10, 5, 10)
-        ref_v = ref.exp2(fx, 5, 10, 5, 10, 5, 10)
-        if dut_v.to_bits() != ref_v.to_bits():
-            if not (dut_v.is_zero and ref_v.is_zero):
-                dut_f = np.uint16(dut_v.to_bits()).view(np.float16)
-                ref_f = np.uint16(ref_v.to_bits()).view(np.float16)
-                np_f = np.exp2(np.uint16(i).view(np.float16))
-                print(f"error: {i} [{dut_f}] [{ref_f}] [{np_f}]")
-                print(fx)
-                return
+    # exp2 only works for negative numbers; reference results are computed on the first run only
+    (xs,), ref_bits = GoldenVectors("exp2", (5, 10, 5, 10, 5, 10, 5, 10)).load_or_generate(
+        [np.arange(1 << 15, (1 << 16) - 1, dtype=np.uint16)], ref)
+    dut_bits = dut.exp2_batch(xs, 5, 10, 5, 10, 5, 10, 5, 10)
+    for i in np.flatnonzero(dut_bits != ref_bits):
+        dut_v = FloatPoint.from_bits(dut_bits[i], 5, 10)
+        ref_v = FloatPoint.from_bits(ref_bits[i], 5, 10)
+        if not (dut_v.is_zero and ref_v.is_zero):
+            dut_f = np.uint16(dut_v.to_bits()).view(np.float16)
+            ref_f = np.uint16(ref_v.to_bits()).view(np.float16)
+            np_f = np.exp2(xs[i].view(np.float16))
+            print(f"error: {xs[i]} [{dut_f}] [{ref_f}] [{np_f}]")
+            print(FloatPoint.from_bits(xs[i], 5, 10))
+            return
 
 
 test_exp2(
     HwBackend('MulAddExp2Rec.sv'),
     PyEasyFloatBackend()
-)
\ No newline at end of file
+)
@@ -1,23 +1,26 @@
 import numpy as np
 from pyeasyfloat.backend import *
 from pyeasyfloat.float import FloatPoint
+from pyeasyfloat.golden import GoldenVectors
 
 def test_reciprocal(dut: HwBackend, ref: PyEasyFloatBackend, seed: int = 0):
-    for i in range((1 << 16) - 1):
-        fx = FloatPoint.from_bits(i, 5, 10)
-        dut_v = dut.reciprocal(fx)
-        ref_v = ref.reciprocal(fx)
-        if dut_v.to_bits() != ref_v.to_bits():
-            if not (dut_v.is_zero and ref_v.is_zero):
-                dut_f = np.uint16(dut_v.to_bits()).view(np.float16)
-                ref_f = np.uint16(ref_v.to_bits()).view(np.float16)
-                print(f"error: {i} [{dut_f}] [{ref_f}]")
-                print(fx)
-                return
+    # reference results are computed on the first run only
+    (xs,), ref_bits = GoldenVectors("reciprocal", (5, 10)).load_or_generate(
+        [np.arange((1 << 16) - 1, dtype=np.uint16)], ref)
+    dut_bits = dut.reciprocal_batch(xs, 5, 10)
+    for i in np.flatnonzero(dut_bits != ref_bits):
+        dut_v = FloatPoint.from_bits(dut_bits[i], 5, 10)
+        ref_v = FloatPoint.from_bits(ref_bits[i], 5, 10)
+        if not (dut_v.is_zero and ref_v.is_zero):
+            dut_f = np.uint16(dut_v.to_bits()).view(np.float16)
+            ref_f = np.uint16(ref_v.to_bits()).view(np.float16)
+            print(f"error: {xs[i]} [{dut_f}] [{ref_f}]")
+            print(FloatPoint.from_bits(xs[i], 5, 10))
+            return
 
 
 
 test_reciprocal(
     HwBackend('MulAddExp2Rec.sv'),
     PyEasyFloatBackend()
-)
\ No newline at end of file
+)